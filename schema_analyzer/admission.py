@@ -0,0 +1,237 @@
+"""Rate limiting and admission control for Schema Evolution Analyzer"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, AsyncIterator, Deque, Optional, Tuple
+import asyncio
+import threading
+import time
+import structlog
+from .metrics import (
+    ACTIVE_ANALYSES, ADMISSION_DECISIONS, ADMISSION_INFLIGHT_COST, ADMISSION_WAIT,
+    gauge_value
+)
+from .utils.cache import LRUCache
+
+logger = structlog.get_logger()
+
+class AdmissionRejected(Exception):
+    """A request was refused; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimited(AdmissionRejected):
+    """The client exceeded its request rate"""
+
+class Overloaded(AdmissionRejected):
+    """The analyzer has no capacity for the request"""
+
+def estimate_cost(
+    old_schema: Any,
+    new_schema: Any,
+    queries: Optional[List[str]] = None
+) -> int:
+    """
+    Estimate the work of an analysis in abstract units
+
+    Each table and column of either schema and each query counts one unit.
+    Malformed inputs are counted as far as they can be and left for
+    validation to reject.
+    """
+    cost = 1
+    for schema in (old_schema, new_schema):
+        tables = schema.get('tables') if isinstance(schema, dict) else None
+        if not isinstance(tables, list):
+            continue
+        for table in tables:
+            cost += 1
+            columns = table.get('columns') if isinstance(table, dict) else None
+            if isinstance(columns, list):
+                cost += len(columns)
+    if isinstance(queries, list):
+        cost += len(queries)
+    return cost
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens from the bucket
+
+        Returns:
+            0.0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiter
+
+    Buckets are kept in an LRU bounded by max_clients; a client whose bucket
+    was evicted starts again with a full bucket.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[float] = None, max_clients: int = 10000):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst or max(1.0, requests_per_minute)
+        self._buckets = LRUCache(max_clients)
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> None:
+        """
+        Count one request of client
+
+        Raises:
+            RateLimited: If the client has no tokens left
+        """
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets.put(client, bucket)
+            retry_after = bucket.acquire()
+
+        if retry_after:
+            ADMISSION_DECISIONS.labels(decision='rate_limited').inc()
+            raise RateLimited(f"Rate limit exceeded for {client}", retry_after)
+
+class AdmissionController:
+    """
+    Admits analyses while the in-flight count and estimated cost allow
+
+    A request is admitted immediately when fewer than max_concurrent
+    analyses are running (the larger of the admitted count and the
+    ACTIVE_ANALYSES gauge) and its cost fits into max_inflight_cost. A
+    request costing more than max_inflight_cost on its own is admitted only
+    when nothing else is in flight. Otherwise it waits in a FIFO queue of at
+    most max_queue entries for up to queue_timeout seconds; requests that
+    find the queue full, or time out in it, are shed with Overloaded.
+
+    Queued requests are reconsidered whenever an admitted request finishes.
+    Code running analyses without admission (background jobs) must call
+    wake() when one finishes, since that lowers ACTIVE_ANALYSES too.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_inflight_cost: int = 1_000_000,
+        max_queue: int = 64,
+        queue_timeout: float = 5.0
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_inflight_cost = max_inflight_cost
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.inflight_cost = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @classmethod
+    def from_config(cls, performance: Dict[str, Any]) -> 'AdmissionController':
+        """Build a controller from the performance config section"""
+        admission = performance.get('admission', {})
+        return cls(
+            max_concurrent=admission.get('max_concurrent', 2 * performance.get('max_workers', 4)),
+            max_inflight_cost=admission.get('max_inflight_cost', 1_000_000),
+            max_queue=admission.get('max_queue', 64),
+            queue_timeout=admission.get('queue_timeout', 5.0)
+        )
+
+    def _fits(self, cost: int) -> bool:
+        if self.inflight == 0:
+            return True
+        running = max(self.inflight, int(gauge_value(ACTIVE_ANALYSES)))
+        return (running < self.max_concurrent
+                and self.inflight_cost + cost <= self.max_inflight_cost)
+
+    def _grant(self, cost: int) -> None:
+        self.inflight += 1
+        self.inflight_cost += cost
+        ADMISSION_INFLIGHT_COST.set(self.inflight_cost)
+
+    def _release(self, cost: int) -> None:
+        self.inflight -= 1
+        self.inflight_cost -= cost
+        ADMISSION_INFLIGHT_COST.set(self.inflight_cost)
+        self.wake()
+
+    def wake(self) -> None:
+        """Admit queued requests in order while the head of the queue fits"""
+        while self._waiters:
+            cost, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(cost):
+                break
+            self._waiters.popleft()
+            self._grant(cost)
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, cost: int) -> AsyncIterator[None]:
+        """
+        Hold an admission slot for the duration of the block
+
+        Raises:
+            Overloaded: If the request is shed
+        """
+        if not self._waiters and self._fits(cost):
+            self._grant(cost)
+            ADMISSION_DECISIONS.labels(decision='admitted').inc()
+        else:
+            await self._enqueue(cost)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    async def _enqueue(self, cost: int) -> None:
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_DECISIONS.labels(decision='shed').inc()
+            logger.warning("Shedding analysis request", cost=cost, queued=len(self._waiters))
+            raise Overloaded("Analysis queue is full", self.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((cost, waiter))
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._abandon(cost, waiter)
+                ADMISSION_DECISIONS.labels(decision='timed_out').inc()
+                raise Overloaded("Timed out waiting for admission", self.queue_timeout)
+            # Granted just as the timeout fired; keep the slot
+        except asyncio.CancelledError:
+            if waiter.done():
+                self._release(cost)
+            else:
+                self._abandon(cost, waiter)
+            raise
+        ADMISSION_WAIT.observe(time.perf_counter() - start_time)
+        ADMISSION_DECISIONS.labels(decision='queued').inc()
+
+    def _abandon(self, cost: int, waiter: asyncio.Future) -> None:
+        """Drop a waiter that gave up, letting the requests behind it move up"""
+        waiter.cancel()
+        self._waiters.remove((cost, waiter))
+        self.wake()
@@ -1,33 +1,105 @@
 """Core schema analysis functionality"""
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Awaitable, Optional, Sequence, Tuple, Union
 import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime
-from .metrics import instrument_method, ANALYSIS_DURATION
+import functools
+import threading
+from .metrics import (
+    instrument_method,
+    track_stage,
+    ACTIVE_ANALYSES,
+    ANALYSIS_DURATION,
+    ANALYSIS_SIZE,
+)
 import structlog
 from .utils.schema_validator import SchemaValidator
 from .utils.diff_generator import DiffGenerator
 from .utils.impact_analyzer import ImpactAnalyzer
 from .utils.query_validator import QueryValidator
+from .utils.fingerprint import (
+    SchemaFingerprint,
+    fingerprint_schema_incremental,
+    try_fingerprint_schema,
+)
+from .utils.query_index import QueryIndex
+from .utils.schema_index import SchemaIndex
+from .utils.cache import LRUCache
+from .utils.cancellation import check_cancelled, run_cancellable
+from .utils.hashing import content_hash, digest
+from .profiling import AnalysisProfiler, ProfileCapture, bind_capture, current_capture
+from .result_cache import ResultCache, StageListener
+from .storage import StorageBackend
 
 logger = structlog.get_logger()
 
+# Stage listener of the analysis running in the current task, if any
+_stage_listener: ContextVar[Optional[StageListener]] = ContextVar(
+    'schema_analyzer_stage_listener', default=None
+)
+
+# Per-process analyzer used by pipeline stages dispatched to a process pool
+_worker_analyzer: Optional["SchemaAnalyzer"] = None
+
+def _run_stage_in_worker(config: Dict[str, Any], stage: str, args: Tuple[Any, ...]) -> Any:
+    """Run a pipeline stage inside a process pool worker"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        worker_config = dict(config)
+        worker_config['performance'] = {**config.get('performance', {}), 'executor': 'inline'}
+        _worker_analyzer = SchemaAnalyzer(worker_config)
+    return getattr(_worker_analyzer, stage)(*args)
+
 class SchemaAnalyzer:
     """Main schema analysis orchestrator"""
     
-    def __init__(self, config: Dict[str, Any]):
+    EXECUTOR_TYPES = ('thread', 'process', 'inline')
+    
+    def __init__(self, config: Dict[str, Any], storage: Optional[StorageBackend] = None):
         self.config = config
+        performance = config.get('performance', {})
+        self.executor_type = performance.get('executor', 'thread')
+        if self.executor_type not in self.EXECUTOR_TYPES:
+            raise ValueError(f"Unsupported executor type: {self.executor_type}")
+        self.max_workers = performance.get('max_workers')
+        self.request_timeout = performance.get('request_timeout')
+        # Schema fingerprint root -> SchemaIndex shared by the diff and query stages
+        self._schema_indexes = LRUCache(performance.get('index_cache_size', 8))
+        self._executor: Optional[Executor] = None
         self.schema_validator = SchemaValidator()
-        self.diff_generator = DiffGenerator()
+        self.diff_generator = DiffGenerator(
+            config.get('analysis', {}).get('similarity_threshold')
+        )
         self.impact_analyzer = ImpactAnalyzer()
         self.query_validator = QueryValidator()
+        # Long-lived query corpus; maintained by callers via add/remove_query
+        self.query_index = QueryIndex(self.query_validator)
+        
+        cache_config = config.get('cache', {})
+        self.result_cache = None
+        if cache_config.get('enabled', True):
+            self.result_cache = ResultCache(
+                max_size=cache_config.get('max_size', 128),
+                ttl=cache_config.get('ttl', 3600),
+                storage=storage if cache_config.get('storage_tier', False) else None
+            )
+        self._config_hash = content_hash(config.get('analysis', {}))
+        
+        profiling_config = config.get('profiling', {})
+        self.profiler = None
+        if profiling_config.get('enabled', False):
+            self.profiler = AnalysisProfiler(profiling_config, storage)
     
-    @instrument_method(ANALYSIS_DURATION)
+    @instrument_method(ANALYSIS_DURATION, ACTIVE_ANALYSES)
     async def analyze_schema_changes(
         self,
         old_schema: Dict[str, Any],
         new_schema: Dict[str, Any],
-        queries: Optional[List[str]] = None
+        queries: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+        on_stage: Optional[StageListener] = None
     ) -> Dict[str, Any]:
         """
         Analyze schema changes and their impact
@@ -35,44 +107,180 @@ class SchemaAnalyzer:
         Args:
             old_schema: Original database schema
             new_schema: Modified database schema
-            queries: Optional list of SQL queries to validate
+            queries: Optional list of SQL queries to validate. When omitted,
+                affected queries are looked up in the registered query_index
+            session_id: Optional id of the analysis; a captured profile is
+                stored under it
+            on_stage: Optional coroutine function awaited with the stage
+                name and 'started' or 'completed' around each stage
             
         Returns:
             Analysis results including changes, impacts, and recommendations
         """
+        def analysis() -> Awaitable[Dict[str, Any]]:
+            return self._with_timeout(self._analyze(old_schema, new_schema, queries))
+        
+        listener_token = _stage_listener.set(on_stage)
+        try:
+            if self.profiler is None:
+                return await analysis()
+            return await self.profiler.profile(analysis, session_id)
+        finally:
+            _stage_listener.reset(listener_token)
+    
+    @instrument_method(ANALYSIS_DURATION, ACTIVE_ANALYSES)
+    async def analyze_evolution(
+        self,
+        versions: Sequence[Dict[str, Any]],
+        queries: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze a chain of schema versions
+        
+        Each version is validated and fingerprinted once and reused for both
+        of its neighbouring comparisons; only tables that changed since the
+        previous version are re-hashed and re-validated.
+        
+        Args:
+            versions: Schema versions, oldest first
+            queries: Optional list of SQL queries to validate against the
+                last version
+            
+        Returns:
+            Pairwise step results and the cumulative change set from the
+            first to the last version
+        """
+        if len(versions) < 2:
+            raise ValueError("At least two schema versions are required")
+        return await self._with_timeout(self._analyze_evolution(versions, queries))
+    
+    async def close(self) -> None:
+        """Shut down the stage executor, if one was started"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+    
+    async def _with_timeout(self, analysis: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Await analysis, bounded by performance.request_timeout when set"""
+        if not self.request_timeout:
+            return await analysis
+        try:
+            return await asyncio.wait_for(analysis, timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Schema analysis timed out", timeout=self.request_timeout)
+            raise
+    
+    async def _analyze(
+        self,
+        old_schema: Dict[str, Any],
+        new_schema: Dict[str, Any],
+        queries: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Run the analysis pipeline, overlapping independent stages"""
         logger.info("Starting schema analysis", 
                    old_schema_tables=len(old_schema.get('tables', [])),
                    new_schema_tables=len(new_schema.get('tables', [])))
         
-        # Validate input schemas
-        await self.schema_validator.validate(old_schema)
-        await self.schema_validator.validate(new_schema)
+        # Fingerprint and validate both schemas concurrently
+        old_fingerprint, new_fingerprint = await asyncio.gather(
+            self._run_stage('_prepare_schema', old_schema),
+            self._run_stage('_prepare_schema', new_schema)
+        )
         
-        # Generate schema differences
-        changes = await self.diff_generator.generate_diff(old_schema, new_schema)
-        
-        # Analyze impact of changes
-        impact = await self.impact_analyzer.analyze_impact(changes)
+        if self.result_cache is None:
+            result = await self._compute_analysis(
+                old_schema, new_schema, queries, old_fingerprint, new_fingerprint
+            )
+        else:
+            async def compute(
+                listener: StageListener,
+                capture: Optional[ProfileCapture]
+            ) -> Dict[str, Any]:
+                # Runs in the cache's shared task: report to the flight, not
+                # to the caller that happened to start it
+                _stage_listener.set(listener)
+                bind_capture(capture)
+                return await self._compute_analysis(
+                    old_schema, new_schema, queries, old_fingerprint, new_fingerprint
+                )
+            
+            key = ResultCache.make_key(
+                old_fingerprint.root,
+                new_fingerprint.root,
+                self._queries_hash(queries),
+                self._config_hash
+            )
+            result = await self.result_cache.get_or_compute(
+                key,
+                compute,
+                _stage_listener.get(),
+                current_capture() if self.profiler is not None else None
+            )
+            # Cached results carry the time of their original computation
+            result['timestamp'] = datetime.utcnow().isoformat()
         
-        # Validate queries against new schema if provided
-        query_validation = None
+        self._record_sizes(new_schema, result['changes'], queries)
+        return result
+    
+    async def _compute_analysis(
+        self,
+        old_schema: Dict[str, Any],
+        new_schema: Dict[str, Any],
+        queries: Optional[List[str]],
+        old_fingerprint: SchemaFingerprint,
+        new_fingerprint: SchemaFingerprint
+    ) -> Dict[str, Any]:
+        """Diff, impact and query stages for validated, fingerprinted schemas"""
+        # Validate queries against new schema while diffing
+        query_task = None
         if queries:
-            query_validation = await self.query_validator.validate_queries(
-                queries, new_schema
+            query_task = asyncio.ensure_future(
+                self._run_stage('_validate_queries', queries, new_schema, new_fingerprint)
             )
         
-        # Generate recommendations
-        recommendations = await self._generate_recommendations(changes, impact)
+        try:
+            # Generate schema differences
+            changes = await self._run_stage(
+                '_generate_diff', old_schema, new_schema, old_fingerprint, new_fingerprint
+            )
+            
+            # Analyze impact of changes
+            impact = await self._run_stage('_analyze_impact', changes)
+            
+            # Look up affected queries from the change list
+            affected_queries = None
+            if queries:
+                affected_queries = await self._run_stage('_find_affected_queries', queries, changes)
+            elif len(self.query_index):
+                with track_stage('find_affected_queries'):
+                    affected_queries = self.query_index.affected_queries(changes)
+            
+            # Generate recommendations
+            with track_stage('generate_recommendations'):
+                recommendations = await self._generate_recommendations(changes, impact)
+            
+            query_validation = await query_task if query_task else None
+        except BaseException:
+            if query_task is not None:
+                query_task.cancel()
+            raise
         
         result = {
             'timestamp': datetime.utcnow().isoformat(),
             'changes': changes,
             'impact': impact,
             'recommendations': recommendations,
+            'fingerprints': {
+                'old_schema': old_fingerprint.root,
+                'new_schema': new_fingerprint.root,
+            },
         }
         
         if query_validation:
             result['query_validation'] = query_validation
+        
+        if affected_queries is not None:
+            result['affected_queries'] = affected_queries
             
         logger.info("Schema analysis completed",
                    num_changes=len(changes),
@@ -80,6 +288,273 @@ class SchemaAnalyzer:
         
         return result
     
+    async def _analyze_evolution(
+        self,
+        versions: Sequence[Dict[str, Any]],
+        queries: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Run the evolution pipeline over a chain of versions"""
+        logger.info("Starting schema evolution analysis", num_versions=len(versions))
+        
+        fingerprints, steps, changes, impact = await self._run_stage(
+            '_evolve', versions
+        )
+        
+        query_validation = None
+        affected_queries = None
+        if queries:
+            query_validation, affected_queries = await asyncio.gather(
+                self._run_stage('_validate_queries', queries, versions[-1], fingerprints[-1]),
+                self._run_stage('_find_affected_queries', queries, changes)
+            )
+        elif len(self.query_index):
+            with track_stage('find_affected_queries'):
+                affected_queries = self.query_index.affected_queries(changes)
+        
+        with track_stage('generate_recommendations'):
+            recommendations = await self._generate_recommendations(changes, impact)
+        
+        result = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'fingerprints': [fingerprint.root for fingerprint in fingerprints],
+            'steps': steps,
+            'cumulative': {
+                'changes': changes,
+                'impact': impact,
+                'recommendations': recommendations,
+            },
+        }
+        
+        if query_validation:
+            result['query_validation'] = query_validation
+        
+        if affected_queries is not None:
+            result['affected_queries'] = affected_queries
+        
+        self._record_sizes(versions[-1], changes, queries)
+        logger.info("Schema evolution analysis completed",
+                   num_versions=len(versions),
+                   num_changes=sum(len(step['changes']) for step in steps),
+                   num_net_changes=len(changes))
+        
+        return result
+    
+    def _queries_hash(self, queries: Optional[List[str]]) -> str:
+        """Identify the query input of an analysis for the result cache"""
+        if queries:
+            return digest('\0'.join(queries).encode('utf-8'))
+        if len(self.query_index):
+            # Affected queries come from the registered corpus
+            return f"index:{id(self.query_index)}:{self.query_index.version}"
+        return ''
+    
+    @staticmethod
+    def _record_sizes(
+        schema: Dict[str, Any],
+        changes: List[Dict[str, Any]],
+        queries: Optional[List[str]]
+    ) -> None:
+        """Export the size of an analysis to the size gauges"""
+        tables = schema['tables']
+        ANALYSIS_SIZE.labels(dimension='tables').set(len(tables))
+        ANALYSIS_SIZE.labels(dimension='columns').set(sum(len(t['columns']) for t in tables))
+        ANALYSIS_SIZE.labels(dimension='changes').set(len(changes))
+        ANALYSIS_SIZE.labels(dimension='queries').set(len(queries) if queries else 0)
+    
+    def _get_executor(self) -> Executor:
+        """Return the stage executor, creating it on first use"""
+        if self._executor is None:
+            if self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='schema-analyzer'
+                )
+        return self._executor
+    
+    async def _run_stage(self, stage: str, *args: Any) -> Any:
+        """
+        Run a CPU-bound pipeline stage off the event loop
+        
+        Stages run in the configured thread or process pool, or inline on
+        the event loop when performance.executor is 'inline'. Process pool
+        workers keep their own analyzer, so their caches are per worker.
+        
+        When the awaiting coroutine is cancelled or times out, a stage that
+        has not started yet never runs, and a stage running in a thread
+        stops at its next cancellation checkpoint. A stage already running
+        in a process pool worker runs to completion.
+        
+        The recorded stage duration includes time spent waiting for a worker.
+        """
+        name = stage.lstrip('_')
+        listener = _stage_listener.get()
+        if listener is not None:
+            await listener(name, 'started')
+        
+        with track_stage(name):
+            func = functools.partial(getattr(self, stage), *args)
+            capture = current_capture() if self.profiler is not None else None
+            if capture is not None:
+                func = functools.partial(capture.run, name, func)
+            
+            if self.executor_type == 'inline':
+                result = func()
+            else:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                if self.executor_type == 'process':
+                    result = await loop.run_in_executor(
+                        executor, _run_stage_in_worker, self.config, stage, args
+                    )
+                else:
+                    token = threading.Event()
+                    try:
+                        result = await loop.run_in_executor(
+                            executor, run_cancellable, token, func
+                        )
+                    except asyncio.CancelledError:
+                        token.set()
+                        raise
+        
+        if listener is not None:
+            await listener(name, 'completed')
+        return result
+    
+    def _prepare_schema(self, schema: Dict[str, Any]) -> Optional[SchemaFingerprint]:
+        """
+        Fingerprint, validate and index a schema
+        
+        The root hash keys the validation memo and the SchemaIndex cache, so
+        the diff and query stages that follow find the index ready.
+        """
+        fingerprint = try_fingerprint_schema(schema)
+        self.schema_validator.validate_sync(
+            schema, fingerprint.root if fingerprint else None
+        )
+        if fingerprint is not None:
+            self._schema_index(schema, fingerprint)
+        return fingerprint
+    
+    def _schema_index(
+        self,
+        schema: Union[Dict[str, Any], SchemaIndex],
+        fingerprint: Optional[SchemaFingerprint]
+    ) -> SchemaIndex:
+        """Return the SchemaIndex of a schema, cached by fingerprint root"""
+        if isinstance(schema, SchemaIndex):
+            return schema
+        if fingerprint is None:
+            return SchemaIndex.build(schema)
+        
+        index = self._schema_indexes.get(fingerprint.root)
+        if index is None:
+            index = SchemaIndex.build(schema)
+            self._schema_indexes.put(fingerprint.root, index)
+        return index
+    
+    def _prepare_version(
+        self,
+        schema: Dict[str, Any],
+        base_schema: Dict[str, Any],
+        base_fingerprint: SchemaFingerprint
+    ) -> SchemaFingerprint:
+        """Fingerprint and validate a schema, reusing work done for its predecessor"""
+        try:
+            fingerprint, changed_tables = fingerprint_schema_incremental(
+                schema, base_schema, base_fingerprint
+            )
+        except (KeyError, TypeError, AttributeError, ValueError):
+            # Malformed; full validation reports the error
+            return self._prepare_schema(schema)
+        
+        self.schema_validator.validate_incremental_sync(
+            schema, changed_tables, fingerprint.root
+        )
+        return fingerprint
+    
+    def _evolve(
+        self,
+        versions: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[SchemaFingerprint], List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Evolution stage: diff consecutive versions and the first against the last
+        
+        Versions are diffed through their SchemaIndex; only the first,
+        previous and current index are needed at any time.
+        """
+        fingerprints: List[SchemaFingerprint] = []
+        steps: List[Dict[str, Any]] = []
+        first = previous = None
+        
+        for index, schema in enumerate(versions):
+            check_cancelled()
+            if previous is None:
+                fingerprint = self._prepare_schema(schema)
+            else:
+                fingerprint = self._prepare_version(schema, previous[0], previous[2])
+            fingerprints.append(fingerprint)
+            
+            current = (schema, self._schema_index(schema, fingerprint), fingerprint)
+            
+            if previous is not None:
+                step_changes = self._generate_diff(
+                    previous[1], current[1], previous[2], current[2]
+                )
+                steps.append({
+                    'from_version': index - 1,
+                    'to_version': index,
+                    'changes': step_changes,
+                    'impact': self._analyze_impact(step_changes),
+                })
+            else:
+                first = current
+            previous = current
+        
+        changes = self._generate_diff(first[1], previous[1], first[2], previous[2])
+        return fingerprints, steps, changes, self._analyze_impact(changes)
+    
+    def _generate_diff(
+        self,
+        old_schema: Union[Dict[str, Any], SchemaIndex],
+        new_schema: Union[Dict[str, Any], SchemaIndex],
+        old_fingerprint: Optional[SchemaFingerprint],
+        new_fingerprint: Optional[SchemaFingerprint]
+    ) -> List[Dict[str, Any]]:
+        """Diff stage"""
+        return self.diff_generator.generate_diff_sync(
+            self._schema_index(old_schema, old_fingerprint),
+            self._schema_index(new_schema, new_fingerprint),
+            old_fingerprint,
+            new_fingerprint
+        )
+    
+    def _analyze_impact(self, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Impact analysis stage"""
+        return self.impact_analyzer.analyze_impact_sync(changes)
+    
+    def _validate_queries(
+        self,
+        queries: List[str],
+        schema: Dict[str, Any],
+        fingerprint: Optional[SchemaFingerprint] = None
+    ) -> List[Dict[str, Any]]:
+        """Query validation stage"""
+        return self.query_validator.validate_queries_sync(
+            queries, self._schema_index(schema, fingerprint)
+        )
+    
+    def _find_affected_queries(
+        self,
+        queries: List[str],
+        changes: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Index the request's queries and look up those affected by changes"""
+        index = QueryIndex(self.query_validator)
+        index.add_queries(queries)
+        return index.affected_queries(changes)
+    
     async def _generate_recommendations(
         self,
         changes: List[Dict[str, Any]],
@@ -110,6 +585,22 @@ class SchemaAnalyzer:
                     'description': f"Backup data from table before removal: {change['table']}",
                     'priority': 'high'
                 })
+            
+            elif change['type'] == 'table_renamed':
+                recommendations.append({
+                    'type': 'update_references',
+                    'description': (f"Update queries and views referencing renamed table: "
+                                  f"{change['old_table']} -> {change['table']}"),
+                    'priority': 'medium'
+                })
+            
+            elif change['type'] == 'column_renamed':
+                recommendations.append({
+                    'type': 'update_references',
+                    'description': (f"Update queries and views referencing renamed column: "
+                                  f"{change['table']}.{change['old_column']} -> {change['column']}"),
+                    'priority': 'medium'
+                })
         
         if impact.get('severity') == 'high':
             recommendations.append({
@@ -0,0 +1,356 @@
+"""HTTP service for Schema Evolution Analyzer"""
+
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional
+from urllib.parse import parse_qs
+import asyncio
+import math
+import os
+import uuid
+import jsonschema
+import structlog
+import yaml
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from .admission import (
+    AdmissionController, AdmissionRejected, RateLimited, RateLimiter, estimate_cost
+)
+from .analyze import SchemaAnalyzer
+from .jobs import JobQueue
+from .security import SecurityConfig, SecurityMiddleware
+from .storage import Serializer, StorageFactory, get_serializer
+
+logger = structlog.get_logger()
+
+# Lists longer than this are serialized and sent in pieces of this many items
+STREAM_CHUNK_ITEMS = 1000
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Load the analyzer YAML configuration"""
+    with open(path) as fh:
+        return yaml.safe_load(fh) or {}
+
+def iter_json(
+    document: Dict[str, Any],
+    serializer: Serializer,
+    chunk_items: int = STREAM_CHUNK_ITEMS
+) -> Iterator[bytes]:
+    """
+    Serialize a JSON object incrementally
+
+    Nested objects are walked key by key and long lists are emitted in
+    slices of chunk_items, so a large result is never held as one
+    serialized buffer.
+    """
+    yield b'{'
+    for index, (key, value) in enumerate(document.items()):
+        if index:
+            yield b','
+        yield serializer.dumps(key) + b':'
+        if isinstance(value, dict):
+            yield from iter_json(value, serializer, chunk_items)
+        elif isinstance(value, list) and len(value) > chunk_items:
+            yield b'['
+            for start in range(0, len(value), chunk_items):
+                if start:
+                    yield b','
+                # Strip the brackets of each serialized slice
+                yield serializer.dumps(value[start:start + chunk_items])[1:-1]
+            yield b']'
+        else:
+            yield serializer.dumps(value)
+    yield b'}'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the analyzer and storage shared by all requests of this worker"""
+    config = app.state.config
+    storage_config = config.get('storage')
+    if storage_config is None:
+        logger.warning("No storage configured; results are kept in memory")
+        storage_config = {'backend': 'memory'}
+
+    app.state.storage = await StorageFactory.create_storage(storage_config)
+    app.state.analyzer = SchemaAnalyzer(config, app.state.storage)
+    app.state.jobs = JobQueue(
+        app.state.analyzer, app.state.storage, config.get('jobs'), app.state.admission
+    )
+    app.state.jobs.start()
+    try:
+        yield
+    finally:
+        await app.state.jobs.close()
+        await app.state.analyzer.close()
+        await app.state.storage.close()
+        app.state.security.close()
+
+def create_app(config: Dict[str, Any]) -> FastAPI:
+    """
+    Build the ASGI application
+
+    Each server worker process creates one application, and with it one
+    SchemaAnalyzer (executor, caches, query index) and one storage pool.
+
+    Args:
+        config: Analyzer configuration
+
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="Schema Evolution Analyzer", lifespan=lifespan)
+    app.state.config = config
+
+    security = SecurityConfig(config['security'])
+    app.state.security = security
+    performance = config.get('performance', {})
+    middleware = SecurityMiddleware(
+        security, performance.get('max_payload_size', 10_000_000)
+    )
+    users: Dict[str, str] = config['security'].get('users', {})
+    rate_limiter = RateLimiter(
+        performance.get('rate_limit', 100), performance.get('rate_limit_burst')
+    )
+    # /token is unauthenticated and runs a password hash, so it is limited per client IP
+    token_rate_limiter = RateLimiter(
+        performance.get('token_rate_limit', 10), performance.get('token_rate_limit_burst')
+    )
+    admission = AdmissionController.from_config(performance)
+    app.state.admission = admission
+    serializer = get_serializer(config.get('storage', {}).get('serializer', 'auto'))
+
+    async def current_user(request: Request) -> Dict[str, Any]:
+        # An X-API-Key header takes precedence over a bearer token
+        api_key = request.headers.get(security.api_key_header.model.name)
+        if api_key is not None:
+            user = {'sub': security.verify_api_key(api_key), 'auth': 'api_key'}
+        else:
+            user = await security.verify_token(await security.oauth2_scheme(request))
+        rate_limiter.check(str(user.get('sub')))
+        return user
+
+    @app.exception_handler(AdmissionRejected)
+    async def admission_rejected(request: Request, exc: AdmissionRejected) -> JSONResponse:
+        return JSONResponse(
+            {'detail': str(exc)},
+            status_code=(status.HTTP_429_TOO_MANY_REQUESTS if isinstance(exc, RateLimited)
+                         else status.HTTP_503_SERVICE_UNAVAILABLE),
+            headers={'Retry-After': str(max(1, math.ceil(exc.retry_after)))}
+        )
+
+    def parse_analysis_request(body: bytes) -> Dict[str, Any]:
+        try:
+            payload = serializer.loads(body)
+            parsed = {
+                'old_schema': payload['old_schema'],
+                'new_schema': payload['new_schema'],
+                'queries': payload.get('queries'),
+                'priority': payload.get('priority', JobQueue.DEFAULT_PRIORITY),
+            }
+            queries = parsed['queries']
+            if queries is not None and not (
+                isinstance(queries, list) and all(isinstance(q, str) for q in queries)
+            ):
+                raise ValueError("queries must be a list of strings")
+            if parsed['priority'] not in JobQueue.PRIORITIES:
+                raise ValueError(f"Unsupported job priority: {parsed['priority']}")
+            return parsed
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid analysis request: {e}"
+            )
+
+    def parse_credentials(request: Request, body: bytes) -> Dict[str, str]:
+        try:
+            if request.headers.get('content-type', '').startswith('application/json'):
+                credentials = serializer.loads(body or b'{}')
+            else:
+                credentials = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Malformed credentials: {e}"
+            )
+        if not isinstance(credentials, dict):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Credentials must be an object"
+            )
+        username = credentials.get('username')
+        password = credentials.get('password', '')
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="username and password must be strings"
+            )
+        return {'username': username, 'password': password}
+
+    def stream(document: Dict[str, Any], status_code: int = status.HTTP_200_OK) -> StreamingResponse:
+        return StreamingResponse(
+            iter_json(document, serializer),
+            status_code=status_code,
+            media_type='application/json'
+        )
+
+    @app.post('/token')
+    async def token(request: Request) -> Dict[str, str]:
+        """Exchange username and password (form or JSON encoded) for a bearer token"""
+        token_rate_limiter.check(f"ip:{request.client.host if request.client else 'unknown'}")
+        credentials = parse_credentials(request, await middleware.read_body(request))
+
+        username = credentials['username']
+        hashed_password = users.get(username)
+        if hashed_password is None or not await security.verify_password_async(
+            credentials['password'], hashed_password
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return {
+            'access_token': security.create_access_token({'sub': username}),
+            'token_type': 'bearer'
+        }
+
+    @app.post('/analyze')
+    async def analyze(
+        request: Request,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> StreamingResponse:
+        """Analyze old_schema against new_schema, optionally validating queries"""
+        await middleware.validate_request(request)
+        payload = parse_analysis_request(await middleware.read_body(request))
+        old_schema = payload['old_schema']
+        new_schema = payload['new_schema']
+        queries: Optional[List[str]] = payload['queries']
+
+        session_id = uuid.uuid4().hex
+        analyzer: SchemaAnalyzer = request.app.state.analyzer
+        try:
+            async with admission.admit(estimate_cost(old_schema, new_schema, queries)):
+                result = await analyzer.analyze_schema_changes(
+                    old_schema, new_schema, queries, session_id=session_id
+                )
+        except jsonschema.ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid schema: {e.message}"
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Analysis timed out"
+            )
+
+        await request.app.state.storage.store_result(session_id, result)
+        logger.info("Analysis request completed", session_id=session_id, user=user.get('sub'))
+        return stream({'session_id': session_id, **result})
+
+    @app.post('/jobs', status_code=status.HTTP_202_ACCEPTED)
+    async def submit_job(
+        request: Request,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> Dict[str, str]:
+        """
+        Queue an analysis and return its session id at once
+
+        The request body is that of /analyze plus an optional priority,
+        interactive or batch (the default). Poll /jobs/{session_id} for the
+        status and /results/{session_id} for the result.
+        """
+        await middleware.validate_request(request)
+        payload = parse_analysis_request(await middleware.read_body(request))
+        try:
+            session_id = await request.app.state.jobs.submit(**payload)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        logger.info("Analysis job submitted", session_id=session_id,
+                   priority=payload['priority'], user=user.get('sub'))
+        return {'session_id': session_id, 'status': 'queued'}
+
+    @app.get('/jobs/{session_id}')
+    async def job_status(
+        request: Request,
+        session_id: str,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> Dict[str, Any]:
+        """Current status of a job"""
+        record = await request.app.state.jobs.status(session_id)
+        if record is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        return record
+
+    @app.delete('/jobs/{session_id}')
+    async def cancel_job(
+        request: Request,
+        session_id: str,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> Dict[str, Any]:
+        """Cancel a queued or running job"""
+        if not await request.app.state.jobs.cancel(session_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Job is not queued or running"
+            )
+        return {'session_id': session_id, 'cancelled': True}
+
+    @app.get('/results')
+    async def list_results(
+        request: Request,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> JSONResponse:
+        """Page through stored results, newest first"""
+        try:
+            page = await request.app.state.storage.list_results(min(limit, 1000), cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        for row in page['results']:
+            row['created_at'] = row['created_at'].isoformat()
+        return JSONResponse(page)
+
+    @app.get('/results/{session_id}')
+    async def get_result(
+        request: Request,
+        session_id: str,
+        fields: Optional[str] = None,
+        user: Dict[str, Any] = Depends(current_user)
+    ) -> StreamingResponse:
+        """
+        Fetch a stored result
+
+        fields, a comma separated list of dotted paths such as
+        impact.severity, limits the response to those parts.
+        """
+        storage = request.app.state.storage
+        if fields:
+            result = await storage.retrieve_fields(session_id, fields.split(','))
+        else:
+            result = await storage.retrieve_result(session_id)
+        if result is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Result not found")
+        return stream(result)
+
+    return app
+
+def create_app_from_env() -> FastAPI:
+    """Application factory reading the config path from SCHEMA_ANALYZER_CONFIG"""
+    return create_app(load_config(os.environ.get('SCHEMA_ANALYZER_CONFIG', 'config/analyzer.yaml')))
+
+def main() -> None:
+    """Serve the API with uvicorn using the server section of the config"""
+    import uvicorn
+
+    server = load_config(os.environ.get('SCHEMA_ANALYZER_CONFIG', 'config/analyzer.yaml')).get('server', {})
+    uvicorn.run(
+        'schema_analyzer.api:create_app_from_env',
+        factory=True,
+        host=server.get('host', '0.0.0.0'),
+        port=server.get('port', 8000),
+        workers=server.get('workers', 1),
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Command line interface for Schema Evolution Analyzer"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Any, BinaryIO, Iterator, Optional, Set, Tuple, Union
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import sqlparse
+import structlog
+import yaml
+from .analyze import SchemaAnalyzer
+from .introspection import IntrospectorFactory
+from .storage import Serializer, get_serializer
+
+logger = structlog.get_logger()
+
+# (pair id, old schema path, new schema path, optional queries path)
+Pair = Tuple[str, str, str, Optional[str]]
+
+class InvalidEntry:
+    """A manifest line that does not describe a pair; reported as a failed pair"""
+
+    __slots__ = ('pair_id', 'error')
+
+    def __init__(self, pair_id: str, error: str):
+        self.pair_id = pair_id
+        self.error = error
+
+OLD_SUFFIX = '.old'
+NEW_SUFFIX = '.new'
+QUERIES_SUFFIX = '.queries'
+SCHEMA_EXTENSIONS = ('.json', '.yaml', '.yml')
+QUERY_EXTENSIONS = ('.sql', '.json')
+
+# Per-process state of batch workers
+_worker_analyzer: Optional[SchemaAnalyzer] = None
+_worker_serializer: Optional[Serializer] = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def configure_logging(level: str) -> None:
+    """Log to stderr, keeping stdout free for results"""
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, level.upper())),
+        logger_factory=structlog.PrintLoggerFactory(sys.stderr),
+    )
+
+def load_document(path: str) -> Any:
+    """Load a JSON or YAML file"""
+    with open(path, 'rb') as fh:
+        if path.endswith('.json'):
+            return json.load(fh)
+        return yaml.safe_load(fh)
+
+def load_queries(path: str) -> List[str]:
+    """Load queries from a JSON list or from ;-separated statements in a .sql file"""
+    if path.endswith('.json'):
+        return load_document(path)
+    with open(path, encoding='utf-8') as fh:
+        return [statement for statement in sqlparse.split(fh.read()) if statement.strip()]
+
+def discover_pairs(directory: str) -> Iterator[Pair]:
+    """
+    Find schema pairs in a directory
+
+    A pair is <name>.old.<ext> and <name>.new.<ext> with ext json, yaml or
+    yml, plus an optional <name>.queries.sql or <name>.queries.json. Old
+    schemas without a new counterpart are skipped with a warning.
+    """
+    names: Set[str] = set(os.listdir(directory))
+    for filename in sorted(names):
+        stem, ext = os.path.splitext(filename)
+        if ext not in SCHEMA_EXTENSIONS or not stem.endswith(OLD_SUFFIX):
+            continue
+        name = stem[:-len(OLD_SUFFIX)]
+        new_file = next((name + NEW_SUFFIX + e for e in SCHEMA_EXTENSIONS
+                         if name + NEW_SUFFIX + e in names), None)
+        if new_file is None:
+            logger.warning("Skipping schema without a new version", path=filename)
+            continue
+        queries_file = next((name + QUERIES_SUFFIX + e for e in QUERY_EXTENSIONS
+                             if name + QUERIES_SUFFIX + e in names), None)
+        yield (
+            name,
+            os.path.join(directory, filename),
+            os.path.join(directory, new_file),
+            os.path.join(directory, queries_file) if queries_file else None,
+        )
+
+def read_manifest(path: str) -> Iterator[Union[Pair, InvalidEntry]]:
+    """
+    Read schema pairs from a manifest
+
+    The manifest has one JSON object per line with old and new paths, and
+    optional queries path and id; relative paths are resolved against the
+    manifest's directory. Lines are read lazily. A line that is not valid
+    JSON or lacks a path yields an InvalidEntry instead of a pair.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as fh:
+        for line_number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            pair_id = str(line_number)
+            try:
+                entry = json.loads(line)
+                pair_id = str(entry.get('id', line_number))
+                queries = entry.get('queries')
+                pair = (
+                    pair_id,
+                    os.path.join(base, entry['old']),
+                    os.path.join(base, entry['new']),
+                    os.path.join(base, queries) if queries else None,
+                )
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning("Invalid manifest line", line=line_number, error=str(e))
+                yield InvalidEntry(
+                    pair_id, f"Invalid manifest line {line_number}: {type(e).__name__}: {e}"
+                )
+                continue
+            yield pair
+
+def _init_worker(config: Dict[str, Any], log_level: str) -> None:
+    """Create the analyzer of a batch worker process"""
+    global _worker_analyzer, _worker_serializer, _worker_loop
+    configure_logging(log_level)
+    worker_config = dict(config)
+    # The batch pool already provides the parallelism
+    worker_config['performance'] = {**config.get('performance', {}), 'executor': 'inline'}
+    _worker_analyzer = SchemaAnalyzer(worker_config)
+    _worker_serializer = get_serializer(config.get('storage', {}).get('serializer', 'auto'))
+    _worker_loop = asyncio.new_event_loop()
+
+def analyze_pair(pair: Pair) -> Tuple[bytes, float, bool]:
+    """
+    Analyze one pair inside a worker process
+
+    Files are loaded in the worker and the result is serialized there, so
+    only the finished NDJSON line crosses back to the parent.
+
+    Returns:
+        NDJSON line, analysis duration in seconds and whether it succeeded
+    """
+    pair_id, old_path, new_path, queries_path = pair
+    start_time = time.perf_counter()
+    try:
+        old_schema = load_document(old_path)
+        new_schema = load_document(new_path)
+        queries = load_queries(queries_path) if queries_path else None
+        result = _worker_loop.run_until_complete(
+            _worker_analyzer.analyze_schema_changes(old_schema, new_schema, queries)
+        )
+        record = {'id': pair_id, 'status': 'ok', 'result': result}
+        ok = True
+    except Exception as e:
+        record = {'id': pair_id, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+        ok = False
+    duration = time.perf_counter() - start_time
+    record['duration'] = duration
+    return _worker_serializer.dumps(record) + b'\n', duration, ok
+
+async def analyze_once(
+    config: Dict[str, Any],
+    old_schema: Dict[str, Any],
+    new_schema: Dict[str, Any],
+    queries: Optional[List[str]]
+) -> Dict[str, Any]:
+    """Analyze a single pair with a short-lived analyzer"""
+    analyzer = SchemaAnalyzer(config)
+    try:
+        return await analyzer.analyze_schema_changes(old_schema, new_schema, queries)
+    finally:
+        await analyzer.close()
+
+async def snapshot_database(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Introspect the database described by the database config section"""
+    introspector = await IntrospectorFactory.create_introspector(config)
+    try:
+        return await introspector.snapshot()
+    finally:
+        await introspector.close()
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def run_batch(
+    pairs: Iterator[Union[Pair, InvalidEntry]],
+    output: BinaryIO,
+    config: Dict[str, Any],
+    workers: int,
+    max_in_flight: int,
+    log_level: str = 'warning'
+) -> Dict[str, Any]:
+    """
+    Analyze pairs on a process pool, writing results as they finish
+
+    At most max_in_flight pairs are submitted at a time and pairs are
+    pulled from the iterator only as slots free up, so memory use does not
+    grow with the number of pairs. Results are written in completion order.
+    An InvalidEntry is written as an error record and counted as failed
+    without being submitted.
+
+    Returns:
+        Throughput summary
+    """
+    durations: List[float] = []
+    failed = 0
+    invalid = 0
+    serializer = get_serializer(config.get('storage', {}).get('serializer', 'auto'))
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(config, log_level)
+    ) as pool:
+        in_flight: Set[Future] = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                pair = next(pairs, None)
+                if pair is None:
+                    exhausted = True
+                elif isinstance(pair, InvalidEntry):
+                    record = {'id': pair.pair_id, 'status': 'error', 'error': pair.error}
+                    output.write(serializer.dumps(record) + b'\n')
+                    invalid += 1
+                else:
+                    in_flight.add(pool.submit(analyze_pair, pair))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                line, duration, ok = future.result()
+                output.write(line)
+                durations.append(duration)
+                failed += not ok
+            output.flush()
+
+    elapsed = time.perf_counter() - start_time
+    pairs_seen = len(durations) + invalid
+    return {
+        'pairs': pairs_seen,
+        'failed': failed + invalid,
+        'elapsed': elapsed,
+        'pairs_per_second': pairs_seen / elapsed if elapsed else 0.0,
+        'p50': percentile(durations, 0.50) if durations else 0.0,
+        'p99': percentile(durations, 0.99) if durations else 0.0,
+    }
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    return (
+        f"{summary['pairs']} pairs ({summary['failed']} failed) in {summary['elapsed']:.2f} s: "
+        f"{summary['pairs_per_second']:.1f} pairs/s, "
+        f"p50 {summary['p50'] * 1000:.1f} ms, p99 {summary['p99'] * 1000:.1f} ms per pair"
+    )
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='schema-evolution-analyzer',
+                                     description="Analyze database schema changes")
+    parser.add_argument('--config', help="analyzer YAML configuration")
+    parser.add_argument('--log-level', default='warning',
+                        choices=['debug', 'info', 'warning', 'error'])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help="analyze one schema pair")
+    analyze.add_argument('old', help="old schema (JSON or YAML)")
+    analyze.add_argument('new', help="new schema (JSON or YAML)")
+    analyze.add_argument('--queries', help="queries (.sql or JSON list)")
+
+    snapshot = commands.add_parser(
+        'snapshot', help="write the schema of the configured database as JSON"
+    )
+    snapshot.add_argument('--output', '-o', help="write the schema here instead of stdout")
+
+    batch = commands.add_parser('batch', help="analyze many schema pairs in parallel")
+    batch.add_argument('source',
+                       help="directory of <name>.old/.new/.queries files, or NDJSON manifest")
+    batch.add_argument('--output', '-o', help="write NDJSON results here instead of stdout")
+    batch.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help="worker processes (default: CPU count)")
+    batch.add_argument('--max-in-flight', type=int,
+                       help="pairs submitted at once (default: 4 per worker)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_logging(args.log_level)
+    config: Dict[str, Any] = {}
+    if args.config:
+        with open(args.config) as fh:
+            config = yaml.safe_load(fh) or {}
+
+    if args.command == 'analyze':
+        queries = load_queries(args.queries) if args.queries else None
+        result = asyncio.run(analyze_once(
+            config, load_document(args.old), load_document(args.new), queries
+        ))
+        serializer = get_serializer(config.get('storage', {}).get('serializer', 'auto'))
+        sys.stdout.buffer.write(serializer.dumps(result) + b'\n')
+        return 0
+
+    if args.command == 'snapshot':
+        if 'database' not in config:
+            print("snapshot needs a config with a database section", file=sys.stderr)
+            return 2
+        schema = asyncio.run(snapshot_database(config['database']))
+        serializer = get_serializer(config.get('storage', {}).get('serializer', 'auto'))
+        if args.output:
+            with open(args.output, 'wb') as output:
+                output.write(serializer.dumps(schema))
+        else:
+            sys.stdout.buffer.write(serializer.dumps(schema) + b'\n')
+        return 0
+
+    pairs = discover_pairs(args.source) if os.path.isdir(args.source) else read_manifest(args.source)
+    max_in_flight = args.max_in_flight or 4 * args.workers
+    if args.output:
+        with open(args.output, 'wb') as output:
+            summary = run_batch(pairs, output, config, args.workers, max_in_flight, args.log_level)
+    else:
+        summary = run_batch(pairs, sys.stdout.buffer, config, args.workers, max_in_flight,
+                            args.log_level)
+
+    print(format_summary(summary), file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
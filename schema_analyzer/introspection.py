@@ -0,0 +1,274 @@
+"""Live database catalog introspection for Schema Evolution Analyzer"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Type
+import asyncio
+import sqlite3
+import time
+import asyncpg
+import structlog
+
+logger = structlog.get_logger()
+
+# All column constraints of the selected schemas, keyed by (table oid, attnum)
+_PG_CONSTRAINTS_SQL = '''
+    SELECT con.conrelid, key.attnum, pg_catalog.pg_get_constraintdef(con.oid, true)
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_namespace n ON n.oid = con.connamespace
+    CROSS JOIN LATERAL unnest(con.conkey) AS key(attnum)
+    WHERE n.nspname = ANY($1::text[])
+      AND con.contype IN ('p', 'u', 'f', 'c', 'x')
+      AND con.conrelid <> 0
+    ORDER BY con.conrelid, key.attnum, con.conname
+'''
+
+# Columns of ordinary and partitioned tables in (attrelid, attnum) order, so
+# the scan follows pg_attribute's primary index and needs no sort
+_PG_COLUMNS_SQL = '''
+    SELECT a.attrelid, n.nspname, c.relname, a.attnum, a.attname,
+           pg_catalog.format_type(a.atttypid, a.atttypmod),
+           NOT a.attnotnull,
+           pg_catalog.pg_get_expr(d.adbin, d.adrelid)
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE n.nspname = ANY($1::text[])
+      AND c.relkind IN ('r', 'p')
+      AND NOT c.relispartition
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY a.attrelid, a.attnum
+'''
+
+_SQLITE_COLUMNS_SQL = '''
+    SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+    FROM sqlite_master m, pragma_table_info(m.name) p
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+    ORDER BY m.name, p.cid
+'''
+
+_SQLITE_FOREIGN_KEYS_SQL = '''
+    SELECT m.name, f."from", f."table", f."to"
+    FROM sqlite_master m, pragma_foreign_key_list(m.name) f
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+'''
+
+_SQLITE_UNIQUE_SQL = '''
+    SELECT m.name, i.name, c.name
+    FROM sqlite_master m, pragma_index_list(m.name) i, pragma_index_info(i.name) c
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+      AND i."unique" AND i.origin = 'u'
+    ORDER BY m.name, i.name, c.seqno
+'''
+
+def make_column(
+    name: str,
+    data_type: str,
+    nullable: bool,
+    default: Optional[str],
+    constraints: Optional[List[str]]
+) -> Dict[str, Any]:
+    """Build a column in the SchemaValidator.SCHEMA_DEFINITION shape"""
+    column: Dict[str, Any] = {'name': name, 'type': data_type, 'nullable': nullable}
+    # Optional keys are left out when empty, which keeps large snapshots small
+    if default is not None:
+        column['default'] = default
+    if constraints:
+        column['constraints'] = constraints
+    return column
+
+class CatalogIntrospector(ABC):
+    """Reads the schema of a live database into the analyzer's schema format"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+    async def initialize(self) -> None:
+        """Open connections"""
+
+    @abstractmethod
+    async def snapshot(self) -> Dict[str, Any]:
+        """
+        Read the current schema
+
+        Returns:
+            Schema with a tables list as accepted by SchemaAnalyzer
+        """
+
+    async def close(self) -> None:
+        """Release connections"""
+
+class PostgresIntrospector(CatalogIntrospector):
+    """
+    PostgreSQL catalog introspection
+
+    A snapshot is two catalog queries in one read-only repeatable read
+    transaction: all constraints of the selected schemas, then all columns,
+    streamed through a server-side cursor fetch_size rows at a time and
+    grouped into tables as they arrive. Tables outside default_schema are
+    named schema.table.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.schemas: List[str] = config.get('schemas', ['public'])
+        self.default_schema = config.get('default_schema', 'public')
+        self.fetch_size = config.get('fetch_size', 10000)
+        self.pool = None
+
+    async def initialize(self) -> None:
+        """Create a small connection pool from the database config section"""
+        self.pool = await asyncpg.create_pool(
+            host=self.config['host'],
+            port=self.config['port'],
+            user=self.config['user'],
+            password=self.config['password'],
+            database=self.config.get('name', self.config.get('database')),
+            min_size=1,
+            max_size=self.config.get('pool_max_size', 2),
+            timeout=self.config.get('connect_timeout', 60),
+            command_timeout=self.config.get('command_timeout')
+        )
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Read all tables of the configured schemas"""
+        start_time = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                constraints = await self._fetch_constraints(conn)
+                tables = await self._fetch_tables(conn, constraints)
+
+        logger.info("Introspected PostgreSQL catalog",
+                   num_tables=len(tables),
+                   duration=time.perf_counter() - start_time)
+        return {'tables': tables}
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _fetch_constraints(
+        self,
+        conn: asyncpg.Connection
+    ) -> Dict[Tuple[int, int], List[str]]:
+        constraints: Dict[Tuple[int, int], List[str]] = {}
+        for relid, attnum, definition in await conn.fetch(_PG_CONSTRAINTS_SQL, self.schemas):
+            constraints.setdefault((relid, attnum), []).append(definition)
+        return constraints
+
+    async def _fetch_tables(
+        self,
+        conn: asyncpg.Connection,
+        constraints: Dict[Tuple[int, int], List[str]]
+    ) -> List[Dict[str, Any]]:
+        tables: List[Dict[str, Any]] = []
+        current_relid = None
+        columns: List[Dict[str, Any]] = []
+        async for relid, schema, table, attnum, name, data_type, nullable, default in conn.cursor(
+            _PG_COLUMNS_SQL, self.schemas, prefetch=self.fetch_size
+        ):
+            if relid != current_relid:
+                current_relid = relid
+                columns = []
+                tables.append({
+                    'name': table if schema == self.default_schema else f"{schema}.{table}",
+                    'columns': columns
+                })
+            columns.append(make_column(
+                name, data_type, nullable, default, constraints.get((relid, attnum))
+            ))
+        return tables
+
+class SQLiteIntrospector(CatalogIntrospector):
+    """
+    SQLite introspection
+
+    Columns, foreign keys and unique constraints are each read with one
+    query joining sqlite_master to the pragma table-valued functions. The
+    database file is opened read-only on a worker thread.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.path = config['path']
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Read all tables of the database"""
+        start_time = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        tables = await loop.run_in_executor(None, self._read_tables)
+        logger.info("Introspected SQLite database",
+                   num_tables=len(tables),
+                   duration=time.perf_counter() - start_time)
+        return {'tables': tables}
+
+    def _read_tables(self) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            constraints: Dict[Tuple[str, str], List[str]] = {}
+            for table, column, target, target_column in conn.execute(_SQLITE_FOREIGN_KEYS_SQL):
+                constraints.setdefault((table, column), []).append(
+                    f"FOREIGN KEY REFERENCES {target}({target_column})"
+                    if target_column else f"FOREIGN KEY REFERENCES {target}"
+                )
+            self._add_unique(constraints, conn.execute(_SQLITE_UNIQUE_SQL))
+
+            tables: List[Dict[str, Any]] = []
+            current_table = None
+            columns: List[Dict[str, Any]] = []
+            for table, name, data_type, notnull, default, pk in conn.execute(_SQLITE_COLUMNS_SQL):
+                if table != current_table:
+                    current_table = table
+                    columns = []
+                    tables.append({'name': table, 'columns': columns})
+                column_constraints = constraints.get((table, name), [])
+                if pk:
+                    column_constraints.insert(0, 'PRIMARY KEY')
+                columns.append(make_column(
+                    name, data_type, not (notnull or pk), default, column_constraints
+                ))
+            return tables
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _add_unique(
+        constraints: Dict[Tuple[str, str], List[str]],
+        rows: Iterable[Tuple[str, str, str]]
+    ) -> None:
+        """Attach UNIQUE (col, ...) to every column of each unique constraint"""
+        index_columns: Dict[Tuple[str, str], List[str]] = {}
+        for table, index, column in rows:
+            index_columns.setdefault((table, index), []).append(column)
+        for (table, _), columns in index_columns.items():
+            definition = f"UNIQUE ({', '.join(columns)})"
+            for column in columns:
+                constraints.setdefault((table, column), []).append(definition)
+
+class IntrospectorFactory:
+    """Factory for creating catalog introspectors"""
+
+    INTROSPECTORS: Dict[str, Type[CatalogIntrospector]] = {
+        'postgresql': PostgresIntrospector,
+        'sqlite': SQLiteIntrospector,
+    }
+
+    @staticmethod
+    async def create_introspector(config: Dict[str, Any]) -> CatalogIntrospector:
+        """
+        Create and initialize an introspector for the database config section
+
+        The database is chosen by the 'type' key: postgresql (the default)
+        or sqlite.
+        """
+        database_type = config.get('type', 'postgresql')
+
+        introspector_cls = IntrospectorFactory.INTROSPECTORS.get(database_type)
+        if introspector_cls is None:
+            raise ValueError(f"Unsupported database type: {database_type}")
+
+        introspector = introspector_cls(config)
+        await introspector.initialize()
+        return introspector
@@ -0,0 +1,257 @@
+"""Background analysis jobs for Schema Evolution Analyzer"""
+
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import functools
+import itertools
+import time
+import uuid
+import structlog
+from .admission import AdmissionController, Overloaded
+from .analyze import SchemaAnalyzer
+from .metrics import JOB_OUTCOMES, JOB_QUEUE_DEPTH, JOB_RUN_TIME, JOB_WAIT_TIME
+from .storage import StorageBackend
+
+logger = structlog.get_logger()
+
+class Job:
+    """A submitted analysis and its in-process state"""
+
+    __slots__ = (
+        'job_id', 'priority', 'old_schema', 'new_schema', 'queries',
+        'submitted_at', 'enqueued', 'task', 'cancelled', 'stages', 'stage_starts',
+        'status_lock'
+    )
+
+    def __init__(
+        self,
+        job_id: str,
+        priority: str,
+        old_schema: Dict[str, Any],
+        new_schema: Dict[str, Any],
+        queries: Optional[List[str]]
+    ):
+        self.job_id = job_id
+        self.priority = priority
+        self.old_schema = old_schema
+        self.new_schema = new_schema
+        self.queries = queries
+        self.submitted_at = datetime.utcnow()
+        self.enqueued = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        # Progress through the pipeline, in stage start order
+        self.stages: List[Dict[str, Any]] = []
+        self.stage_starts: List[float] = []
+        # Status writes are serialized so the latest record is stored last
+        self.status_lock = asyncio.Lock()
+
+class JobQueue:
+    """
+    Priority queue of analyses run by a bounded pool of worker tasks
+
+    submit() returns at once with the job id. The job's status record is
+    written to the storage backend as a 'job' document as it moves through
+    queued, running and one of completed, failed, timed_out or cancelled,
+    and again as each pipeline stage of a running job starts and completes;
+    its stages list records each stage's status, start time and duration.
+    Cancelling a job or hitting its timeout stops its stages too (see
+    SchemaAnalyzer._run_stage), unless another analysis is waiting for the
+    same cached result (see ResultCache). The analysis result is stored under the job
+    id itself, so it can be polled with retrieve_result. Interactive jobs
+    are always dequeued before batch jobs; within a class jobs run in
+    submission order. Analyses are bounded by performance.request_timeout
+    through the analyzer.
+    """
+
+    STATUS_KIND = 'job'
+
+    # Lower values are dequeued first
+    PRIORITIES = {'interactive': 0, 'batch': 1}
+
+    # Priority of jobs submitted without one, here and over HTTP
+    DEFAULT_PRIORITY = 'batch'
+
+    def __init__(
+        self,
+        analyzer: SchemaAnalyzer,
+        storage: StorageBackend,
+        config: Optional[Dict[str, Any]] = None,
+        admission: Optional[AdmissionController] = None
+    ):
+        config = config or {}
+        self.analyzer = analyzer
+        self.storage = storage
+        # Woken when a job finishes, as requests may be waiting for its capacity
+        self.admission = admission
+        self.workers = config.get('workers', 2)
+        self.max_pending = config.get('max_pending', 1000)
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, Job]]" = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._depth = {priority: 0 for priority in self.PRIORITIES}
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if not self._worker_tasks:
+            self._worker_tasks = [
+                asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+            ]
+
+    async def close(self) -> None:
+        """Cancel running and queued jobs and stop the workers"""
+        for job in list(self._jobs.values()):
+            await self.cancel(job.job_id)
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(
+        self,
+        old_schema: Dict[str, Any],
+        new_schema: Dict[str, Any],
+        queries: Optional[List[str]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        job_id: Optional[str] = None
+    ) -> str:
+        """
+        Queue an analysis
+
+        Args:
+            old_schema: Original database schema
+            new_schema: Modified database schema
+            queries: Optional list of SQL queries to validate
+            priority: interactive or batch (the default)
+            job_id: Optional caller supplied id; a random one by default
+
+        Returns:
+            Job id, which is also the session id of the stored result
+
+        Raises:
+            ValueError: If priority is unknown
+            Overloaded: If max_pending jobs are already queued
+        """
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Unsupported job priority: {priority}")
+        if len(self._jobs) >= self.max_pending:
+            JOB_OUTCOMES.labels(status='rejected').inc()
+            raise Overloaded("Job queue is full", 1.0)
+
+        job = Job(job_id or uuid.uuid4().hex, priority, old_schema, new_schema, queries)
+        self._jobs[job.job_id] = job
+        await self._set_status(job, 'queued')
+        self._queue.put_nowait((self.PRIORITIES[priority], next(self._sequence), job))
+        self._update_depth(priority, 1)
+        return job.job_id
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Latest status record of a job, or None if it is unknown"""
+        return await self.storage.retrieve_document(self.STATUS_KIND, job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job of this process
+
+        Returns:
+            True if the job was still pending or running
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.cancelled:
+            return False
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued; the worker that dequeues it skips it
+            self._jobs.pop(job_id, None)
+            await self._set_status(job, 'cancelled')
+            JOB_OUTCOMES.labels(status='cancelled').inc()
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            self._update_depth(job.priority, -1)
+            try:
+                if not job.cancelled:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        JOB_WAIT_TIME.labels(priority=job.priority).observe(time.perf_counter() - job.enqueued)
+        await self._set_status(job, 'running')
+        if job.cancelled:
+            # Cancelled while the running status was written; don't leave it stale
+            await self._set_status(job, 'cancelled')
+            return
+        start_time = time.perf_counter()
+        error = None
+        job.task = asyncio.ensure_future(self.analyzer.analyze_schema_changes(
+            job.old_schema, job.new_schema, job.queries, session_id=job.job_id,
+            on_stage=functools.partial(self._on_stage, job)
+        ))
+        try:
+            result = await job.task
+            await self.storage.store_result(job.job_id, result)
+            status = 'completed'
+        except asyncio.CancelledError:
+            if not job.cancelled:
+                # The worker itself is being cancelled
+                raise
+            status = 'cancelled'
+        except asyncio.TimeoutError:
+            status = 'timed_out'
+        except Exception as e:
+            logger.error("Analysis job failed", job_id=job.job_id, error=str(e))
+            status, error = 'failed', f"{type(e).__name__}: {e}"
+        finally:
+            self._jobs.pop(job.job_id, None)
+            if self.admission is not None:
+                self.admission.wake()
+            JOB_RUN_TIME.labels(priority=job.priority).observe(time.perf_counter() - start_time)
+
+        JOB_OUTCOMES.labels(status=status).inc()
+        await self._set_status(job, status, error)
+
+    async def _on_stage(self, job: Job, stage: str, event: str) -> None:
+        """Record a stage starting or completing; storage failures don't fail the job"""
+        if event == 'started':
+            job.stages.append({
+                'stage': stage,
+                'status': 'running',
+                'started_at': datetime.utcnow().isoformat()
+            })
+            job.stage_starts.append(time.perf_counter())
+        else:
+            # Stages of the same name may run concurrently; complete the oldest
+            for entry, start in zip(job.stages, job.stage_starts):
+                if entry['stage'] == stage and entry['status'] == 'running':
+                    entry['status'] = 'completed'
+                    entry['duration'] = time.perf_counter() - start
+                    break
+        try:
+            await self._set_status(job, 'running')
+        except Exception as e:
+            logger.warning("Failed to record job progress", job_id=job.job_id, error=str(e))
+
+    async def _set_status(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        async with job.status_lock:
+            record = {
+                'job_id': job.job_id,
+                'status': status,
+                'priority': job.priority,
+                'submitted_at': job.submitted_at.isoformat(),
+                'updated_at': datetime.utcnow().isoformat(),
+                'stages': [dict(entry) for entry in job.stages],
+            }
+            if error is not None:
+                record['error'] = error
+            await self.storage.store_document(self.STATUS_KIND, job.job_id, record)
+
+    def _update_depth(self, priority: str, delta: int) -> None:
+        self._depth[priority] += delta
+        JOB_QUEUE_DEPTH.labels(priority=priority).set(self._depth[priority])
@@ -1,11 +1,16 @@
 """Logging configuration for Schema Evolution Analyzer"""
 
 import structlog
-from elasticsearch import AsyncElasticsearch
+from elasticsearch import Elasticsearch
 import sentry_sdk
-from typing import Dict, Any
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 import logging.config
 import json
+import sys
+import threading
+from .metrics import LOG_RECORDS
 
 def setup_logging(config: Dict[str, Any]) -> None:
     """Configure structured logging with ELK stack integration"""
@@ -37,6 +42,10 @@ def setup_logging(config: Dict[str, Any]) -> None:
     es_logger = ElasticsearchLogger(
         hosts=[config['elasticsearch_host']],
         index_prefix=config['elasticsearch_index_prefix'],
+        queue_size=config.get('elasticsearch_queue_size', 10000),
+        batch_size=config.get('elasticsearch_batch_size', 500),
+        flush_interval=config.get('elasticsearch_flush_interval', 1.0),
+        drop_policy=config.get('elasticsearch_drop_policy', 'drop_oldest'),
     )
     
     # Configure general logging
@@ -65,15 +74,87 @@ def setup_logging(config: Dict[str, Any]) -> None:
         },
     })
 
-class ElasticsearchLogger:
-    """Custom logger for Elasticsearch integration"""
+class _ShipperLogFilter(logging.Filter):
+    """
+    Rejects records caused by shipping logs
     
-    def __init__(self, hosts: list, index_prefix: str):
-        self.es = AsyncElasticsearch(hosts=hosts)
+    The Elasticsearch client logs every bulk request it sends; shipping
+    those records would cause another request, and so on forever. Records
+    of the client loggers are rejected, as is anything logged by a thread
+    while it sends a bulk request (e.g. by urllib3).
+    """
+    
+    CLIENT_LOGGERS = ('elasticsearch', 'elastic_transport')
+    
+    def __init__(self, shipping: threading.local):
+        super().__init__()
+        self.shipping = shipping
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(self.shipping, 'active', False):
+            return False
+        return not any(
+            record.name == name or record.name.startswith(name + '.')
+            for name in self.CLIENT_LOGGERS
+        )
+
+class ElasticsearchLogger(logging.Handler):
+    """
+    Logging handler shipping records to Elasticsearch in bulk
+    
+    emit() only converts the record to a document and appends it to a
+    bounded in-memory queue, so logging never waits on Elasticsearch. A
+    daemon thread sends queued documents with the bulk API whenever
+    batch_size documents are waiting or flush_interval seconds have passed.
+    
+    When the queue is full, drop_policy decides which record is lost:
+    'drop_oldest' evicts the oldest queued record, 'drop_newest' discards
+    the incoming one. Shipped, dropped and failed records are counted in
+    the shipped/dropped/failed attributes and in schema_log_records_total.
+    
+    Records of the Elasticsearch client loggers, and any record logged
+    while a bulk request is being sent, are not shipped.
+    """
+    
+    DROP_POLICIES = ('drop_oldest', 'drop_newest')
+    
+    def __init__(
+        self,
+        hosts: list,
+        index_prefix: str,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        drop_policy: str = 'drop_oldest',
+        client: Optional[Elasticsearch] = None
+    ):
+        super().__init__()
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unsupported drop policy: {drop_policy}")
+        self.es = client or Elasticsearch(hosts=hosts)
         self.index_prefix = index_prefix
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.shipped = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: deque = deque()
+        self._queue_lock = threading.Lock()
+        # Counts are updated by the shipper thread and by callers of flush()
+        self._count_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._shipper = threading.Thread(
+            target=self._run, name='elasticsearch-log-shipper', daemon=True)
+        # Set in whichever thread is sending a bulk request
+        self._shipping = threading.local()
+        self.addFilter(_ShipperLogFilter(self._shipping))
+        self._shipper.start()
     
-    async def emit(self, record: logging.LogRecord) -> None:
-        """Send log record to Elasticsearch"""
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue log record for shipping to Elasticsearch"""
         try:
             log_entry = {
                 'timestamp': record.created,
@@ -84,13 +165,90 @@ class ElasticsearchLogger:
                 'line_number': record.lineno,
             }
             
-            if hasattr(record, 'stack_info'):
+            if record.stack_info:
                 log_entry['stack_info'] = record.stack_info
-            
-            await self.es.index(
-                index=f"{self.index_prefix}-{record.created:%Y.%m.%d}",
-                document=log_entry
-            )
+        except Exception:
+            self.handleError(record)
+            return
+        
+        with self._queue_lock:
+            if len(self._queue) >= self.queue_size:
+                self._count_dropped()
+                if self.drop_policy == 'drop_newest':
+                    return
+                self._queue.popleft()
+            self._queue.append(log_entry)
+            pending = len(self._queue)
+        
+        if pending >= self.batch_size:
+            self._wakeup.set()
+    
+    def flush(self) -> None:
+        """Ship everything queued so far from the calling thread"""
+        while self._ship_batch():
+            pass
+    
+    def close(self) -> None:
+        """Stop the shipper thread and ship the remaining records"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._shipper.join(timeout=max(self.flush_interval, 1.0) * 5)
+        self.flush()
+        super().close()
+    
+    def _run(self) -> None:
+        """Shipper thread: ship on batch size or interval until closed"""
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._ship_batch() and not self._stopping.is_set():
+                pass
+    
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._queue_lock:
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+    
+    def _ship_batch(self) -> bool:
+        """Send one bulk request; returns whether a full batch was sent"""
+        batch = self._take_batch()
+        if not batch:
+            return False
+        
+        operations: List[Dict[str, Any]] = []
+        for log_entry in batch:
+            created = datetime.fromtimestamp(log_entry['timestamp'], timezone.utc)
+            operations.append({'index': {'_index': f"{self.index_prefix}-{created:%Y.%m.%d}"}})
+            operations.append(log_entry)
+        
+        self._shipping.active = True
+        try:
+            response = self.es.bulk(operations=operations)
         except Exception as e:
+            self._count('failed', len(batch))
             # Fallback to console logging if Elasticsearch is unavailable
-            print(f"Failed to log to Elasticsearch: {e}")
\ No newline at end of file
+            print(f"Failed to log to Elasticsearch: {e}", file=sys.stderr)
+            return len(batch) == self.batch_size
+        finally:
+            self._shipping.active = False
+        
+        failed = 0
+        if response.get('errors'):
+            failed = sum(
+                1 for item in response['items']
+                if next(iter(item.values())).get('error')
+            )
+        self._count('shipped', len(batch) - failed)
+        self._count('failed', failed)
+        return len(batch) == self.batch_size
+    
+    def _count_dropped(self) -> None:
+        # Called with _queue_lock held
+        self.dropped += 1
+        LOG_RECORDS.labels(outcome='dropped').inc()
+    
+    def _count(self, outcome: str, n: int) -> None:
+        if n:
+            with self._count_lock:
+                setattr(self, outcome, getattr(self, outcome) + n)
+            LOG_RECORDS.labels(outcome=outcome).inc(n)
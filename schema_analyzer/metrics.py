@@ -2,8 +2,10 @@
 
 from prometheus_client import Counter, Histogram, Gauge, start_http_server
 import time
+from contextlib import contextmanager
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Iterator, Optional
+from .tracing import span
 
 # Analysis metrics
 ANALYSIS_DURATION = Histogram(
@@ -23,16 +25,35 @@ ACTIVE_ANALYSES = Gauge(
     'Number of currently running analyses'
 )
 
+STAGE_DURATION = Histogram(
+    'schema_analysis_stage_duration_seconds',
+    'Time spent in each analysis pipeline stage',
+    ['stage'],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0]
+)
+
+ANALYSIS_SIZE = Gauge(
+    'schema_analysis_size',
+    'Size of the most recent analysis (tables, columns, changes, queries)',
+    ['dimension']
+)
+
 CACHE_SIZE = Gauge(
     'schema_analysis_cache_size',
     'Current size of the analysis cache'
 )
 
+CACHE_EVENTS = Counter(
+    'schema_analysis_cache_events_total',
+    'Total number of analysis cache events',
+    ['event', 'tier']
+)
+
 # Query metrics
 QUERY_PROCESSING_TIME = Histogram(
     'schema_query_processing_seconds',
     'Time spent processing individual queries',
-    buckets=[0.01, 0.05, 0.1, 0.5, 1.0]
+    buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0]
 )
 
 # Storage metrics
@@ -48,21 +69,100 @@ STORAGE_ERRORS = Counter(
     ['error_type']
 )
 
-def instrument_method(metric: Histogram) -> Callable:
-    """Decorator to instrument methods with Prometheus metrics"""
+STORAGE_DEAD_LETTERS = Counter(
+    'schema_storage_dead_letters_total',
+    'Total number of buffered writes given up on after repeated failures',
+    ['kind']
+)
+
+# Log shipping metrics
+LOG_RECORDS = Counter(
+    'schema_log_records_total',
+    'Total number of log records by shipping outcome',
+    ['outcome']
+)
+
+# Admission metrics
+ADMISSION_DECISIONS = Counter(
+    'schema_admission_decisions_total',
+    'Total number of rate limiter and admission controller decisions',
+    ['decision']
+)
+
+ADMISSION_WAIT = Histogram(
+    'schema_admission_wait_seconds',
+    'Time admitted requests spent queued for admission',
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0]
+)
+
+ADMISSION_INFLIGHT_COST = Gauge(
+    'schema_admission_inflight_cost',
+    'Estimated cost of the analyses currently admitted'
+)
+
+# Job queue metrics
+JOB_QUEUE_DEPTH = Gauge(
+    'schema_job_queue_depth',
+    'Number of analysis jobs waiting to run',
+    ['priority']
+)
+
+JOB_WAIT_TIME = Histogram(
+    'schema_job_wait_seconds',
+    'Time analysis jobs spent queued before running',
+    ['priority'],
+    buckets=[0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0]
+)
+
+JOB_RUN_TIME = Histogram(
+    'schema_job_run_seconds',
+    'Time spent running analysis jobs',
+    ['priority'],
+    buckets=[0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0]
+)
+
+JOB_OUTCOMES = Counter(
+    'schema_job_outcomes_total',
+    'Total number of analysis jobs by final status',
+    ['status']
+)
+
+def gauge_value(gauge: Gauge) -> float:
+    """Current value of an unlabeled gauge"""
+    return gauge.collect()[0].samples[0].value
+
+def instrument_method(metric: Histogram, active: Optional[Gauge] = None) -> Callable:
+    """
+    Decorator to instrument methods with Prometheus metrics
+    
+    Observes the call duration in metric, counts errors and wraps the call
+    in a tracing span. If active is given, it tracks in-flight calls.
+    """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            start_time = time.time()
-            ACTIVE_ANALYSES.inc()
+            start_time = time.perf_counter()
+            if active is not None:
+                active.inc()
             try:
-                result = await func(*args, **kwargs)
-                return result
+                with span(f"schema_analyzer.{func.__name__}"):
+                    return await func(*args, **kwargs)
             except Exception as e:
                 ANALYSIS_ERRORS.labels(error_type=type(e).__name__).inc()
                 raise
             finally:
-                ACTIVE_ANALYSES.dec()
-                metric.observe(time.time() - start_time)
+                if active is not None:
+                    active.dec()
+                metric.observe(time.perf_counter() - start_time)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into STAGE_DURATION inside a tracing span"""
+    start_time = time.perf_counter()
+    with span(f"schema_analyzer.stage.{stage}", stage=stage):
+        try:
+            yield
+        finally:
+            STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start_time)
\ No newline at end of file
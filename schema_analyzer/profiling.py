@@ -0,0 +1,234 @@
+"""Opt-in CPU and memory profiling of schema analyses"""
+
+from contextvars import ContextVar
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Awaitable, Callable, Optional
+import cProfile
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+import structlog
+from .storage import StorageBackend
+
+logger = structlog.get_logger()
+
+# Capture of the analysis running in the current task, if it is profiled
+_current_capture: ContextVar[Optional["ProfileCapture"]] = ContextVar(
+    'schema_analyzer_profile_capture', default=None
+)
+
+def current_capture() -> Optional["ProfileCapture"]:
+    """Profile capture of the analysis running in the current context"""
+    return _current_capture.get()
+
+def bind_capture(capture: Optional["ProfileCapture"]) -> None:
+    """Record the stages of the current context, usually a task of its own, into capture"""
+    _current_capture.set(capture)
+
+class ProfileCapture:
+    """CPU profile and stage timings collected for one analysis"""
+    
+    def __init__(self):
+        self.stats: Optional[pstats.Stats] = None
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    
+    def run(self, stage: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call func(*args) under cProfile and merge its profile into the capture
+        
+        cProfile only observes the thread it is enabled on, so each stage is
+        profiled in the thread that runs it, whichever executor that is.
+        """
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active on this thread
+            profiler = None
+        try:
+            return func(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - start_time
+            with self._lock:
+                self.stages.append({'stage': stage, 'duration': elapsed})
+                if profiler is not None:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profiler)
+                    else:
+                        self.stats.add(profiler)
+    
+    def merge(self, other: "ProfileCapture") -> None:
+        """Add the stages and CPU profile of another capture to this one"""
+        with other._lock:
+            stages = list(other.stages)
+            stats = other.stats
+            with self._lock:
+                self.stages.extend(stages)
+                if stats is not None:
+                    if self.stats is None:
+                        self.stats = pstats.Stats()
+                    self.stats.add(stats)
+    
+    def top_functions(self, limit: int) -> List[Dict[str, Any]]:
+        """Functions with the highest cumulative time"""
+        if self.stats is None:
+            return []
+        rows = []
+        for (filename, line, function), (_, ncalls, tottime, cumtime, _) in self.stats.stats.items():
+            rows.append({
+                'function': function,
+                'file': filename,
+                'line': line,
+                'calls': ncalls,
+                'total_time': tottime,
+                'cumulative_time': cumtime
+            })
+        rows.sort(key=lambda row: row['cumulative_time'], reverse=True)
+        return rows[:limit]
+
+class AnalysisProfiler:
+    """
+    Profiles a sample of analyses and stores the profiles
+    
+    A sample_rate fraction of analyses is profiled: pipeline stages run
+    under cProfile and, with trace_memory, tracemalloc records the peak
+    traced memory and the largest allocation sites. Profiles of analyses
+    that took at least threshold seconds are stored through the storage
+    backend as 'profile' documents keyed by session id; faster ones are
+    discarded. Setting sample_rate to 1.0 with a threshold captures every
+    slow analysis, at the cost of profiling overhead on all of them.
+    
+    Stages dispatched to a process pool are not profiled, and tracemalloc
+    is process-wide, so concurrent analyses share the memory figures of
+    overlapping captures. The tracemalloc snapshot and the profile summary
+    are taken in the event loop's default executor, and only for analyses
+    whose profile is kept.
+    """
+    
+    STORAGE_KIND = 'profile'
+    
+    def __init__(self, config: Dict[str, Any], storage: Optional[StorageBackend] = None):
+        self.sample_rate = config.get('sample_rate', 0.01)
+        self.threshold = config.get('threshold', 0.0)
+        self.top_n = config.get('top_n', 30)
+        self.trace_memory = config.get('trace_memory', True)
+        self.storage = storage
+        self._tracing = 0
+        # Whether the running trace was started here, and so may be stopped here
+        self._started_tracing = False
+        self._tracing_lock = threading.Lock()
+    
+    async def profile(
+        self,
+        analysis: Callable[[], Awaitable[Dict[str, Any]]],
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run analysis(), profiling it if it is sampled
+        
+        Args:
+            analysis: Factory of the analysis coroutine
+            session_id: Id to store the profile under; generated if omitted
+            
+        Returns:
+            Result of the analysis
+        """
+        if random.random() >= self.sample_rate:
+            return await analysis()
+        
+        capture = ProfileCapture()
+        token = _current_capture.set(capture)
+        self._start_memory_trace()
+        start_time = time.perf_counter()
+        try:
+            return await analysis()
+        finally:
+            duration = time.perf_counter() - start_time
+            _current_capture.reset(token)
+            # Snapshots of a large traced heap take long; keep them off the event loop
+            profile = await asyncio.get_running_loop().run_in_executor(
+                None, self._finish_capture, session_id or uuid.uuid4().hex, capture, duration
+            )
+            if profile is not None:
+                await self._store(profile)
+    
+    def _start_memory_trace(self) -> None:
+        if not self.trace_memory:
+            return
+        with self._tracing_lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            else:
+                tracemalloc.reset_peak()
+            self._tracing += 1
+    
+    def _finish_capture(
+        self,
+        session_id: str,
+        capture: ProfileCapture,
+        duration: float
+    ) -> Optional[Dict[str, Any]]:
+        """Stop the memory trace and build the profile, or None if it is not kept"""
+        keep = duration >= self.threshold
+        memory = self._stop_memory_trace(keep)
+        if not keep:
+            return None
+        return {
+            'session_id': session_id,
+            'captured_at': datetime.now(timezone.utc).isoformat(),
+            'duration': duration,
+            'stages': capture.stages,
+            'cpu': capture.top_functions(self.top_n),
+            'memory': memory
+        }
+    
+    def _stop_memory_trace(self, summarize: bool) -> Optional[Dict[str, Any]]:
+        """
+        Summarize traced memory if asked; stop tracing when no capture needs it
+        
+        A trace that was already running when the first capture started
+        belongs to someone else and is left running.
+        """
+        if not self.trace_memory:
+            return None
+        with self._tracing_lock:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:self.top_n] if summarize else []
+            self._tracing -= 1
+            if self._tracing == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        if not summarize:
+            return None
+        return {
+            'peak_bytes': peak,
+            'top_allocations': [
+                {
+                    'location': str(stat.traceback),
+                    'size_bytes': stat.size,
+                    'count': stat.count
+                }
+                for stat in top
+            ]
+        }
+    
+    async def _store(self, profile: Dict[str, Any]) -> None:
+        """Store a profile; failures are logged and never fail the analysis"""
+        session_id, duration = profile['session_id'], profile['duration']
+        logger.info("Captured analysis profile", session_id=session_id, duration=duration)
+        if self.storage is None:
+            return
+        try:
+            await self.storage.store_document(self.STORAGE_KIND, session_id, profile)
+        except Exception as e:
+            logger.warning("Failed to store analysis profile",
+                           session_id=session_id, error=str(e))
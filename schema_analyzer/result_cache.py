@@ -0,0 +1,243 @@
+"""Analysis result caching for Schema Evolution Analyzer"""
+
+from typing import Dict, List, Any, Awaitable, Callable, Optional, Tuple
+import asyncio
+import copy
+import time
+import structlog
+from .metrics import CACHE_EVENTS, CACHE_SIZE
+from .profiling import ProfileCapture
+from .storage import StorageBackend
+from .utils.cache import LRUCache
+from .utils.hashing import digest
+
+logger = structlog.get_logger()
+
+# Awaited with (stage, 'started' or 'completed') around each pipeline stage
+StageListener = Callable[[str, str], Awaitable[None]]
+
+# Produces a result given the flight's stage listener and profile capture
+Compute = Callable[[StageListener, Optional[ProfileCapture]], Awaitable[Dict[str, Any]]]
+
+class _Flight:
+    """A computation shared by the callers waiting for one key"""
+
+    def __init__(self, capture: Optional[ProfileCapture]):
+        self.task: Optional[asyncio.Future] = None
+        self.capture = capture
+        # Callers currently awaiting the task
+        self.waiters = 0
+        self.listeners: List[StageListener] = []
+        self.events: List[Tuple[str, str]] = []
+        self._lock = asyncio.Lock()
+
+    async def join(self, listener: StageListener) -> None:
+        """Replay the stage events emitted so far to listener and subscribe it"""
+        async with self._lock:
+            for stage, event in self.events:
+                await self._deliver(listener, stage, event)
+            self.listeners.append(listener)
+
+    def leave(self, listener: StageListener) -> None:
+        """Stop delivering stage events to listener"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    async def notify(self, stage: str, event: str) -> None:
+        """Deliver a stage event of the shared computation to every waiter"""
+        async with self._lock:
+            self.events.append((stage, event))
+            for listener in list(self.listeners):
+                await self._deliver(listener, stage, event)
+
+    @staticmethod
+    async def _deliver(listener: StageListener, stage: str, event: str) -> None:
+        # One waiter's failing listener must not fail the others' computation
+        try:
+            await listener(stage, event)
+        except Exception as e:
+            logger.warning("Stage listener failed", stage=stage, stage_event=event,
+                           error=str(e))
+
+class ResultCache:
+    """
+    Two-tier analysis result cache with single-flight coalescing
+
+    Results are kept in a size- and TTL-bounded in-memory LRU and, when a
+    storage backend is given, in the storage backend as a second tier.
+    Concurrent requests for the same key await a single computation.
+    Each caller gets its own deep copy of the result, so callers can modify
+    what they get without affecting the cache or each other.
+
+    The shared computation runs in a task of its own. It reports its stage
+    events through the flight rather than through its creator's context:
+    every waiting caller's listener receives them, and callers joining
+    late first get the events emitted so far. Likewise, when the creator
+    is profiled the computation records into a capture of its own, which
+    is merged into the capture of every profiled caller that receives its
+    result.
+
+    One caller's cancellation or timeout does not cancel the computation
+    for the others, but once every waiting caller has given up the
+    computation is cancelled too, which stops its running stages.
+    """
+
+    STORAGE_KIND = 'cache'
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        ttl: Optional[float] = None,
+        storage: Optional[StorageBackend] = None
+    ):
+        self.ttl = ttl
+        self.storage = storage
+        self._memory = LRUCache(max_size, ttl)
+        self._in_flight: Dict[str, _Flight] = {}
+        self._evictions = 0
+        self._expirations = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Combine hashes of the analysis inputs into a cache key"""
+        return digest('\n'.join(parts).encode('utf-8'))
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Compute,
+        listener: Optional[StageListener] = None,
+        capture: Optional[ProfileCapture] = None
+    ) -> Dict[str, Any]:
+        """
+        Return the cached result for key, computing it at most once
+
+        Args:
+            key: Cache key from make_key
+            compute: Coroutine factory producing the result on a miss; it
+                is called with the stage listener and profile capture the
+                computation should report to
+            listener: Optional stage listener of this caller
+            capture: Optional profile capture of this caller
+
+        Returns:
+            Deep copy of the analysis result
+        """
+        result = self._memory.get(key)
+        self._update_metrics()
+        if result is not None:
+            CACHE_EVENTS.labels(event='hit', tier='memory').inc()
+            return copy.deepcopy(result)
+        CACHE_EVENTS.labels(event='miss', tier='memory').inc()
+
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            CACHE_EVENTS.labels(event='coalesced', tier='memory').inc()
+        else:
+            flight = _Flight(ProfileCapture() if capture is not None else None)
+            flight.task = asyncio.ensure_future(self._load_or_compute(key, compute, flight))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda done: self._finish(key, flight))
+
+        flight.waiters += 1
+        try:
+            if listener is not None:
+                await flight.join(listener)
+            # Shield the shared computation so one caller's cancellation or
+            # timeout does not cancel it for the others
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if listener is not None:
+                flight.leave(listener)
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the result any more; later callers start afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+
+        if capture is not None and flight.capture is not None:
+            capture.merge(flight.capture)
+        return copy.deepcopy(result)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries"""
+        self._memory.clear()
+        self._update_metrics()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def _load_or_compute(
+        self,
+        key: str,
+        compute: Compute,
+        flight: _Flight
+    ) -> Dict[str, Any]:
+        """Consult the storage tier, then compute and populate both tiers"""
+        result = await self._load_from_storage(key)
+        if result is None:
+            result = await compute(flight.notify, flight.capture)
+            await self._store_in_storage(key, result)
+
+        self._memory.put(key, result)
+        self._update_metrics()
+        return result
+
+    async def _load_from_storage(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an unexpired entry from the storage tier"""
+        if self.storage is None:
+            return None
+
+        try:
+            entry = await self.storage.retrieve_document(self.STORAGE_KIND, key)
+        except Exception as e:
+            logger.warning("Result cache storage read failed", error=str(e))
+            return None
+
+        if entry is None or (self.ttl and time.time() - entry['cached_at'] > self.ttl):
+            CACHE_EVENTS.labels(event='miss', tier='storage').inc()
+            return None
+
+        CACHE_EVENTS.labels(event='hit', tier='storage').inc()
+        return entry['result']
+
+    async def _store_in_storage(self, key: str, result: Dict[str, Any]) -> None:
+        """Write an entry to the storage tier; failures only cost a future miss"""
+        if self.storage is None:
+            return
+
+        try:
+            await self.storage.store_document(
+                self.STORAGE_KIND,
+                key,
+                {'cached_at': time.time(), 'result': result}
+            )
+        except Exception as e:
+            logger.warning("Result cache storage write failed", error=str(e))
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        """Forget a completed computation and mark its exception as retrieved"""
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        """Stop handing flight to new callers, unless another one replaced it"""
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def _update_metrics(self) -> None:
+        """Export size and eviction deltas of the memory tier"""
+        # Expired entries would otherwise stay counted until looked up
+        # again; expire() only visits entries that are due
+        self._memory.expire()
+        evictions = self._memory.evictions
+        expirations = self._memory.expirations
+        if evictions > self._evictions:
+            CACHE_EVENTS.labels(event='eviction', tier='memory').inc(evictions - self._evictions)
+        if expirations > self._expirations:
+            CACHE_EVENTS.labels(event='expiration', tier='memory').inc(
+                expirations - self._expirations)
+        self._evictions = evictions
+        self._expirations = expirations
+        CACHE_SIZE.set(len(self._memory))
@@ -4,12 +4,27 @@ from fastapi import Security, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from starlette.requests import Request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import asyncio
+import hashlib
 import secrets
+import time
+from .utils.cache import LRUCache
 
 class SecurityConfig:
-    """Security configuration and utilities"""
+    """
+    Security configuration and utilities
+    
+    Verified tokens are cached until their exp claim (at most
+    token_cache_ttl seconds), so repeat callers skip signature
+    verification. bcrypt runs on a dedicated pool of
+    password_hash_workers threads, which also caps its concurrency.
+    API keys are looked up by SHA-256 digest: api_keys maps client
+    names to the hex digests of their keys, so keys are never stored.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         self.secret_key = config['secret_key']
@@ -18,6 +33,16 @@ class SecurityConfig:
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
         self.api_key_header = APIKeyHeader(name="X-API-Key")
+        self.token_cache_ttl = config.get('token_cache_ttl', 300)
+        self._verified_tokens = LRUCache(config.get('token_cache_size', 10000))
+        self._hash_executor = ThreadPoolExecutor(
+            max_workers=config.get('password_hash_workers', 2),
+            thread_name_prefix='password-hash'
+        )
+        # Digest -> client
+        self._api_keys: Dict[str, str] = {}
+        for client, key_digest in config.get('api_keys', {}).items():
+            self._api_keys[key_digest.lower()] = client
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify password against hash"""
@@ -27,6 +52,18 @@ class SecurityConfig:
         """Generate password hash"""
         return self.pwd_context.hash(password)
     
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password against hash on the password hashing pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._hash_executor, self.verify_password, plain_password, hashed_password
+        )
+    
+    async def get_password_hash_async(self, password: str) -> str:
+        """Generate password hash on the password hashing pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._hash_executor, self.get_password_hash, password)
+    
     def create_access_token(self, data: Dict[str, Any]) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
@@ -35,42 +72,120 @@ class SecurityConfig:
         return jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
     
     async def verify_token(self, token: str) -> Dict[str, Any]:
-        """Verify JWT token"""
+        """Verify JWT token, consulting the verified token cache first"""
+        now = time.time()
+        cached = self._verified_tokens.get(token)
+        if cached is not None:
+            expires_at, payload = cached
+            if expires_at > now:
+                return dict(payload)
+            self._verified_tokens.pop(token)
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        
+        expires_at = now + self.token_cache_ttl
+        if isinstance(payload.get('exp'), (int, float)):
+            expires_at = min(expires_at, payload['exp'])
+        self._verified_tokens.put(token, (expires_at, payload))
+        return dict(payload)
     
     def generate_api_key(self) -> str:
         """Generate secure API key"""
         return secrets.token_urlsafe(32)
+    
+    @staticmethod
+    def hash_api_key(api_key: str) -> str:
+        """Digest under which an API key is configured in api_keys"""
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    
+    def register_api_key(self, api_key: str, client: str) -> None:
+        """Accept api_key for client"""
+        self._api_keys[self.hash_api_key(api_key)] = client
+    
+    def verify_api_key(self, api_key: str) -> str:
+        """
+        Return the client owning api_key
+        
+        The digest lookup is the check. Only SHA-256 digests of keys are
+        compared, so any timing difference of the lookup reveals digest
+        bytes, from which no key can be recovered.
+        
+        Raises:
+            HTTPException: If the key is unknown
+        """
+        client = self._api_keys.get(self.hash_api_key(api_key))
+        if client is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid API key"
+            )
+        return client
+    
+    def close(self) -> None:
+        """Shut down the password hashing pool"""
+        self._hash_executor.shutdown(wait=False)
 
 class SecurityMiddleware:
     """Security middleware for request validation"""
     
-    def __init__(self, security_config: SecurityConfig):
+    def __init__(self, security_config: SecurityConfig, max_payload_size: int = 10_000_000):
         self.security_config = security_config
+        self.max_payload_size = max_payload_size
     
-    async def validate_request(self, request: dict) -> None:
-        """Validate incoming request for security concerns"""
-        # Validate input size
-        if len(str(request)) > 10_000_000:  # 10MB limit
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Request too large"
-            )
+    async def validate_request(self, request: Request) -> None:
+        """
+        Validate incoming request for security concerns
+        
+        Only headers are inspected; read_body enforces the size limit on
+        the body itself as it arrives.
+        """
+        # Validate declared input size
+        content_length = request.headers.get('content-length')
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid Content-Length"
+                )
+            if declared > self.max_payload_size:
+                self._too_large()
         
         # Validate content type
-        if 'content_type' not in request.headers or \
-           not request.headers['content_type'].startswith('application/json'):
+        if not request.headers.get('content-type', '').startswith('application/json'):
             raise HTTPException(
                 status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
                 detail="Unsupported media type"
             )
         
-        # Additional security checks can be added here
\ No newline at end of file
+        # Additional security checks can be added here
+    
+    async def read_body(self, request: Request) -> bytes:
+        """
+        Read the request body, failing as soon as it exceeds max_payload_size
+        
+        Chunked or mis-declared bodies are cut off once the limit is
+        crossed instead of being buffered whole.
+        """
+        chunks = []
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > self.max_payload_size:
+                self._too_large()
+            chunks.append(chunk)
+        return b''.join(chunks)
+    
+    def _too_large(self) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Request too large"
+        )
\ No newline at end of file
@@ -1,16 +1,412 @@
 """Storage implementation for Schema Evolution Analyzer"""
 
 from abc import ABC, abstractmethod
+import asyncio
 import asyncpg
-from typing import Dict, Any, Optional
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple, Type, Union
 import json
-from datetime import datetime
+import math
+import sqlite3
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 import structlog
+from .metrics import STORAGE_OPERATIONS, STORAGE_ERRORS, STORAGE_DEAD_LETTERS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression codec
+    zstandard = None
 
 logger = structlog.get_logger()
 
+# Hot statements are issued with fixed SQL text so asyncpg's per-connection
+# statement cache prepares each of them once and reuses the prepared form
+_UPSERT_RESULTS_SQL = '''
+    INSERT INTO analysis_results (session_id, result, result_compressed,
+                                  result_encoding, created_at, severity,
+                                  change_count, breaking_count)
+    SELECT * FROM unnest($1::text[], $2::jsonb[], $3::bytea[], $4::text[],
+                         $5::timestamptz[], $6::text[], $7::int[], $8::int[])
+    ON CONFLICT (session_id) DO UPDATE
+    SET result = EXCLUDED.result,
+        result_compressed = EXCLUDED.result_compressed,
+        result_encoding = EXCLUDED.result_encoding,
+        severity = EXCLUDED.severity,
+        change_count = EXCLUDED.change_count,
+        breaking_count = EXCLUDED.breaking_count
+'''
+
+_RETRIEVE_RESULT_SQL = '''
+    SELECT result, result_compressed, result_encoding
+    FROM analysis_results WHERE session_id = $1
+'''
+
+# Internal documents (cache entries, profiles, job status) live apart
+# from analysis results, so they never show up in result listings
+_UPSERT_DOCUMENT_SQL = '''
+    INSERT INTO analysis_documents (kind, key, document, updated_at)
+    VALUES ($1, $2, $3, NOW())
+    ON CONFLICT (kind, key) DO UPDATE
+    SET document = EXCLUDED.document,
+        updated_at = EXCLUDED.updated_at
+'''
+
+_RETRIEVE_DOCUMENT_SQL = 'SELECT document FROM analysis_documents WHERE kind = $1 AND key = $2'
+
+_SQLITE_UPSERT_RESULT_SQL = '''
+    INSERT INTO analysis_results (session_id, result, result_encoding, created_at,
+                                  severity, change_count, breaking_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (session_id) DO UPDATE
+    SET result = excluded.result,
+        result_encoding = excluded.result_encoding,
+        severity = excluded.severity,
+        change_count = excluded.change_count,
+        breaking_count = excluded.breaking_count
+'''
+
+_SQLITE_LIST_RESULTS_SQL = '''
+    SELECT session_id, created_at, severity, change_count, breaking_count
+    FROM analysis_results
+    ORDER BY created_at DESC, session_id DESC
+    LIMIT ?
+'''
+
+_SQLITE_LIST_RESULTS_AFTER_SQL = '''
+    SELECT session_id, created_at, severity, change_count, breaking_count
+    FROM analysis_results
+    WHERE (created_at, session_id) < (?, ?)
+    ORDER BY created_at DESC, session_id DESC
+    LIMIT ?
+'''
+
+_SQLITE_UPSERT_DOCUMENT_SQL = '''
+    INSERT INTO analysis_documents (kind, key, document, updated_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (kind, key) DO UPDATE
+    SET document = excluded.document,
+        updated_at = excluded.updated_at
+'''
+
+_SQLITE_INSERT_METRICS_SQL = 'INSERT INTO analysis_metrics (timestamp, metrics) VALUES (?, ?)'
+
+_SQLITE_UPSERT_ROLLUP_SQL = '''
+    INSERT INTO analysis_metrics_rollup AS r (resolution, bucket_start, count,
+                                              duration_sum, duration_max, errors, changes)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, bucket_start) DO UPDATE
+    SET count = r.count + excluded.count,
+        duration_sum = r.duration_sum + excluded.duration_sum,
+        duration_max = max(r.duration_max, excluded.duration_max),
+        errors = r.errors + excluded.errors,
+        changes = r.changes + excluded.changes
+'''
+
+_SQLITE_QUERY_ROLLUP_SQL = '''
+    SELECT bucket_start, count, duration_sum, duration_max, errors, changes
+    FROM analysis_metrics_rollup
+    WHERE resolution = ? AND bucket_start >= ? AND bucket_start < ?
+    ORDER BY bucket_start
+'''
+
+# Sub-paths are projected server-side; compressed rows are returned whole
+_RETRIEVE_FIELDS_SQL = '''
+    SELECT
+        CASE WHEN result_compressed IS NULL THEN (
+            SELECT jsonb_agg(result #> string_to_array(path, '.') ORDER BY n)
+            FROM unnest($2::text[]) WITH ORDINALITY AS p(path, n)
+        ) END AS fields,
+        result_compressed,
+        result_encoding
+    FROM analysis_results WHERE session_id = $1
+'''
+
+# Keyset pagination; the row comparison is served by the created_at index
+_LIST_RESULTS_SQL = '''
+    SELECT session_id, created_at, severity, change_count, breaking_count
+    FROM analysis_results
+    ORDER BY created_at DESC, session_id DESC
+    LIMIT $1
+'''
+
+_LIST_RESULTS_AFTER_SQL = '''
+    SELECT session_id, created_at, severity, change_count, breaking_count
+    FROM analysis_results
+    WHERE (created_at, session_id) < ($2, $3)
+    ORDER BY created_at DESC, session_id DESC
+    LIMIT $1
+'''
+
+# Rollups are additive, so batches can be merged into existing buckets
+_UPSERT_ROLLUP_SQL = '''
+    INSERT INTO analysis_metrics_rollup AS r (resolution, bucket_start, count,
+                                              duration_sum, duration_max, errors, changes)
+    SELECT * FROM unnest($1::text[], $2::timestamptz[], $3::bigint[], $4::float8[],
+                         $5::float8[], $6::bigint[], $7::bigint[])
+    ON CONFLICT (resolution, bucket_start) DO UPDATE
+    SET count = r.count + EXCLUDED.count,
+        duration_sum = r.duration_sum + EXCLUDED.duration_sum,
+        duration_max = GREATEST(r.duration_max, EXCLUDED.duration_max),
+        errors = r.errors + EXCLUDED.errors,
+        changes = r.changes + EXCLUDED.changes
+'''
+
+_QUERY_ROLLUP_SQL = '''
+    SELECT bucket_start, count, duration_sum, duration_max, errors, changes
+    FROM analysis_metrics_rollup
+    WHERE resolution = $1 AND bucket_start >= $2 AND bucket_start < $3
+    ORDER BY bucket_start
+'''
+
+# Unpartitioned metrics table of earlier versions
+_LEGACY_METRICS_TABLE = 'analysis_metrics'
+
+_LIST_METRICS_PARTITIONS_SQL = '''
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = 'analysis_metrics_raw'
+'''
+
+# JSONB binary wire format version prefix
+_JSONB_VERSION = b'\x01'
+
+class Serializer(ABC):
+    """Encodes stored documents as JSON bytes"""
+    
+    name = ''
+    
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """Serialize obj to UTF-8 encoded JSON"""
+        pass
+    
+    @abstractmethod
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """Deserialize UTF-8 encoded JSON"""
+        pass
+
+def _json_default(obj: Any) -> Any:
+    # ISO 8601 like orjson, so both serializers write the same dates
+    if isinstance(obj, (date, dt_time)):
+        return obj.isoformat()
+    return str(obj)
+
+class JsonSerializer(Serializer):
+    """Standard library json serializer"""
+    
+    name = 'json'
+    
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('utf-8')
+    
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+class OrjsonSerializer(Serializer):
+    """orjson serializer, available when orjson is installed"""
+    
+    name = 'orjson'
+    
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("orjson serializer requested but orjson is not installed")
+    
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+SERIALIZERS: Dict[str, Type[Serializer]] = {
+    JsonSerializer.name: JsonSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+}
+
+def get_serializer(name: str = 'auto') -> Serializer:
+    """
+    Create a serializer by name
+    
+    'auto' picks the fastest installed serializer. All serializers produce
+    plain JSON, so documents written by one are readable by the others.
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unsupported serializer: {name}")
+    return SERIALIZERS[name]()
+
+# Compression codecs by the name stored in result_encoding
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes, int], bytes], Callable[[bytes], bytes]]] = {
+    'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress),
+}
+
+if zstandard is not None:
+    COMPRESSORS['zstd'] = (
+        lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+class RawJSON(bytes):
+    """Already serialized JSON, passed through the JSONB codec unchanged"""
+
+ResultSummary = Tuple[Optional[str], Optional[int], Optional[int]]
+
+def summarize_result(result: Dict[str, Any]) -> ResultSummary:
+    """
+    Extract the list view summary of an analysis result
+    
+    Evolution results are summarized by their cumulative section. Documents
+    that are not analysis results (e.g. result cache entries) have no summary.
+    
+    Returns:
+        Tuple of severity, change count and breaking change count
+    """
+    summary = result.get('cumulative', result)
+    impact = summary.get('impact')
+    if not isinstance(impact, dict):
+        return None, None, None
+    return (
+        impact.get('severity'),
+        len(summary.get('changes', ())),
+        len(impact.get('breaking_changes', ()))
+    )
+
+def extract_path(document: Any, path: str) -> Any:
+    """
+    Return the value at a dotted path such as 'impact.severity'
+    
+    Numeric segments index into lists. Missing paths yield None, like the
+    JSONB #> operator.
+    """
+    value = document
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.lstrip('-').isdigit():
+            index = int(key)
+            value = value[index] if -len(value) <= index < len(value) else None
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+def encode_cursor(created_at: datetime, session_id: str) -> str:
+    """Opaque keyset pagination cursor for list_results"""
+    return f"{created_at.isoformat()}|{session_id}"
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor"""
+    created_at, _, session_id = cursor.partition('|')
+    try:
+        return datetime.fromisoformat(created_at), session_id
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+# Rollup resolutions and their bucket width in seconds
+ROLLUP_RESOLUTIONS = {'minute': 60, 'hour': 3600}
+
+# Raw metrics partition widths, keyed by the partition name suffix format
+# of earlier releases; partitions are now named by both of their bounds
+PARTITION_FORMATS = {'day': '%Y%m%d', 'hour': '%Y%m%d%H'}
+PARTITION_WIDTHS = {'day': timedelta(days=1), 'hour': timedelta(hours=1)}
+
+Rollup = List[Union[int, float]]
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """Start (UTC) of the rollup bucket containing timestamp"""
+    width = ROLLUP_RESOLUTIONS[resolution]
+    seconds = int(timestamp.timestamp()) // width * width
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+def rollup_metrics(
+    metrics: Iterable[Tuple[datetime, Dict[str, Any]]]
+) -> Dict[Tuple[str, datetime], Rollup]:
+    """
+    Aggregate metrics entries into per-minute and per-hour buckets
+    
+    The numeric 'duration' (seconds), 'errors' and 'changes' fields of each
+    entry are aggregated; missing fields count as zero. Entries with a
+    field that is not a finite, non-negative number are left out of the
+    rollups, so they cannot fail the batch they were written with.
+    
+    Returns:
+        Mapping of (resolution, bucket start) to
+        [count, duration_sum, duration_max, errors, changes]
+    """
+    rollups: Dict[Tuple[str, datetime], Rollup] = {}
+    skipped = 0
+    for timestamp, entry in metrics:
+        duration = _metric_value(entry, 'duration')
+        errors = _metric_value(entry, 'errors')
+        changes = _metric_value(entry, 'changes')
+        if duration is None or errors is None or changes is None:
+            skipped += 1
+            continue
+        errors, changes = int(errors), int(changes)
+        for resolution in ROLLUP_RESOLUTIONS:
+            rollup = rollups.setdefault(
+                (resolution, bucket_start(timestamp, resolution)), [0, 0.0, 0.0, 0, 0])
+            merge_rollup(rollup, [1, duration, duration, errors, changes])
+    
+    if skipped:
+        STORAGE_ERRORS.labels(error_type='invalid_metrics').inc(skipped)
+        logger.warning("Left invalid metrics entries out of the rollups", num_skipped=skipped)
+    return rollups
+
+def _metric_value(entry: Dict[str, Any], field: str) -> Optional[float]:
+    """A rollup field of a metrics entry, 0.0 if missing, None if invalid"""
+    value = entry.get(field)
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not math.isfinite(number) or number < 0:
+        return None
+    return number
+
+def merge_rollup(into: Rollup, other: Rollup) -> None:
+    """Add the other rollup's aggregates into into"""
+    into[0] += other[0]
+    into[1] += other[1]
+    into[2] = max(into[2], other[2])
+    into[3] += other[3]
+    into[4] += other[4]
+
+def rollup_row(bucket: datetime, rollup: Rollup) -> Dict[str, Any]:
+    """query_metrics row for a bucket"""
+    count, duration_sum, duration_max, errors, changes = rollup
+    return {
+        'bucket_start': bucket,
+        'count': count,
+        'duration_avg': duration_sum / count if count else 0.0,
+        'duration_max': duration_max,
+        'errors': errors,
+        'changes': changes
+    }
+
 class StorageBackend(ABC):
-    """Abstract base class for storage backends"""
+    """
+    Abstract base class for storage backends
+    
+    Besides analysis results and metrics, backends keep internal documents
+    (result cache entries, profiles, job status) by kind and key, apart
+    from the results: list_results and retrieve_result never see them.
+    """
     
     @abstractmethod
     async def store_result(self, session_id: str, result: Dict[str, Any]) -> None:
@@ -26,22 +422,455 @@ class StorageBackend(ABC):
     async def store_metrics(self, metrics: Dict[str, Any]) -> None:
         """Store analysis metrics"""
         pass
+    
+    @abstractmethod
+    async def store_document(self, kind: str, key: str, document: Dict[str, Any]) -> None:
+        """Store an internal document, replacing any previous one of that kind and key"""
+        pass
+    
+    @abstractmethod
+    async def retrieve_document(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an internal document"""
+        pass
+    
+    async def retrieve_fields(
+        self,
+        session_id: str,
+        paths: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve selected parts of an analysis result
+        
+        Args:
+            session_id: Result id
+            paths: Dotted paths into the result, e.g. 'impact.severity'
+        
+        Returns:
+            Mapping of each path to its value (None if absent), or None if
+            there is no such result
+        """
+        result = await self.retrieve_result(session_id)
+        if result is None:
+            return None
+        return {path: extract_path(result, path) for path in paths}
+    
+    @abstractmethod
+    async def list_results(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        List stored results, newest first, without loading the documents
+        
+        Args:
+            limit: Maximum number of results per page
+            cursor: next_cursor of the previous page
+        
+        Returns:
+            Dict with 'results' (session_id, created_at, severity,
+            change_count, breaking_count per entry) and 'next_cursor',
+            which is None on the last page
+        """
+        pass
+    
+    @abstractmethod
+    async def query_metrics(
+        self,
+        start: datetime,
+        end: datetime,
+        resolution: str = 'minute'
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregated metrics over a time window, read from rollups
+        
+        Args:
+            start: Window start (inclusive)
+            end: Window end (exclusive)
+            resolution: Bucket width, 'minute' or 'hour'
+        
+        Returns:
+            One row per non-empty bucket in time order, with bucket_start,
+            count, duration_avg, duration_max, errors and changes
+        """
+        pass
+    
+    async def apply_retention(self, now: Optional[datetime] = None) -> None:
+        """Drop raw metrics and rollups older than the configured retention"""
+        pass
+    
+    @staticmethod
+    def _check_resolution(resolution: str) -> None:
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+    
+    @staticmethod
+    def _page(rows: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+        """Build a list_results page from up to limit + 1 summary rows"""
+        results = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = results[-1]
+            next_cursor = encode_cursor(last['created_at'], last['session_id'])
+        return {'results': results, 'next_cursor': next_cursor}
+    
+    async def flush(self) -> None:
+        """Persist any buffered writes"""
+        pass
+    
+    async def close(self) -> None:
+        """Flush buffered writes and release resources"""
+        pass
 
-class PostgresStorage(StorageBackend):
-    """PostgreSQL storage backend"""
+class BufferedStorage(StorageBackend):
+    """
+    Base class for backends that serialize documents and write in batches
+    
+    With write-behind enabled (the default), results and metrics are
+    buffered and written by a background task in batches, either when
+    write_batch_size entries are pending or every write_flush_interval
+    seconds. Buffered results are visible to retrieve_result immediately,
+    and stay visible while a flush writes them until the write has
+    committed; close() flushes everything before releasing resources.
+    
+    An entry whose batch fails is written again on its own, so one entry the
+    database rejects does not hold back the rest of its batch. Entries that
+    keep failing are retried by later flushes and, after write_max_attempts
+    failed attempts, moved to the dead-letter store: the dead_letters deque
+    (the most recent dead_letter_size entries) and, with dead_letter_path
+    set, an NDJSON file.
+    
+    Subclasses implement _write_results and _write_metrics, and call
+    _start_writer once they are ready to accept writes.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.serializer = get_serializer(config.get('serializer', 'auto'))
+        self.compression = config.get('compression', 'zlib')
+        if self.compression not in COMPRESSORS and self.compression != 'none':
+            raise ValueError(f"Unsupported compression: {self.compression}")
+        # Serialized results at least this large are stored compressed
+        self.compression_threshold = config.get('compression_threshold', 65536)
+        self.compression_level = config.get('compression_level', 3)
+        self.write_behind = config.get('write_behind', True)
+        self.batch_size = config.get('write_batch_size', 500)
+        self.flush_interval = config.get('write_flush_interval', 0.5)
+        # Writers wait for a flush instead of buffering beyond this
+        self.max_pending = config.get('write_max_pending', self.batch_size * 10)
+        self.max_attempts = config.get('write_max_attempts', 3)
+        self.dead_letter_path = config.get('dead_letter_path')
+        self.dead_letters: deque = deque(maxlen=config.get('dead_letter_size', 1000))
+        self.raw_retention = timedelta(days=config.get('metrics_raw_retention_days', 7))
+        self.rollup_retention = timedelta(days=config.get('metrics_rollup_retention_days', 90))
+        self.retention_interval = config.get('metrics_retention_interval', 3600)
+        self._last_retention: Optional[float] = None
+        self._pending_results: Dict[str, Tuple[Dict[str, Any], datetime]] = {}
+        # Results taken by the running flush, until their write commits
+        self._writing_results: Dict[str, Tuple[Dict[str, Any], datetime]] = {}
+        self._pending_metrics: List[Tuple[datetime, Dict[str, Any]]] = []
+        # Entries that failed on their own, by number of failed attempts
+        self._result_attempts: Dict[str, int] = {}
+        self._failed_metrics: List[Tuple[int, Tuple[datetime, Dict[str, Any]]]] = []
+        self._flush_needed: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+    
+    async def store_result(self, session_id: str, result: Dict[str, Any]) -> None:
+        """Store analysis result"""
+        now = datetime.now(timezone.utc)
+        if not self.write_behind:
+            await self._write_results({session_id: (result, now)})
+            return
+        
+        self._pending_results[session_id] = (result, now)
+        # A new result replaces one that failed to write
+        self._result_attempts.pop(session_id, None)
+        await self._after_buffered_write()
+    
+    async def store_metrics(self, metrics: Dict[str, Any]) -> None:
+        """Store analysis metrics"""
+        entry = (datetime.now(timezone.utc), metrics)
+        if not self.write_behind:
+            await self._write_metrics([entry])
+            return
+        
+        self._pending_metrics.append(entry)
+        await self._after_buffered_write()
+    
+    def _buffered_result(self, session_id: str) -> Optional[Tuple[Dict[str, Any], datetime]]:
+        """Entry of a result that is buffered or being written, if any"""
+        entry = self._pending_results.get(session_id)
+        if entry is None:
+            entry = self._writing_results.get(session_id)
+        return entry
+    
+    async def flush(self) -> None:
+        """
+        Write all buffered results and metrics
+        
+        Fresh entries are written in batches; entries of a failed batch and
+        entries that failed before are written one at a time. Entries that
+        fail are kept for the next flush or dead-lettered, never re-raised.
+        """
+        async with self._flush_lock:
+            results, self._pending_results = self._pending_results, {}
+            self._writing_results = results
+            metrics, self._pending_metrics = self._pending_metrics, []
+            failed_metrics, self._failed_metrics = self._failed_metrics, []
+            
+            try:
+                retry = {sid: entry for sid, entry in results.items()
+                         if sid in self._result_attempts}
+                batch = {sid: entry for sid, entry in results.items()
+                         if sid not in self._result_attempts}
+                if batch:
+                    try:
+                        await self._write_results(batch)
+                    except Exception as e:
+                        logger.warning("Result batch failed, writing entries one at a time",
+                                       num_results=len(batch), error=str(e))
+                        retry.update(batch)
+                    else:
+                        for session_id in batch:
+                            self._writing_results.pop(session_id, None)
+                for session_id, entry in retry.items():
+                    await self._write_result_alone(session_id, entry)
+            finally:
+                # A flush interrupted mid-write keeps what it has not written
+                for session_id, entry in self._writing_results.items():
+                    self._pending_results.setdefault(session_id, entry)
+                self._writing_results = {}
+            
+            if metrics:
+                try:
+                    await self._write_metrics(metrics)
+                except Exception as e:
+                    logger.warning("Metrics batch failed, writing entries one at a time",
+                                   num_metrics=len(metrics), error=str(e))
+                    failed_metrics.extend((0, entry) for entry in metrics)
+            for attempts, entry in failed_metrics:
+                await self._write_metrics_alone(attempts, entry)
+        
+        await self._maybe_apply_retention()
+    
+    async def _write_result_alone(
+        self,
+        session_id: str,
+        entry: Tuple[Dict[str, Any], datetime]
+    ) -> None:
+        """Write one result; keep it for a later flush or dead-letter it on failure"""
+        try:
+            await self._write_results({session_id: entry})
+        except Exception as e:
+            self._writing_results.pop(session_id, None)
+            # Results stored while flushing are newer; keep those
+            if session_id in self._pending_results:
+                return
+            attempts = self._result_attempts.pop(session_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self._dead_letter('result', session_id, entry, e)
+            else:
+                self._result_attempts[session_id] = attempts
+                self._pending_results[session_id] = entry
+        else:
+            self._writing_results.pop(session_id, None)
+            self._result_attempts.pop(session_id, None)
+    
+    async def _write_metrics_alone(self, attempts: int, entry: Tuple[datetime, Dict[str, Any]]) -> None:
+        """Write one metrics entry; keep it for a later flush or dead-letter it on failure"""
+        try:
+            await self._write_metrics([entry])
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self._dead_letter('metrics', entry[0].isoformat(), entry, e)
+            else:
+                self._failed_metrics.append((attempts, entry))
+    
+    def _dead_letter(self, kind: str, key: str, entry: Tuple[Any, Any], error: Exception) -> None:
+        """Give up on a buffered write, keeping it in the dead-letter store"""
+        first, second = entry
+        document, timestamp = (first, second) if kind == 'result' else (second, first)
+        record = {
+            'kind': kind,
+            'key': key,
+            'timestamp': timestamp.isoformat(),
+            'error': f"{type(error).__name__}: {error}",
+            'document': document
+        }
+        self.dead_letters.append(record)
+        STORAGE_DEAD_LETTERS.labels(kind=kind).inc()
+        logger.error("Buffered write moved to the dead-letter store",
+                     kind=kind, key=key, error=record['error'])
+        
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+            except (OSError, TypeError, ValueError) as e:
+                logger.error("Could not write dead-letter file",
+                             path=self.dead_letter_path, error=str(e))
+    
+    async def _drain(self) -> None:
+        """Final flush: dead-letter whatever still fails to write"""
+        await self.flush()
+        for session_id in list(self._result_attempts):
+            entry = self._pending_results.pop(session_id, None)
+            if entry is not None:
+                self._dead_letter('result', session_id, entry, RuntimeError('storage closed'))
+        self._result_attempts.clear()
+        for _, entry in self._failed_metrics:
+            self._dead_letter('metrics', entry[0].isoformat(), entry, RuntimeError('storage closed'))
+        self._failed_metrics = []
+    
+    async def query_metrics(
+        self,
+        start: datetime,
+        end: datetime,
+        resolution: str = 'minute'
+    ) -> List[Dict[str, Any]]:
+        """Aggregated metrics over a time window, read from rollups"""
+        self._check_resolution(resolution)
+        await self.flush()
+        rows = await self._read_rollups(resolution, start, end)
+        return [rollup_row(bucket, list(rollup)) for bucket, *rollup in rows]
+    
+    async def _maybe_apply_retention(self) -> None:
+        """Run apply_retention at most once per retention_interval"""
+        now = time.monotonic()
+        if self._last_retention is not None and now - self._last_retention < self.retention_interval:
+            return
+        self._last_retention = now
+        try:
+            await self.apply_retention()
+        except Exception as e:
+            logger.error("Metrics retention failed", error=str(e))
+    
+    def _start_writer(self) -> None:
+        """Create the flush primitives and start the background writer"""
+        self._flush_needed = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        if self.write_behind:
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+    
+    async def _stop_writer(self) -> None:
+        """Cancel the background writer"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+    
+    def _decode_result(self, data: bytes, encoding: Optional[str]) -> Any:
+        """Inverse of _encode_result for a stored payload"""
+        if encoding is not None:
+            _, decompress = COMPRESSORS[encoding]
+            data = decompress(data)
+        return self.serializer.loads(data)
+    
+    def _encode_result(
+        self,
+        result: Dict[str, Any]
+    ) -> Tuple[Optional[RawJSON], Optional[bytes], Optional[str]]:
+        """Serialize a result once; compress it when above the threshold"""
+        data = self.serializer.dumps(result)
+        if self.compression == 'none' or len(data) < self.compression_threshold:
+            return RawJSON(data), None, None
+        compress, _ = COMPRESSORS[self.compression]
+        return None, compress(data, self.compression_level), self.compression
+    
+    async def _after_buffered_write(self) -> None:
+        """Wake the writer when a batch is full; flush inline when far behind"""
+        pending = len(self._pending_results) + len(self._pending_metrics) + len(self._failed_metrics)
+        if pending >= self.max_pending:
+            await self.flush()
+        elif pending >= self.batch_size:
+            self._flush_needed.set()
+    
+    async def _flush_loop(self) -> None:
+        """Background writer flushing on batch size or interval"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Storage flush failed", error=str(e))
+    
+    @abstractmethod
+    async def _write_results(self, results: Dict[str, Tuple[Dict[str, Any], datetime]]) -> None:
+        """Upsert a batch of results"""
+        pass
+    
+    @abstractmethod
+    async def _write_metrics(self, metrics: List[Tuple[datetime, Dict[str, Any]]]) -> None:
+        """Append a batch of metrics rows and merge them into the rollups"""
+        pass
+    
+    @abstractmethod
+    async def _read_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[Any, ...]]:
+        """Rollup rows (bucket_start, count, duration_sum, duration_max, errors, changes)"""
+        pass
+
+class PostgresStorage(BufferedStorage):
+    """
+    PostgreSQL storage backend
+    
+    Raw metrics go to analysis_metrics_raw, range partitioned by timestamp
+    into daily (or hourly, see metrics_partition) partitions that are
+    created on demand and dropped whole once past metrics_raw_retention_days.
+    A new partition is clipped to the gap between its existing neighbours,
+    so changing metrics_partition while data exists never creates
+    overlapping ranges.
+    Each metrics batch also updates the per-minute and per-hour buckets of
+    analysis_metrics_rollup in the same transaction.
+    
+    Earlier versions kept metrics in an unpartitioned analysis_metrics
+    table. On initialize, its rows within metrics_rollup_retention_days are
+    moved into analysis_metrics_raw and the rollups, and the table is
+    renamed to analysis_metrics_legacy so it is only migrated once.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
         self.pool = None
+        self.partition = config.get('metrics_partition', 'day')
+        if self.partition not in PARTITION_FORMATS:
+            raise ValueError(f"Unsupported metrics partition: {self.partition}")
+        # Known raw partitions by name, with their [lower, upper) bounds
+        self._partitions: Dict[str, Tuple[datetime, datetime]] = {}
     
     async def initialize(self):
         """Initialize database connection pool"""
+        # connection_string is the documented setting; the separate keys
+        # override its parts when given
         self.pool = await asyncpg.create_pool(
-            host=self.config['host'],
-            port=self.config['port'],
-            user=self.config['user'],
-            password=self.config['password'],
-            database=self.config['database']
+            dsn=self.config.get('connection_string'),
+            host=self.config.get('host'),
+            port=self.config.get('port'),
+            user=self.config.get('user'),
+            password=self.config.get('password'),
+            database=self.config.get('database'),
+            min_size=self.config.get('pool_min_size', 10),
+            max_size=self.config.get('pool_max_size', 10),
+            timeout=self.config.get('connect_timeout', 60),
+            command_timeout=self.config.get('command_timeout'),
+            max_inactive_connection_lifetime=self.config.get(
+                'max_inactive_connection_lifetime', 300.0),
+            statement_cache_size=self.config.get('statement_cache_size', 100),
+            init=self._init_connection
         )
         
         # Create tables if they don't exist
@@ -54,56 +883,732 @@ class PostgresStorage(StorageBackend):
                 )
             ''')
             
+            # Large results are stored compressed instead of as JSONB
+            await conn.execute('''
+                ALTER TABLE analysis_results
+                    ADD COLUMN IF NOT EXISTS result_compressed BYTEA,
+                    ADD COLUMN IF NOT EXISTS result_encoding TEXT
+            ''')
+            
+            # Summary columns extracted at write time serve list views
+            await conn.execute('''
+                ALTER TABLE analysis_results
+                    ADD COLUMN IF NOT EXISTS severity TEXT,
+                    ADD COLUMN IF NOT EXISTS change_count INTEGER,
+                    ADD COLUMN IF NOT EXISTS breaking_count INTEGER
+            ''')
+            
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS analysis_results_created_at_idx
+                ON analysis_results (created_at DESC, session_id DESC)
+            ''')
+            
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_documents (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    document JSONB NOT NULL,
+                    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            ''')
+            
             await conn.execute('''
-                CREATE TABLE IF NOT EXISTS analysis_metrics (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                CREATE TABLE IF NOT EXISTS analysis_metrics_raw (
+                    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
                     metrics JSONB
+                ) PARTITION BY RANGE (timestamp)
+            ''')
+            
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_metrics_rollup (
+                    resolution TEXT NOT NULL,
+                    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+                    count BIGINT NOT NULL,
+                    duration_sum DOUBLE PRECISION NOT NULL,
+                    duration_max DOUBLE PRECISION NOT NULL,
+                    errors BIGINT NOT NULL,
+                    changes BIGINT NOT NULL,
+                    PRIMARY KEY (resolution, bucket_start)
                 )
             ''')
+            
+            await self._load_partitions(conn)
+            await self._migrate_legacy_metrics(conn)
+        
+        self._start_writer()
     
-    async def store_result(self, session_id: str, result: Dict[str, Any]) -> None:
-        """Store analysis result in PostgreSQL"""
+    async def retrieve_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve analysis result from PostgreSQL"""
+        pending = self._buffered_result(session_id)
+        if pending is not None:
+            return pending[0]
+        
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(_RETRIEVE_RESULT_SQL, session_id)
+        if row is None:
+            return None
+        if row['result_compressed'] is not None:
+            return self._decode_result(row['result_compressed'], row['result_encoding'])
+        return row['result']
+    
+    async def retrieve_fields(
+        self,
+        session_id: str,
+        paths: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve selected parts of a result, projected by PostgreSQL"""
+        pending = self._buffered_result(session_id)
+        if pending is not None:
+            return {path: extract_path(pending[0], path) for path in paths}
+        
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(_RETRIEVE_FIELDS_SQL, session_id, paths)
+        if row is None:
+            return None
+        if row['result_compressed'] is not None:
+            result = self._decode_result(row['result_compressed'], row['result_encoding'])
+            return {path: extract_path(result, path) for path in paths}
+        return dict(zip(paths, row['fields'] or [None] * len(paths)))
+    
+    async def list_results(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List results newest first using the (created_at, session_id) index"""
+        await self.flush()
+        async with self.pool.acquire() as conn:
+            if cursor:
+                rows = await conn.fetch(_LIST_RESULTS_AFTER_SQL, limit + 1, *decode_cursor(cursor))
+            else:
+                rows = await conn.fetch(_LIST_RESULTS_SQL, limit + 1)
+        return self._page([dict(row) for row in rows], limit)
+    
+    async def store_document(self, kind: str, key: str, document: Dict[str, Any]) -> None:
+        """Upsert an internal document; written directly, not through the buffer"""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute(_UPSERT_DOCUMENT_SQL, kind, key, document)
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        STORAGE_OPERATIONS.labels(operation_type='store_document').inc()
+    
+    async def retrieve_document(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an internal document from PostgreSQL"""
         async with self.pool.acquire() as conn:
+            return await conn.fetchval(_RETRIEVE_DOCUMENT_SQL, kind, key)
+    
+    async def close(self) -> None:
+        """Stop the background writer, flush buffered writes and close the pool"""
+        await self._stop_writer()
+        if self.pool is not None:
+            await self._drain()
+            await self.pool.close()
+            self.pool = None
+    
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Register the JSONB codec so documents are encoded once, in binary"""
+        await conn.set_type_codec(
+            'jsonb',
+            schema='pg_catalog',
+            encoder=self._encode_jsonb,
+            decoder=self._decode_jsonb,
+            format='binary'
+        )
+    
+    def _encode_jsonb(self, value: Any) -> bytes:
+        if isinstance(value, RawJSON):
+            return _JSONB_VERSION + value
+        return _JSONB_VERSION + self.serializer.dumps(value)
+    
+    def _decode_jsonb(self, data: bytes) -> Any:
+        return self.serializer.loads(data[1:])
+    
+    async def _write_results(self, results: Dict[str, Tuple[Dict[str, Any], datetime]]) -> None:
+        """Upsert a batch of results with a single multi-row statement"""
+        encoded = [self._encode_result(result) for result, _ in results.values()]
+        summaries = [summarize_result(result) for result, _ in results.values()]
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute(
+                    _UPSERT_RESULTS_SQL,
+                    list(results.keys()),
+                    [document for document, _, _ in encoded],
+                    [compressed for _, compressed, _ in encoded],
+                    [encoding for _, _, encoding in encoded],
+                    [created_at for _, created_at in results.values()],
+                    [severity for severity, _, _ in summaries],
+                    [change_count for _, change_count, _ in summaries],
+                    [breaking_count for _, _, breaking_count in summaries]
+                )
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        
+        STORAGE_OPERATIONS.labels(operation_type='store_result_batch').inc()
+        STORAGE_OPERATIONS.labels(operation_type='store_result').inc(len(results))
+    
+    async def apply_retention(self, now: Optional[datetime] = None) -> None:
+        """Drop expired raw partitions and delete expired rollup buckets"""
+        now = now or datetime.now(timezone.utc)
+        raw_cutoff = now - self.raw_retention
+        async with self.pool.acquire() as conn:
+            for name in sorted(await self._list_partitions(conn)):
+                upper = self._partition_bounds(name)[1]
+                if upper is not None and upper <= raw_cutoff:
+                    await conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+                    self._partitions.pop(name, None)
+                    logger.info("Dropped expired metrics partition", partition=name)
+            
             await conn.execute(
-                '''
-                INSERT INTO analysis_results (session_id, result)
-                VALUES ($1, $2)
-                ON CONFLICT (session_id) DO UPDATE
-                SET result = $2
-                ''',
-                session_id,
-                json.dumps(result)
+                'DELETE FROM analysis_metrics_rollup WHERE bucket_start < $1',
+                now - self.rollup_retention
             )
     
-    async def retrieve_result(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve analysis result from PostgreSQL"""
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                'SELECT result FROM analysis_results WHERE session_id = $1',
-                session_id
+    async def _migrate_legacy_metrics(self, conn: asyncpg.Connection) -> None:
+        """Move metrics of the unpartitioned table of earlier versions into the raw partitions"""
+        if await conn.fetchval('SELECT to_regclass($1)', _LEGACY_METRICS_TABLE) is None:
+            return
+        
+        cutoff = datetime.now(timezone.utc) - self.rollup_retention
+        # Partitions are created outside the transaction, which a concurrent
+        # CREATE of an overlapping partition would abort
+        hours = await conn.fetch(
+            f"SELECT DISTINCT date_trunc('hour', timestamp AT TIME ZONE 'UTC') "
+            f"AT TIME ZONE 'UTC' AS hour "
+            f"FROM {_LEGACY_METRICS_TABLE} WHERE timestamp >= $1",
+            cutoff
+        )
+        await self._ensure_partitions(conn, [(row['hour'], {}) for row in hours])
+        
+        async with conn.transaction():
+            # Workers starting together migrate the table once
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('analysis_metrics_raw'))")
+            if await conn.fetchval('SELECT to_regclass($1)', _LEGACY_METRICS_TABLE) is None:
+                return
+            rows = await conn.fetch(
+                f'SELECT timestamp, metrics FROM {_LEGACY_METRICS_TABLE} WHERE timestamp >= $1',
+                cutoff
             )
-            return json.loads(row['result']) if row else None
+            metrics = [(row['timestamp'], row['metrics']) for row in rows]
+            if metrics:
+                await conn.copy_records_to_table(
+                    'analysis_metrics_raw', records=metrics, columns=['timestamp', 'metrics']
+                )
+                rollups = rollup_metrics(
+                    (timestamp, entry) for timestamp, entry in metrics if isinstance(entry, dict)
+                )
+                keys = list(rollups)
+                values = list(rollups.values())
+                await conn.execute(
+                    _UPSERT_ROLLUP_SQL,
+                    [resolution for resolution, _ in keys],
+                    [bucket for _, bucket in keys],
+                    *[[value[k] for value in values] for k in range(5)]
+                )
+            await conn.execute(
+                f'ALTER TABLE {_LEGACY_METRICS_TABLE} RENAME TO {_LEGACY_METRICS_TABLE}_legacy'
+            )
+        logger.info("Migrated legacy metrics table", num_metrics=len(metrics))
     
-    async def store_metrics(self, metrics: Dict[str, Any]) -> None:
-        """Store analysis metrics in PostgreSQL"""
+    async def _list_partitions(self, conn: asyncpg.Connection) -> List[str]:
+        return [row['relname'] for row in await conn.fetch(_LIST_METRICS_PARTITIONS_SQL)]
+    
+    async def _load_partitions(self, conn: asyncpg.Connection) -> None:
+        """Refresh the known partitions from the catalog"""
+        self._partitions = {}
+        for name in await self._list_partitions(conn):
+            lower, upper = self._partition_bounds(name)
+            if lower is not None:
+                self._partitions[name] = (lower, upper)
+    
+    @staticmethod
+    def _partition_name(lower: datetime, upper: datetime) -> str:
+        return f"analysis_metrics_raw_p{lower:%Y%m%d%H}_{upper:%Y%m%d%H}"
+    
+    @staticmethod
+    def _partition_bounds(name: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Range of a partition from its name, or (None, None) if not ours"""
+        suffix = name.rsplit('_p', 1)[-1]
+        if '_' in suffix:
+            try:
+                lower, upper = (
+                    datetime.strptime(part, '%Y%m%d%H').replace(tzinfo=timezone.utc)
+                    for part in suffix.split('_')
+                )
+            except ValueError:
+                return None, None
+            return lower, upper
+        # Single-bound names of earlier releases
+        for width, fmt in PARTITION_FORMATS.items():
+            try:
+                lower = datetime.strptime(suffix, fmt).replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            return lower, lower + PARTITION_WIDTHS[width]
+        return None, None
+    
+    def _covered(self, hour: datetime) -> bool:
+        return any(lower <= hour < upper for lower, upper in self._partitions.values())
+    
+    def _new_partition_bounds(self, hour: datetime) -> Tuple[datetime, datetime]:
+        """
+        Bounds of a new partition for an hour no partition covers
+        
+        The metrics_partition-wide range around the hour is narrowed to end
+        at the nearest existing partitions, which may have another width.
+        """
+        if self.partition == 'day':
+            lower = hour.replace(hour=0)
+        else:
+            lower = hour
+        upper = lower + PARTITION_WIDTHS[self.partition]
+        for existing_lower, existing_upper in self._partitions.values():
+            if existing_upper <= hour:
+                lower = max(lower, existing_upper)
+            elif existing_lower > hour:
+                upper = min(upper, existing_lower)
+        return lower, upper
+    
+    async def _ensure_partitions(
+        self,
+        conn: asyncpg.Connection,
+        metrics: List[Tuple[datetime, Dict[str, Any]]]
+    ) -> None:
+        """Create missing raw partitions for a batch of metrics"""
+        # Partition bounds of either width fall on hour boundaries
+        for hour in sorted({bucket_start(timestamp, 'hour') for timestamp, _ in metrics}):
+            if self._covered(hour):
+                continue
+            try:
+                await self._create_partition(conn, hour)
+            except asyncpg.InvalidObjectDefinitionError:
+                # Another worker created an overlapping partition meanwhile
+                await self._load_partitions(conn)
+                if not self._covered(hour):
+                    await self._create_partition(conn, hour)
+    
+    async def _create_partition(self, conn: asyncpg.Connection, hour: datetime) -> None:
+        lower, upper = self._new_partition_bounds(hour)
+        name = self._partition_name(lower, upper)
+        await conn.execute(
+            f'''CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF analysis_metrics_raw
+                FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')'''
+        )
+        self._partitions[name] = (lower, upper)
+    
+    async def _write_metrics(self, metrics: List[Tuple[datetime, Dict[str, Any]]]) -> None:
+        """Append a batch of metrics rows with COPY and merge the batch rollups"""
+        rollups = rollup_metrics(metrics)
+        keys = list(rollups)
+        values = list(rollups.values())
+        try:
+            async with self.pool.acquire() as conn:
+                await self._ensure_partitions(conn, metrics)
+                async with conn.transaction():
+                    await conn.copy_records_to_table(
+                        'analysis_metrics_raw',
+                        records=metrics,
+                        columns=['timestamp', 'metrics']
+                    )
+                    await conn.execute(
+                        _UPSERT_ROLLUP_SQL,
+                        [resolution for resolution, _ in keys],
+                        [bucket for _, bucket in keys],
+                        *[[value[k] for value in values] for k in range(5)]
+                    )
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        
+        STORAGE_OPERATIONS.labels(operation_type='store_metrics_batch').inc()
+        STORAGE_OPERATIONS.labels(operation_type='store_metrics').inc(len(metrics))
+    
+    async def _read_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[Any, ...]]:
         async with self.pool.acquire() as conn:
-            await conn.execute(
-                'INSERT INTO analysis_metrics (metrics) VALUES ($1)',
-                json.dumps(metrics)
+            return [tuple(row) for row in await conn.fetch(_QUERY_ROLLUP_SQL, resolution, start, end)]
+
+class MemoryStorage(StorageBackend):
+    """
+    In-process storage backend
+    
+    Results and metrics live in dictionaries of the running process and are
+    lost on exit. Stored objects are kept by reference, so callers must not
+    mutate a result after storing it. max_metrics, if set, keeps only the
+    most recent raw metrics entries; rollups are kept for
+    metrics_rollup_retention_days.
+    """
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.results: Dict[str, Tuple[Dict[str, Any], datetime]] = {}
+        self.documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.metrics: "deque[Tuple[datetime, Dict[str, Any]]]" = deque(
+            maxlen=self.config.get('max_metrics'))
+        self.rollups: Dict[Tuple[str, datetime], Rollup] = {}
+        self.raw_retention = timedelta(days=self.config.get('metrics_raw_retention_days', 7))
+        self.rollup_retention = timedelta(
+            days=self.config.get('metrics_rollup_retention_days', 90))
+        self.retention_interval = self.config.get('metrics_retention_interval', 3600)
+        self._last_retention: Optional[float] = None
+    
+    async def initialize(self):
+        """Nothing to set up; present for StorageFactory symmetry"""
+        pass
+    
+    async def store_result(self, session_id: str, result: Dict[str, Any]) -> None:
+        """Store analysis result in memory"""
+        # Like the database backends, an upsert keeps the original created_at
+        previous = self.results.get(session_id)
+        created_at = previous[1] if previous else datetime.now(timezone.utc)
+        self.results[session_id] = (result, created_at)
+        STORAGE_OPERATIONS.labels(operation_type='store_result').inc()
+    
+    async def retrieve_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve analysis result from memory"""
+        entry = self.results.get(session_id)
+        return entry[0] if entry else None
+    
+    async def store_document(self, kind: str, key: str, document: Dict[str, Any]) -> None:
+        """Store an internal document in memory"""
+        self.documents[(kind, key)] = document
+        STORAGE_OPERATIONS.labels(operation_type='store_document').inc()
+    
+    async def retrieve_document(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an internal document from memory"""
+        return self.documents.get((kind, key))
+    
+    async def store_metrics(self, metrics: Dict[str, Any]) -> None:
+        """Append analysis metrics in memory"""
+        entry = (datetime.now(timezone.utc), metrics)
+        self.metrics.append(entry)
+        for key, rollup in rollup_metrics([entry]).items():
+            merge_rollup(self.rollups.setdefault(key, [0, 0.0, 0.0, 0, 0]), rollup)
+        STORAGE_OPERATIONS.labels(operation_type='store_metrics').inc()
+        
+        now = time.monotonic()
+        if self._last_retention is None or now - self._last_retention >= self.retention_interval:
+            self._last_retention = now
+            await self.apply_retention()
+    
+    async def query_metrics(
+        self,
+        start: datetime,
+        end: datetime,
+        resolution: str = 'minute'
+    ) -> List[Dict[str, Any]]:
+        """Aggregated metrics over a time window, read from rollups"""
+        self._check_resolution(resolution)
+        return [
+            rollup_row(bucket, rollup)
+            for (res, bucket), rollup in sorted(self.rollups.items())
+            if res == resolution and start <= bucket < end
+        ]
+    
+    async def apply_retention(self, now: Optional[datetime] = None) -> None:
+        """Drop raw metrics and rollups older than the configured retention"""
+        now = now or datetime.now(timezone.utc)
+        while self.metrics and self.metrics[0][0] < now - self.raw_retention:
+            self.metrics.popleft()
+        rollup_cutoff = now - self.rollup_retention
+        for key in [key for key in self.rollups if key[1] < rollup_cutoff]:
+            del self.rollups[key]
+    
+    async def list_results(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List results newest first"""
+        keys = sorted(
+            ((created_at, session_id) for session_id, (_, created_at) in self.results.items()),
+            reverse=True
+        )
+        if cursor:
+            after = decode_cursor(cursor)
+            keys = [key for key in keys if key < after]
+        
+        rows = []
+        for created_at, session_id in keys[:limit + 1]:
+            severity, change_count, breaking_count = summarize_result(self.results[session_id][0])
+            rows.append({
+                'session_id': session_id,
+                'created_at': created_at,
+                'severity': severity,
+                'change_count': change_count,
+                'breaking_count': breaking_count
+            })
+        return self._page(rows, limit)
+
+class SQLiteStorage(BufferedStorage):
+    """
+    Embedded SQLite storage backend
+    
+    The database runs in WAL mode with synchronous=NORMAL, and every flush
+    of the write-behind buffer is committed as one transaction. All access
+    goes through a single dedicated thread, so the event loop never blocks
+    on disk I/O. Results are stored as serialized JSON text, or compressed
+    above compression_threshold like PostgresStorage.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.path = config.get('path', 'schema_analyzer.db')
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    async def initialize(self):
+        """Open the database and create tables"""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-storage')
+        await self._run(self._open)
+        self._start_writer()
+    
+    async def retrieve_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve analysis result from SQLite"""
+        pending = self._buffered_result(session_id)
+        if pending is not None:
+            return pending[0]
+        
+        row = await self._run(self._fetch_result, session_id)
+        if row is None:
+            return None
+        data, encoding = row
+        return self._decode_result(data, encoding)
+    
+    async def list_results(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List results newest first using the (created_at, session_id) index"""
+        await self.flush()
+        if cursor:
+            created_at, session_id = decode_cursor(cursor)
+            rows = await self._run(
+                self._fetch_all, _SQLITE_LIST_RESULTS_AFTER_SQL,
+                (self._timestamp(created_at), session_id, limit + 1)
             )
+        else:
+            rows = await self._run(self._fetch_all, _SQLITE_LIST_RESULTS_SQL, (limit + 1,))
+        return self._page([
+            {
+                'session_id': row[0],
+                'created_at': datetime.fromisoformat(row[1]),
+                'severity': row[2],
+                'change_count': row[3],
+                'breaking_count': row[4]
+            }
+            for row in rows
+        ], limit)
+    
+    async def store_document(self, kind: str, key: str, document: Dict[str, Any]) -> None:
+        """Upsert an internal document; written directly, not through the buffer"""
+        row = (kind, key, self.serializer.dumps(document).decode('utf-8'),
+               self._timestamp(datetime.now(timezone.utc)))
+        try:
+            await self._run(self._execute_batch, (_SQLITE_UPSERT_DOCUMENT_SQL, [row]))
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        STORAGE_OPERATIONS.labels(operation_type='store_document').inc()
+    
+    async def retrieve_document(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve an internal document from SQLite"""
+        rows = await self._run(
+            self._fetch_all,
+            'SELECT document FROM analysis_documents WHERE kind = ? AND key = ?',
+            (kind, key)
+        )
+        return self.serializer.loads(rows[0][0]) if rows else None
+    
+    async def close(self) -> None:
+        """Stop the background writer, flush buffered writes and close the database"""
+        await self._stop_writer()
+        if self._conn is not None:
+            await self._drain()
+            await self._run(self._conn.close)
+            self._conn = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func on the storage thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    def _open(self) -> None:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.config.get('busy_timeout', 30),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_results (
+                session_id TEXT PRIMARY KEY,
+                result BLOB,
+                result_encoding TEXT,
+                created_at TEXT,
+                severity TEXT,
+                change_count INTEGER,
+                breaking_count INTEGER
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS analysis_results_created_at_idx
+            ON analysis_results (created_at DESC, session_id DESC)
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_documents (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                document TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                metrics TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS analysis_metrics_timestamp_idx
+            ON analysis_metrics (timestamp)
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_metrics_rollup (
+                resolution TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                duration_sum REAL NOT NULL,
+                duration_max REAL NOT NULL,
+                errors INTEGER NOT NULL,
+                changes INTEGER NOT NULL,
+                PRIMARY KEY (resolution, bucket_start)
+            )
+        ''')
+        self._conn = conn
+    
+    def _fetch_result(self, session_id: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        return self._conn.execute(
+            'SELECT result, result_encoding FROM analysis_results WHERE session_id = ?',
+            (session_id,)
+        ).fetchone()
+    
+    def _fetch_all(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        return self._conn.execute(sql, params).fetchall()
+    
+    @staticmethod
+    def _timestamp(value: datetime) -> str:
+        """Fixed-width UTC text form, so timestamps sort as strings"""
+        return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+    
+    def _execute_batch(self, *statements: Tuple[str, List[Tuple[Any, ...]]]) -> None:
+        """Execute each (sql, rows) statement for all its rows in a single transaction"""
+        with self._conn:
+            self._conn.execute('BEGIN')
+            for sql, rows in statements:
+                self._conn.executemany(sql, rows)
+    
+    async def _write_results(self, results: Dict[str, Tuple[Dict[str, Any], datetime]]) -> None:
+        """Upsert a batch of results in one transaction"""
+        rows = []
+        for session_id, (result, created_at) in results.items():
+            document, compressed, encoding = self._encode_result(result)
+            data = bytes(document) if compressed is None else compressed
+            rows.append((session_id, data, encoding, self._timestamp(created_at),
+                         *summarize_result(result)))
+        try:
+            await self._run(self._execute_batch, (_SQLITE_UPSERT_RESULT_SQL, rows))
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        
+        STORAGE_OPERATIONS.labels(operation_type='store_result_batch').inc()
+        STORAGE_OPERATIONS.labels(operation_type='store_result').inc(len(results))
+    
+    async def apply_retention(self, now: Optional[datetime] = None) -> None:
+        """Delete raw metrics and rollups older than the configured retention"""
+        now = now or datetime.now(timezone.utc)
+        await self._run(
+            self._execute_batch,
+            ('DELETE FROM analysis_metrics WHERE timestamp < ?',
+             [(self._timestamp(now - self.raw_retention),)]),
+            ('DELETE FROM analysis_metrics_rollup WHERE bucket_start < ?',
+             [(self._timestamp(now - self.rollup_retention),)])
+        )
+    
+    async def _write_metrics(self, metrics: List[Tuple[datetime, Dict[str, Any]]]) -> None:
+        """Append a batch of metrics rows and merge the batch rollups in one transaction"""
+        rows = [
+            (self._timestamp(timestamp), self.serializer.dumps(m).decode('utf-8'))
+            for timestamp, m in metrics
+        ]
+        rollup_rows = [
+            (resolution, self._timestamp(bucket), *rollup)
+            for (resolution, bucket), rollup in rollup_metrics(metrics).items()
+        ]
+        try:
+            await self._run(
+                self._execute_batch,
+                (_SQLITE_INSERT_METRICS_SQL, rows),
+                (_SQLITE_UPSERT_ROLLUP_SQL, rollup_rows)
+            )
+        except Exception as e:
+            STORAGE_ERRORS.labels(error_type=type(e).__name__).inc()
+            raise
+        
+        STORAGE_OPERATIONS.labels(operation_type='store_metrics_batch').inc()
+        STORAGE_OPERATIONS.labels(operation_type='store_metrics').inc(len(metrics))
+    
+    async def _read_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[Any, ...]]:
+        rows = await self._run(
+            self._fetch_all, _SQLITE_QUERY_ROLLUP_SQL,
+            (resolution, self._timestamp(start), self._timestamp(end))
+        )
+        return [(datetime.fromisoformat(row[0]), *row[1:]) for row in rows]
 
 class StorageFactory:
     """Factory for creating storage backends"""
     
+    BACKENDS: Dict[str, Type[StorageBackend]] = {
+        'postgresql': PostgresStorage,
+        'sqlite': SQLiteStorage,
+        'memory': MemoryStorage,
+    }
+    
     @staticmethod
     async def create_storage(config: Dict[str, Any]) -> StorageBackend:
-        """Create and initialize storage backend"""
-        storage_type = config.get('type', 'postgresql')
+        """
+        Create and initialize storage backend
         
-        if storage_type == 'postgresql':
-            storage = PostgresStorage(config)
-            await storage.initialize()
-            return storage
-        else:
-            raise ValueError(f"Unsupported storage type: {storage_type}")
\ No newline at end of file
+        The backend is chosen by the 'backend' key ('type' is accepted
+        for older configs): postgresql, sqlite or memory.
+        """
+        storage_type = config.get('backend', config.get('type', 'postgresql'))
+        
+        backend = StorageFactory.BACKENDS.get(storage_type)
+        if backend is None:
+            raise ValueError(f"Unsupported storage type: {storage_type}")
+        
+        storage = backend(config)
+        await storage.initialize()
+        return storage
@@ -0,0 +1,33 @@
+"""Optional OpenTelemetry tracing for Schema Evolution Analyzer"""
+
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - tracing is optional
+    trace = None
+
+# Spans are recorded only when opentelemetry-api is installed and an SDK
+# tracer provider has been configured by the deployment; otherwise the
+# API tracer is a no-op.
+_tracer = trace.get_tracer('schema_analyzer') if trace is not None else None
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Open a tracing span as a child of the current span
+    
+    Args:
+        name: Span name
+        attributes: Span attributes
+        
+    Yields:
+        The span, or None when tracing is unavailable
+    """
+    if _tracer is None:
+        yield None
+        return
+    
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
@@ -0,0 +1,101 @@
+"""Bounded in-process caching utilities"""
+
+from collections import OrderedDict, deque
+from typing import Any, Hashable, Optional, Tuple
+import threading
+import time
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Size-bounded, thread-safe mapping that evicts the least recently used entry
+
+    With a ttl, puts are also queued in expiry order, so expire() only
+    visits entries that are due instead of scanning the whole cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._expiry: "deque[Tuple[float, Hashable]]" = deque()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return cached value for key and mark it as recently used"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh key, evicting the oldest entry when full"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            if expires_at is not None:
+                self._expiry.append((expires_at, key))
+                # Refreshed and evicted keys leave stale queue items behind
+                if len(self._expiry) > 2 * self.maxsize:
+                    self._expiry = deque(sorted(
+                        ((entry[0], k) for k, entry in self._data.items()),
+                        key=lambda item: item[0]
+                    ))
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove key and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def expire(self) -> int:
+        """Drop expired entries and return how many were dropped"""
+        if not self.ttl:
+            return 0
+        now = time.monotonic()
+        expired = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, key = self._expiry.popleft()
+                entry = self._data.get(key)
+                # Skip queue items of keys that were refreshed or dropped since
+                if entry is not None and entry[0] == expires_at:
+                    del self._data[key]
+                    expired += 1
+            self.expirations += expired
+        return expired
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,34 @@
+"""Cooperative cancellation of pipeline stages running in executor threads"""
+
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+import threading
+
+# Token of the stage running in the current thread, if it can be cancelled
+_current_token: ContextVar[Optional[threading.Event]] = ContextVar(
+    'schema_analyzer_cancel_token', default=None
+)
+
+class StageCancelled(Exception):
+    """Raised inside a stage whose analysis was cancelled or timed out"""
+    pass
+
+def run_cancellable(token: threading.Event, func: Callable[[], Any]) -> Any:
+    """
+    Call func() with token as the cancellation token of the current thread
+
+    A stage whose token was set before it started does not run at all.
+    """
+    if token.is_set():
+        raise StageCancelled()
+    reset = _current_token.set(token)
+    try:
+        return func()
+    finally:
+        _current_token.reset(reset)
+
+def check_cancelled() -> None:
+    """Raise StageCancelled if the stage running in this thread was cancelled"""
+    token = _current_token.get()
+    if token is not None and token.is_set():
+        raise StageCancelled()
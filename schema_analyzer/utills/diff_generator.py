@@ -1,92 +1,306 @@
 """Schema difference generation utilities"""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional, Union
+import asyncio
 import structlog
+from .cancellation import check_cancelled
+from .fingerprint import SchemaFingerprint
+from .rename_detector import RenameDetector
+from .schema_index import SchemaIndex, TableInfo
+
+# A schema dict or its prebuilt index
+SchemaInput = Union[Dict[str, Any], SchemaIndex]
 
 logger = structlog.get_logger()
 
 class DiffGenerator:
-    """Generates differences between database schemas"""
-    
+    """
+    Generates differences between database schemas
+
+    With a similarity_threshold, removed and added tables or columns that
+    are similar enough are reported as table_renamed and column_renamed
+    changes instead; see RenameDetector.
+    """
+
+    # Number of tables compared between cooperative yields to the event loop
+    YIELD_EVERY = 1000
+
+    def __init__(self, similarity_threshold: Optional[float] = None):
+        self.rename_detector = (
+            RenameDetector(similarity_threshold) if similarity_threshold is not None else None
+        )
+
     async def generate_diff(
         self,
-        old_schema: Dict[str, Any],
-        new_schema: Dict[str, Any]
+        old_schema: SchemaInput,
+        new_schema: SchemaInput,
+        old_fingerprint: Optional[SchemaFingerprint] = None,
+        new_fingerprint: Optional[SchemaFingerprint] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate list of differences between old and new schemas
-        
+
         Args:
-            old_schema: Original database schema
-            new_schema: Modified database schema
-            
+            old_schema: Original database schema, or its SchemaIndex
+            new_schema: Modified database schema, or its SchemaIndex
+            old_fingerprint: Optional fingerprint of old_schema
+            new_fingerprint: Optional fingerprint of new_schema
+
         Returns:
             List of schema changes
         """
+        changes = [
+            change async for change in self.iter_diff(
+                old_schema, new_schema, old_fingerprint, new_fingerprint
+            )
+        ]
+
+        logger.info("Generated schema differences", num_changes=len(changes))
+        return changes
+
+    def generate_diff_sync(
+        self,
+        old_schema: SchemaInput,
+        new_schema: SchemaInput,
+        old_fingerprint: Optional[SchemaFingerprint] = None,
+        new_fingerprint: Optional[SchemaFingerprint] = None
+    ) -> List[Dict[str, Any]]:
+        """Synchronous form of generate_diff, for use from executor threads"""
         changes = []
-        
-        # Compare tables
-        old_tables = {t['name']: t for t in old_schema['tables']}
-        new_tables = {t['name']: t for t in new_schema['tables']}
-        
-        # Find removed tables
-        for table_name in set(old_tables.keys()) - set(new_tables.keys()):
-            changes.append({
-                'type': 'table_removed',
-                'table': table_name
-            })
-        
-        # Find added tables
-        for table_name in set(new_tables.keys()) - set(old_tables.keys()):
-            changes.append({
-                'type': 'table_added',
-                'table': table_name
-            })
-        
-        # Compare columns in existing tables
-        for table_name in set(old_tables.keys()) & set(new_tables.keys()):
-            old_columns = {c['name']: c for c in old_tables[table_name]['columns']}
-            new_columns = {c['name']: c for c in new_tables[table_name]['columns']}
-            
-            # Find removed columns
-            for col_name in set(old_columns.keys()) - set(new_columns.keys()):
-                changes.append({
-                    'type': 'column_removed',
-                    'table': table_name,
-                    'column': col_name
-                })
-            
-            # Find added columns
-            for col_name in set(new_columns.keys()) - set(old_columns.keys()):
-                changes.append({
-                    'type': 'column_added',
-                    'table': table_name,
-                    'column': col_name,
-                    'column_details': new_columns[col_name]
-                })
-            
-            # Compare modified columns
-            for col_name in set(old_columns.keys()) & set(new_columns.keys()):
-                old_col = old_columns[col_name]
-                new_col = new_columns[col_name]
-                
-                if old_col['type'] != new_col['type']:
-                    changes.append({
-                        'type': 'column_type_changed',
-                        'table': table_name,
-                        'column': col_name,
-                        'old_type': old_col['type'],
-                        'new_type': new_col['type']
-                    })
-                
-                if old_col.get('nullable') != new_col.get('nullable'):
-                    changes.append({
-                        'type': 'nullable_changed',
-                        'table': table_name,
-                        'column': col_name,
-                        'old_nullable': old_col.get('nullable'),
-                        'new_nullable': new_col.get('nullable')
-                    })
-        
+        for change in self._walk(old_schema, new_schema, old_fingerprint, new_fingerprint):
+            if change is None:
+                # Where iter_diff yields to the event loop, stop if cancelled
+                check_cancelled()
+            else:
+                changes.append(change)
+
         logger.info("Generated schema differences", num_changes=len(changes))
-        return changes
\ No newline at end of file
+        return changes
+
+    async def iter_diff(
+        self,
+        old_schema: SchemaInput,
+        new_schema: SchemaInput,
+        old_fingerprint: Optional[SchemaFingerprint] = None,
+        new_fingerprint: Optional[SchemaFingerprint] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream differences between old and new schemas
+
+        Tables of both schemas are walked in a single merge pass over their
+        SchemaIndex, ordered by name, and changes are yielded as soon as they
+        are found. Schema dicts are indexed first; callers that hold indexes
+        should pass them instead.
+
+        Memory: schemas arrive as whole in-memory dicts, so the walk needs
+        their tables in name order; the index holds one small record per
+        table (O(tables) on top of the schemas themselves). Column maps, the
+        part that grows with table width, are built only for the pair of
+        tables being compared, so the extra working set beyond those records
+        is bounded by the largest table. Tables skipped by fingerprint never
+        get a column map.
+
+        When fingerprints of both schemas are given, matching root hashes end
+        the diff immediately and tables with matching hashes are skipped
+        without comparing their columns.
+
+        With rename detection enabled, removed and added tables can only be
+        paired once all of them are known, so they are held back (one record
+        each) and table_removed, table_added and table_renamed changes, plus
+        the column changes of renamed tables, are yielded after the column
+        changes of the merge pass instead of in table name order.
+
+        Args:
+            old_schema: Original database schema, or its SchemaIndex
+            new_schema: Modified database schema, or its SchemaIndex
+            old_fingerprint: Optional fingerprint of old_schema
+            new_fingerprint: Optional fingerprint of new_schema
+
+        Yields:
+            Schema changes in table name order, except as described above
+            when renames are detected
+        """
+        for change in self._walk(old_schema, new_schema, old_fingerprint, new_fingerprint):
+            if change is None:
+                await asyncio.sleep(0)
+            else:
+                yield change
+
+    def _walk(
+        self,
+        old_schema: SchemaInput,
+        new_schema: SchemaInput,
+        old_fingerprint: Optional[SchemaFingerprint],
+        new_fingerprint: Optional[SchemaFingerprint]
+    ) -> Iterator[Optional[Dict[str, Any]]]:
+        """Merge pass behind iter_diff; yields None every YIELD_EVERY tables"""
+        use_fingerprints = old_fingerprint is not None and new_fingerprint is not None
+        if use_fingerprints and old_fingerprint.root == new_fingerprint.root:
+            return
+
+        old_tables = SchemaIndex.of(old_schema).sorted_tables
+        new_tables = SchemaIndex.of(new_schema).sorted_tables
+        detect_renames = self.rename_detector is not None
+        removed_tables: List[TableInfo] = []
+        added_tables: List[TableInfo] = []
+
+        i = j = 0
+        compared = 0
+        while i < len(old_tables) or j < len(new_tables):
+            old_table = old_tables[i] if i < len(old_tables) else None
+            new_table = new_tables[j] if j < len(new_tables) else None
+
+            if new_table is None or (
+                old_table is not None and old_table.name < new_table.name
+            ):
+                if detect_renames:
+                    removed_tables.append(old_table)
+                else:
+                    yield {
+                        'type': 'table_removed',
+                        'table': old_table.name
+                    }
+                i += 1
+            elif old_table is None or new_table.name < old_table.name:
+                if detect_renames:
+                    added_tables.append(new_table)
+                else:
+                    yield {
+                        'type': 'table_added',
+                        'table': new_table.name
+                    }
+                j += 1
+            else:
+                if not (use_fingerprints and
+                        old_fingerprint.table_unchanged(new_fingerprint, old_table.name)):
+                    for change in self._diff_columns(old_table, new_table):
+                        yield change
+                i += 1
+                j += 1
+
+            compared += 1
+            if compared % self.YIELD_EVERY == 0:
+                yield None
+
+        if detect_renames:
+            yield from self._table_changes(removed_tables, added_tables)
+
+    def _table_changes(
+        self,
+        removed_tables: List[TableInfo],
+        added_tables: List[TableInfo]
+    ) -> Iterator[Dict[str, Any]]:
+        """Table level changes once renamed tables are paired up"""
+        renames = self.rename_detector.match_tables(removed_tables, added_tables)
+        renamed_old = {old_table.name for old_table, _, _ in renames}
+        renamed_new = {new_table.name for _, new_table, _ in renames}
+
+        for old_table in removed_tables:
+            if old_table.name not in renamed_old:
+                yield {
+                    'type': 'table_removed',
+                    'table': old_table.name
+                }
+
+        for new_table in added_tables:
+            if new_table.name not in renamed_new:
+                yield {
+                    'type': 'table_added',
+                    'table': new_table.name
+                }
+
+        for old_table, new_table, similarity in sorted(renames, key=lambda r: r[1].name):
+            yield {
+                'type': 'table_renamed',
+                'table': new_table.name,
+                'old_table': old_table.name,
+                'similarity': round(similarity, 4)
+            }
+            # Queries written against the old table still use its name
+            for change in self._diff_columns(old_table, new_table):
+                change['old_table'] = old_table.name
+                yield change
+
+    def _diff_columns(
+        self,
+        old_table: TableInfo,
+        new_table: TableInfo
+    ) -> Iterator[Dict[str, Any]]:
+        """Generate column level changes between two versions of a table"""
+        table_name = new_table.name
+        old_columns = old_table.columns
+        new_columns = new_table.columns
+
+        removed = [col for col_name, col in old_columns.items() if col_name not in new_columns]
+        added = [col for col_name, col in new_columns.items() if col_name not in old_columns]
+
+        renames = []
+        if self.rename_detector is not None and removed and added:
+            renames = self.rename_detector.match_columns(
+                removed, added, list(old_columns), list(new_columns)
+            )
+            if renames:
+                renamed_old = {old_col['name'] for old_col, _, _ in renames}
+                renamed_new = {new_col['name'] for _, new_col, _ in renames}
+                removed = [col for col in removed if col['name'] not in renamed_old]
+                added = [col for col in added if col['name'] not in renamed_new]
+
+        # Find removed columns
+        for old_col in removed:
+            yield {
+                'type': 'column_removed',
+                'table': table_name,
+                'column': old_col['name']
+            }
+
+        # Find added columns
+        for new_col in added:
+            yield {
+                'type': 'column_added',
+                'table': table_name,
+                'column': new_col['name'],
+                'column_details': new_col
+            }
+
+        # Renamed columns, then their remaining differences under the new name
+        for old_col, new_col, similarity in renames:
+            yield {
+                'type': 'column_renamed',
+                'table': table_name,
+                'column': new_col['name'],
+                'old_column': old_col['name'],
+                'similarity': round(similarity, 4)
+            }
+            yield from self._diff_column(table_name, new_col['name'], old_col, new_col)
+
+        # Compare modified columns
+        for col_name, old_col in old_columns.items():
+            new_col = new_columns.get(col_name)
+            if new_col is not None:
+                yield from self._diff_column(table_name, col_name, old_col, new_col)
+
+    @staticmethod
+    def _diff_column(
+        table_name: str,
+        col_name: str,
+        old_col: Dict[str, Any],
+        new_col: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """Type and nullability changes of a column kept or renamed between versions"""
+        if old_col['type'] != new_col['type']:
+            yield {
+                'type': 'column_type_changed',
+                'table': table_name,
+                'column': col_name,
+                'old_type': old_col['type'],
+                'new_type': new_col['type']
+            }
+
+        if old_col.get('nullable') != new_col.get('nullable'):
+            yield {
+                'type': 'nullable_changed',
+                'table': table_name,
+                'column': col_name,
+                'old_nullable': old_col.get('nullable'),
+                'new_nullable': new_col.get('nullable')
+            }
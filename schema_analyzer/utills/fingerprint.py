@@ -0,0 +1,140 @@
+"""Merkle-style content fingerprints for database schemas"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import structlog
+from .hashing import canonical_json, content_hash, digest
+
+logger = structlog.get_logger()
+
+def column_hash(column: Dict[str, Any]) -> str:
+    """Stable content hash of a single column definition"""
+    return content_hash(column, strict=True)
+
+def column_hashes(table: Dict[str, Any]) -> Dict[str, str]:
+    """Content hashes of every column of a table, keyed by column name"""
+    return {c['name']: column_hash(c) for c in table['columns']}
+
+def table_hash(table: Dict[str, Any]) -> str:
+    """
+    Stable content hash of a table definition
+
+    Columns are ordered by name before hashing, so reordering columns does
+    not change the hash while any change to a column or table attribute does.
+    Values that are not JSON types raise TypeError rather than being hashed
+    by their string form, which could equal that of a valid value.
+    """
+    columns = sorted(table['columns'], key=lambda c: c['name'])
+    return digest(canonical_json({**table, 'columns': columns}, strict=True))
+
+class SchemaFingerprint:
+    """Content hashes of a schema at schema and table granularity"""
+
+    def __init__(self, root: str, tables: Dict[str, str]):
+        self.root = root
+        self.tables = tables
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SchemaFingerprint) and self.root == other.root
+
+    def __hash__(self) -> int:
+        return hash(self.root)
+
+    def table_unchanged(self, other: "SchemaFingerprint", table_name: str) -> bool:
+        """Whether table_name has identical content in both fingerprints"""
+        own = self.tables.get(table_name)
+        return own is not None and own == other.tables.get(table_name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize fingerprint for caching or storage"""
+        return {'root': self.root, 'tables': dict(self.tables)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SchemaFingerprint":
+        """Rebuild fingerprint from to_dict output"""
+        return cls(data['root'], dict(data['tables']))
+
+def fingerprint_schema(schema: Dict[str, Any]) -> SchemaFingerprint:
+    """
+    Compute the fingerprint of a schema
+
+    The root hash is derived from the sorted table hashes and the other
+    top-level keys, so it is independent of table and column order but
+    covers the whole schema. Schemas with equal roots are interchangeable
+    for validation and analysis.
+
+    Args:
+        schema: Database schema
+
+    Returns:
+        Schema fingerprint
+
+    Raises:
+        KeyError, TypeError: If schema does not have the tables/columns shape
+            or holds values that are not JSON types
+        ValueError: If schema contains a reference cycle
+    """
+    fingerprint, _ = fingerprint_schema_incremental(schema)
+    return fingerprint
+
+def fingerprint_schema_incremental(
+    schema: Dict[str, Any],
+    base_schema: Optional[Dict[str, Any]] = None,
+    base_fingerprint: Optional[SchemaFingerprint] = None
+) -> Tuple[SchemaFingerprint, List[Dict[str, Any]]]:
+    """
+    Compute the fingerprint of a schema derived from an already fingerprinted one
+
+    Tables that are the very same object as the same-named table of
+    base_schema reuse its hash. Other tables are hashed, and count as changed
+    when their hash differs from the base table's. Hashes are taken over
+    canonical JSON, so values that merely compare equal in Python, such as 1
+    and True, are told apart.
+
+    Args:
+        schema: Database schema
+        base_schema: Previous version of the schema
+        base_fingerprint: Fingerprint of base_schema
+
+    Returns:
+        Tuple of the schema fingerprint and the tables that are new or changed
+
+    Raises:
+        KeyError, TypeError: If schema does not have the tables/columns shape
+            or holds values that are not JSON types
+        ValueError: If schema contains a reference cycle
+    """
+    base_tables: Dict[str, Dict[str, Any]] = {}
+    if base_schema is not None and base_fingerprint is not None:
+        base_tables = {t['name']: t for t in base_schema['tables']}
+
+    tables: Dict[str, str] = {}
+    hashes: List[str] = []
+    changed: List[Dict[str, Any]] = []
+    for table in schema['tables']:
+        name = table['name']
+        base_table = base_tables.get(name)
+        if base_table is not None and base_table is table:
+            h = base_fingerprint.tables[name]
+        else:
+            h = table_hash(table)
+            if base_table is None or h != base_fingerprint.tables.get(name):
+                changed.append(table)
+        tables[name] = h
+        hashes.append(h)
+
+    hashes.sort()
+    # Keys besides tables are part of the schema too
+    extra = {key: value for key, value in schema.items() if key != 'tables'}
+    if extra:
+        hashes.append('schema:' + content_hash(extra, strict=True))
+    root = digest('\n'.join(hashes).encode('ascii'))
+    logger.debug("Computed schema fingerprint", root=root,
+                 num_tables=len(hashes), num_changed=len(changed))
+    return SchemaFingerprint(root, tables), changed
+
+def try_fingerprint_schema(schema: Any) -> Optional[SchemaFingerprint]:
+    """Fingerprint schema, or return None if it is not structurally usable"""
+    try:
+        return fingerprint_schema(schema)
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
@@ -0,0 +1,40 @@
+"""Stable content hashing utilities"""
+
+from typing import Any
+import hashlib
+import json
+
+DIGEST_SIZE = 16
+
+def digest(data: bytes) -> str:
+    """Return a short hex digest of raw bytes"""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+def canonical_json(obj: Any, strict: bool = False) -> bytes:
+    """
+    Serialize obj deterministically, independent of dict key order
+
+    Values that are not JSON types are written as their str() unless strict
+    is set, in which case they raise TypeError; strict serializations of
+    distinct values never coincide.
+    """
+    return json.dumps(
+        obj,
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=None if strict else str
+    ).encode('utf-8')
+
+def content_hash(obj: Any, strict: bool = False) -> str:
+    """
+    Compute a stable content hash for a JSON-compatible object
+
+    Args:
+        obj: Object to hash
+        strict: Raise TypeError on values that are not JSON types
+
+    Returns:
+        Hex digest that is equal for equal content across processes
+    """
+    return digest(canonical_json(obj, strict))
@@ -1,6 +1,6 @@
 """Impact analysis utilities"""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterable, Iterable, Tuple, Union
 import structlog
 
 logger = structlog.get_logger()
@@ -8,16 +8,38 @@ logger = structlog.get_logger()
 class ImpactAnalyzer:
     """Analyzes impact of schema changes"""
     
-    async def analyze_impact(self, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_impact(
+        self,
+        changes: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
         """
         Analyze impact of schema changes
         
         Args:
-            changes: List of schema changes
+            changes: List of schema changes, or an async stream of them such
+                as DiffGenerator.iter_diff
             
         Returns:
             Impact analysis results
         """
+        if isinstance(changes, AsyncIterable):
+            impact, counts = self._new_impact()
+            async for change in changes:
+                self._record_change(change, impact, counts)
+            return self._finalize_impact(impact, counts)
+        
+        return self.analyze_impact_sync(changes)
+    
+    def analyze_impact_sync(self, changes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Synchronous form of analyze_impact, for use from executor threads"""
+        impact, counts = self._new_impact()
+        for change in changes:
+            self._record_change(change, impact, counts)
+        return self._finalize_impact(impact, counts)
+    
+    @staticmethod
+    def _new_impact() -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Return empty impact result and change counters"""
         impact = {
             'severity': 'low',
             'breaking_changes': [],
@@ -25,27 +47,18 @@ class ImpactAnalyzer:
             'performance_impact': [],
             'migration_complexity': 'low'
         }
-        
-        breaking_changes = 0
-        data_loss_risks = 0
-        complex_changes = 0
-        
-        for change in changes:
-            # Analyze breaking changes
-            if change['type'] in ['table_removed', 'column_removed', 'column_type_changed']:
-                breaking_changes += 1
-                impact['breaking_changes'].append({
-                    'type': change['type'],
-                    'location': f"{change.get('table', '')}.{change.get('column', '')}"
-                })
-            
-            # Analyze data loss risks
-            if change['type'] in ['table_removed', 'column_removed']:
-                data_loss_risks += 1
-            
-            # Analyze complexity
-            if change['type'] in ['column_type_changed', 'table_removed']:
-                complex_changes += 1
+        counts = {'breaking': 0, 'data_loss': 0, 'complex': 0}
+        return impact, counts
+    
+    def _finalize_impact(
+        self,
+        impact: Dict[str, Any],
+        counts: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """Derive overall severity and complexity from accumulated counts"""
+        breaking_changes = counts['breaking']
+        data_loss_risks = counts['data_loss']
+        complex_changes = counts['complex']
         
         # Determine overall severity
         if breaking_changes > 0:
@@ -67,4 +80,29 @@ class ImpactAnalyzer:
                    breaking_changes=breaking_changes,
                    data_loss_risk=impact['data_loss_risk'])
         
-        return impact
\ No newline at end of file
+        return impact
+    
+    def _record_change(
+        self,
+        change: Dict[str, Any],
+        impact: Dict[str, Any],
+        counts: Dict[str, int]
+    ) -> None:
+        """Accumulate the impact of a single change"""
+        # Analyze breaking changes
+        # Renames break queries using the old name but keep the data
+        if change['type'] in ['table_removed', 'column_removed', 'column_type_changed',
+                              'table_renamed', 'column_renamed']:
+            counts['breaking'] += 1
+            impact['breaking_changes'].append({
+                'type': change['type'],
+                'location': f"{change.get('table', '')}.{change.get('column', '')}"
+            })
+        
+        # Analyze data loss risks
+        if change['type'] in ['table_removed', 'column_removed']:
+            counts['data_loss'] += 1
+        
+        # Analyze complexity
+        if change['type'] in ['column_type_changed', 'table_removed']:
+            counts['complex'] += 1
@@ -0,0 +1,158 @@
+"""Inverted index from schema objects to the queries that reference them"""
+
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+import structlog
+from .cancellation import check_cancelled
+from .hashing import digest
+from .query_validator import QueryValidator
+
+logger = structlog.get_logger()
+
+class QueryIndex:
+    """Maps tables and table.column pairs to the ids of queries using them"""
+
+    # Change types that affect every query referencing the table
+    TABLE_CHANGES = {'table_removed'}
+
+    # Change types that affect queries referencing the specific column
+    COLUMN_CHANGES = {'column_removed', 'column_type_changed', 'nullable_changed'}
+
+    def __init__(self, query_validator: Optional[QueryValidator] = None):
+        self.query_validator = query_validator or QueryValidator()
+        # Incremented on every modification, so callers can detect changes
+        self.version = 0
+        self.queries: Dict[str, str] = {}
+        self.tables: Dict[str, Set[str]] = {}
+        self.columns: Dict[Tuple[str, str], Set[str]] = {}
+        self._references: Dict[str, Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def __contains__(self, query_id: str) -> bool:
+        return query_id in self.queries
+
+    @staticmethod
+    def query_id(query: str) -> str:
+        """Default id of a query: a hash of its exact text"""
+        return digest(query.encode('utf-8'))
+
+    def add_query(self, query: str, query_id: Optional[str] = None) -> str:
+        """
+        Index a query, replacing any previous query with the same id
+
+        Args:
+            query: SQL query
+            query_id: Optional caller supplied id; defaults to query_id(query)
+
+        Returns:
+            Id under which the query is indexed
+        """
+        if query_id is None:
+            query_id = self.query_id(query)
+        if self.queries.get(query_id) == query:
+            return query_id
+        if query_id in self.queries:
+            self.remove_query(query_id)
+
+        references = self.query_validator.get_references(query)
+        if isinstance(references, str):
+            # Unparseable queries are kept but reference nothing
+            references = ((), ())
+
+        tables, columns = references
+        for table in tables:
+            self.tables.setdefault(table, set()).add(query_id)
+        for column in columns:
+            self.columns.setdefault(column, set()).add(query_id)
+
+        self.queries[query_id] = query
+        self._references[query_id] = references
+        self.version += 1
+        return query_id
+
+    def add_queries(self, queries: Iterable[str]) -> List[str]:
+        """Index several queries and return their ids"""
+        query_ids = []
+        for query in queries:
+            check_cancelled()
+            query_ids.append(self.add_query(query))
+        return query_ids
+
+    def remove_query(self, query_id: str) -> bool:
+        """
+        Remove a query from the index
+
+        Returns:
+            True if the query was indexed
+        """
+        if query_id not in self.queries:
+            return False
+
+        tables, columns = self._references.pop(query_id)
+        for table in tables:
+            self._discard(self.tables, table, query_id)
+        for column in columns:
+            self._discard(self.columns, column, query_id)
+
+        del self.queries[query_id]
+        self.version += 1
+        return True
+
+    def lookup_change(self, change: Dict[str, Any]) -> Set[str]:
+        """Ids of indexed queries affected by a single change"""
+        # Queries still use the names from before the rename, and column
+        # changes of a renamed table carry its old name as old_table
+        table = change.get('old_table', change.get('table'))
+        if change['type'] in self.TABLE_CHANGES:
+            return self.tables.get(table, set())
+        if change['type'] in self.COLUMN_CHANGES:
+            return self.columns.get((table, change['column']), set())
+        if change['type'] == 'table_renamed':
+            return self.tables.get(table, set())
+        if change['type'] == 'column_renamed':
+            return self.columns.get((table, change['old_column']), set())
+        return set()
+
+    def affected_queries(self, changes: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Find indexed queries affected by a list of changes
+
+        Cost is proportional to the number of changes plus the number of hits,
+        independent of the size of the query corpus.
+
+        Args:
+            changes: Schema changes as produced by DiffGenerator
+
+        Returns:
+            One entry per affected query listing the changes that affect it
+        """
+        affected: Dict[str, List[Dict[str, Any]]] = {}
+        for change in changes:
+            for query_id in self.lookup_change(change):
+                affected.setdefault(query_id, []).append({
+                    'type': change['type'],
+                    'location': f"{change.get('table', '')}.{change.get('column', '')}"
+                })
+
+        logger.info("Looked up affected queries",
+                   num_indexed=len(self.queries),
+                   num_affected=len(affected))
+
+        return [
+            {
+                'query_id': query_id,
+                'query': self.queries[query_id],
+                'changes': query_changes
+            }
+            for query_id, query_changes in affected.items()
+        ]
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], key: Any, query_id: str) -> None:
+        """Remove query_id from an index bucket, dropping empty buckets"""
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(query_id)
+            if not bucket:
+                del index[key]
@@ -1,93 +1,262 @@
 """Query validation utilities"""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
+import time
 import sqlparse
+from sqlparse import tokens as T
+from sqlparse.lexer import Lexer
 import structlog
+from ..metrics import QUERY_PROCESSING_TIME
+from .cache import LRUCache
+from .cancellation import check_cancelled
+from .hashing import digest
+from .schema_index import SchemaIndex
 
 logger = structlog.get_logger()
 
+# Keywords after which the next identifier names a table
+_TABLE_KEYWORDS = {'FROM', 'INTO', 'UPDATE', 'TABLE'}
+_TABLE_TOKENS = (sqlparse.sql.Identifier, sqlparse.sql.IdentifierList, sqlparse.sql.Function)
+
+# Extracted (tables, columns) references, or the parse error message
+QueryReferences = Union[Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]], str]
+
+def normalize_query(query: str) -> str:
+    """
+    Strip literals and comments and collapse whitespace so equivalent statements compare equal
+
+    Works on sqlparse's token stream, so quotes escaped by doubling or by a
+    backslash and quotes inside comments are read as the parser reads
+    them. Quoted identifiers are kept.
+    """
+    parts: List[str] = []
+    space = False
+    for ttype, value in Lexer.get_default_instance().get_tokens(query):
+        if ttype in T.Whitespace or ttype in T.Comment:
+            space = True
+            continue
+        if space and parts:
+            parts.append(' ')
+        space = False
+        parts.append('?' if ttype in T.String.Single or ttype in T.Number else value)
+    return ''.join(parts)
+
+def query_fingerprint(query: str) -> str:
+    """Stable fingerprint of a query's normalized form"""
+    return digest(normalize_query(query).encode('utf-8'))
+
 class QueryValidator:
     """Validates SQL queries against schema"""
     
+    def __init__(self, cache_size: int = 10000):
+        # Query fingerprint -> extracted references, shared across analyses
+        self._references = LRUCache(cache_size)
+    
     async def validate_queries(
         self,
         queries: List[str],
-        schema: Dict[str, Any]
+        schema: Union[Dict[str, Any], SchemaIndex]
     ) -> List[Dict[str, Any]]:
         """
         Validate SQL queries against new schema
         
         Args:
             queries: List of SQL queries to validate
-            schema: Database schema to validate against
+            schema: Database schema to validate against, or its SchemaIndex
             
         Returns:
             List of validation results for each query
         """
-        results = []
-        schema_tables = {t['name']: t for t in schema['tables']}
+        return self.validate_queries_sync(queries, schema)
+    
+    def validate_queries_sync(
+        self,
+        queries: List[str],
+        schema: Union[Dict[str, Any], SchemaIndex]
+    ) -> List[Dict[str, Any]]:
+        """Synchronous form of validate_queries, for use from executor threads"""
+        schema_index = SchemaIndex.of(schema)
         
-        for query in queries:
-            result = {
+        # Validate each distinct statement once and fan the outcome out to
+        # all queries with the same fingerprint
+        fingerprints = [query_fingerprint(query) for query in queries]
+        outcomes: Dict[str, List[str]] = {}
+        for query, fingerprint in zip(queries, fingerprints):
+            if fingerprint in outcomes:
+                continue
+            check_cancelled()
+            start_time = time.perf_counter()
+            references = self.get_references(query, fingerprint)
+            outcomes[fingerprint] = self._validate_references(references, schema_index)
+            # Observed once per distinct statement; duplicates cost nothing extra
+            QUERY_PROCESSING_TIME.observe(time.perf_counter() - start_time)
+        
+        results = [
+            {
                 'query': query,
-                'is_valid': True,
-                'errors': []
+                'is_valid': not outcomes[fingerprint],
+                'errors': list(outcomes[fingerprint])
             }
+            for query, fingerprint in zip(queries, fingerprints)
+        ]
+        
+        logger.info("Completed query validation",
+                   num_queries=len(queries),
+                   num_unique=len(outcomes),
+                   num_invalid=sum(1 for r in results if not r['is_valid']))
+        
+        return results
+    
+    def get_references(
+        self,
+        query: str,
+        fingerprint: Optional[str] = None
+    ) -> QueryReferences:
+        """
+        Return table and column references of a query, using the parse cache
+        
+        Args:
+            query: SQL query
+            fingerprint: Precomputed query_fingerprint(query), if known
             
+        Returns:
+            Tuple of (tables, (table, column) pairs), or the parse error message
+        """
+        if fingerprint is None:
+            fingerprint = query_fingerprint(query)
+        
+        references = self._references.get(fingerprint)
+        if references is None:
             try:
                 # Parse the SQL query
                 parsed = sqlparse.parse(query)[0]
                 
                 # Extract table and column references
-                tables_referenced = self._extract_table_references(parsed)
-                columns_referenced = self._extract_column_references(parsed)
-                
-                # Validate table references
-                for table in tables_referenced:
-                    if table not in schema_tables:
-                        result['is_valid'] = False
-                        result['errors'].append(f"Referenced table not found: {table}")
-                
-                # Validate column references
-                for table, column in columns_referenced:
-                    if table in schema_tables:
-                        schema_columns = {c['name'] for c in schema_tables[table]['columns']}
-                        if column not in schema_columns:
-                            result['is_valid'] = False
-                            result['errors'].append(
-                                f"Referenced column not found: {table}.{column}")
-                
+                tables, columns = self._extract_references(parsed)
+                references = (tuple(tables), tuple(columns))
             except Exception as e:
-                result['is_valid'] = False
-                result['errors'].append(f"Query parsing error: {str(e)}")
-            
-            results.append(result)
-        
-        logger.info("Completed query validation",
-                   num_queries=len(queries),
-                   num_invalid=sum(1 for r in results if not r['is_valid']))
+                references = f"Query parsing error: {str(e)}"
+            self._references.put(fingerprint, references)
         
-        return results
+        return references
     
-    def _extract_table_references(self, parsed_query: sqlparse.sql.Statement) -> List[str]:
-        """Extract table references from parsed query"""
-        # Simple implementation - should be enhanced for complex queries
-        tables = []
-        for token in parsed_query.flatten():
-            if token.ttype is None and isinstance(token, sqlparse.sql.Identifier):
-                tables.append(token.get_name())
-        return tables
+    def _validate_references(
+        self,
+        references: QueryReferences,
+        schema_index: SchemaIndex
+    ) -> List[str]:
+        """Check extracted references against schema and return error messages"""
+        if isinstance(references, str):
+            return [references]
+        
+        errors = []
+        tables_referenced, columns_referenced = references
+        
+        tables = schema_index.tables
+        
+        # Validate table references
+        for table in tables_referenced:
+            if table not in tables:
+                errors.append(f"Referenced table not found: {table}")
+        
+        # Validate column references
+        for table, column in columns_referenced:
+            table_info = tables.get(table)
+            if table_info is not None and column not in table_info.column_names:
+                errors.append(f"Referenced column not found: {table}.{column}")
+        
+        return errors
     
-    def _extract_column_references(
+    def _extract_references(
         self,
         parsed_query: sqlparse.sql.Statement
-    ) -> List[tuple[str, str]]:
-        """Extract column references from parsed query"""
-        # Simple implementation - should be enhanced for complex queries
-        columns = []
-        for token in parsed_query.flatten():
-            if token.ttype is None and isinstance(token, sqlparse.sql.Identifier):
-                parts = token.get_name().split('.')
-                if len(parts) == 2:
-                    columns.append((parts[0], parts[1]))
-        return columns
\ No newline at end of file
+    ) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        Extract table and qualified column references from parsed query
+        
+        Tables are identifiers following FROM/JOIN/INTO/UPDATE/TABLE; column
+        references are qualified identifiers elsewhere, with table aliases
+        resolved to the table name. Unqualified columns are not attributed.
+        Names defined in a WITH clause are not tables, so they and columns
+        qualified by them are left out; the CTE bodies are still scanned.
+        """
+        table_refs: List[Tuple[str, Optional[str]]] = []
+        column_refs: List[Tuple[str, str]] = []
+        cte_names: Set[str] = set()
+        self._collect_references(parsed_query, table_refs, column_refs, cte_names)
+        
+        aliases = {alias: name for name, alias in table_refs if alias}
+        tables = list(dict.fromkeys(name for name, _ in table_refs if name not in cte_names))
+        columns = list(dict.fromkeys(
+            (table, column)
+            for table, column in ((aliases.get(parent, parent), column)
+                                  for parent, column in column_refs)
+            if table not in cte_names
+        ))
+        return tables, columns
+    
+    def _collect_references(
+        self,
+        token_list: sqlparse.sql.TokenList,
+        table_refs: List[Tuple[str, Optional[str]]],
+        column_refs: List[Tuple[str, str]],
+        cte_names: Set[str]
+    ) -> None:
+        """
+        Walk the token tree collecting (table, alias) and (qualifier, column)
+        pairs, and the names of common table expressions
+        """
+        expect_table = False
+        expect_cte = False
+        for token in token_list.tokens:
+            if token.is_whitespace or token.ttype in sqlparse.tokens.Comment:
+                continue
+            
+            if token.ttype in sqlparse.tokens.Keyword:
+                keyword = token.normalized
+                expect_table = keyword in _TABLE_KEYWORDS or keyword.endswith('JOIN')
+                expect_cte = keyword == 'WITH' or (expect_cte and keyword == 'RECURSIVE')
+                continue
+            
+            if expect_cte and isinstance(token, (sqlparse.sql.Identifier,
+                                                 sqlparse.sql.IdentifierList)):
+                # WITH name AS (...), ...: the names are query-local
+                if isinstance(token, sqlparse.sql.IdentifierList):
+                    definitions = list(token.get_identifiers())
+                else:
+                    definitions = [token]
+                for definition in definitions:
+                    if isinstance(definition, sqlparse.sql.Identifier) and definition.get_name():
+                        cte_names.add(definition.get_name())
+                self._collect_references(token, table_refs, column_refs, cte_names)
+                expect_cte = False
+                continue
+            expect_cte = False
+            
+            if expect_table and isinstance(token, _TABLE_TOKENS):
+                if isinstance(token, sqlparse.sql.IdentifierList):
+                    candidates = list(token.get_identifiers())
+                else:
+                    candidates = [token]
+                for candidate in candidates:
+                    if isinstance(candidate, sqlparse.sql.Function):
+                        # INSERT INTO table (col, ...): the column list is unqualified
+                        table_refs.append((candidate.get_real_name(), None))
+                    elif isinstance(candidate, sqlparse.sql.Identifier):
+                        if isinstance(candidate.tokens[0], sqlparse.sql.Parenthesis):
+                            # Derived table; only its inner references count
+                            self._collect_references(
+                                candidate.tokens[0], table_refs, column_refs, cte_names
+                            )
+                        else:
+                            table_refs.append((candidate.get_real_name(), candidate.get_alias()))
+                expect_table = False
+                continue
+            
+            expect_table = False
+            if isinstance(token, sqlparse.sql.Identifier) and token.get_parent_name():
+                column = token.get_real_name()
+                if column and column != '*':
+                    column_refs.append((token.get_parent_name(), column))
+            elif token.is_group:
+                self._collect_references(token, table_refs, column_refs, cte_names)
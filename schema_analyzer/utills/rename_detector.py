@@ -0,0 +1,277 @@
+"""Detection of renamed tables and columns among removed and added ones"""
+
+from difflib import SequenceMatcher
+from collections import Counter
+from typing import Dict, List, Any, Callable, FrozenSet, Iterable, Sequence, Set, Tuple
+import hashlib
+import structlog
+from .schema_index import TableInfo
+
+logger = structlog.get_logger()
+
+# Column attributes compared for column structure similarity
+_COLUMN_ATTRIBUTES = ('type', 'nullable', 'default', 'constraints')
+
+def name_similarity(old_name: str, new_name: str) -> float:
+    """Similarity of two names in [0, 1]"""
+    return SequenceMatcher(None, old_name, new_name).ratio()
+
+def column_name_similarity(old_name: str, new_name: str) -> float:
+    """
+    Similarity of two column names without the words they share at either end
+
+    first_name and last_name share _name, which says nothing about one being
+    a rename of the other, so only first and last are compared. When one
+    name merely extends the other (email, email_address) the whole names
+    are compared.
+    """
+    old_words, new_words = old_name.split('_'), new_name.split('_')
+    shortest = min(len(old_words), len(new_words))
+    start = 0
+    while start < shortest and old_words[start] == new_words[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and old_words[-1 - end] == new_words[-1 - end]:
+        end += 1
+    old_core = old_words[start:len(old_words) - end]
+    new_core = new_words[start:len(new_words) - end]
+    if not old_core or not new_core:
+        return name_similarity(old_name, new_name)
+    return name_similarity('_'.join(old_core), '_'.join(new_core))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two sets; two empty sets are identical"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def table_signature(table: TableInfo) -> FrozenSet[str]:
+    """Structure of a table as the set of its column name/type pairs"""
+    return frozenset(f"{name}\0{column['type']}" for name, column in table.columns.items())
+
+def column_structure_similarity(old_column: Dict[str, Any], new_column: Dict[str, Any]) -> float:
+    """Fraction of column attributes other than the name that are equal"""
+    equal = sum(old_column.get(key) == new_column.get(key) for key in _COLUMN_ATTRIBUTES)
+    return equal / len(_COLUMN_ATTRIBUTES)
+
+def _token_hash(token: str) -> int:
+    # Deterministic across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class RenameDetector:
+    """
+    Pairs removed with added tables or columns whose similarity reaches threshold
+
+    Table similarity is TABLE_STRUCTURE_WEIGHT times the Jaccard similarity
+    of the column name/type sets plus the remainder times the name
+    similarity; column similarity weighs the equality of type, nullability,
+    default and constraints against column_name_similarity the same way.
+    A column is only renamed to one of the same type that also sits at the
+    same position in its table or is the only removed and only added column
+    of that type; similar names alone are not enough. Each removed item is
+    renamed to at most one added item, best scores first.
+
+    When there are more than brute_force_pairs possible pairs, candidates
+    come from MinHash signatures banded into an LSH table instead of from
+    all pairs: items only get compared when their signatures collide in at
+    least one band, so similar items are almost always compared and
+    dissimilar ones almost never. Signatures use one permutation hashing,
+    so each token is hashed once rather than once per signature slot.
+    """
+
+    TABLE_STRUCTURE_WEIGHT = 0.75
+    COLUMN_STRUCTURE_WEIGHT = 0.5
+
+    def __init__(
+        self,
+        threshold: float,
+        bands: int = 8,
+        rows: int = 3,
+        brute_force_pairs: int = 256
+    ):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"similarity threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.brute_force_pairs = brute_force_pairs
+
+    def match_tables(
+        self,
+        removed: Sequence[TableInfo],
+        added: Sequence[TableInfo]
+    ) -> List[Tuple[TableInfo, TableInfo, float]]:
+        """
+        Find renamed tables
+
+        Returns:
+            (old table, new table, similarity) for each detected rename
+        """
+        if not removed or not added:
+            return []
+
+        removed_signatures = [table_signature(table) for table in removed]
+        added_signatures = [table_signature(table) for table in added]
+        weight = self.TABLE_STRUCTURE_WEIGHT
+
+        def score(i: int, j: int) -> float:
+            structure = jaccard(removed_signatures[i], added_signatures[j])
+            # Skip the name comparison when even identical names cannot reach threshold
+            if weight * structure + (1 - weight) < self.threshold:
+                return 0.0
+            return weight * structure + (1 - weight) * name_similarity(
+                removed[i].name, added[j].name
+            )
+
+        matches = self._match(removed_signatures, added_signatures, score,
+                              lambda i, j: (removed[i].name, added[j].name))
+        logger.debug("Detected table renames",
+                    num_removed=len(removed), num_added=len(added), num_renamed=len(matches))
+        return [(removed[i], added[j], similarity) for i, j, similarity in matches]
+
+    def match_columns(
+        self,
+        removed: Sequence[Dict[str, Any]],
+        added: Sequence[Dict[str, Any]],
+        old_order: Sequence[str],
+        new_order: Sequence[str]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+        """
+        Find renamed columns of one table
+
+        Args:
+            removed: Columns only in the old table
+            added: Columns only in the new table
+            old_order: Names of all columns of the old table, in order
+            new_order: Names of all columns of the new table, in order
+
+        Returns:
+            (old column, new column, similarity) for each detected rename
+        """
+        if not removed or not added:
+            return []
+
+        weight = self.COLUMN_STRUCTURE_WEIGHT
+        old_positions = {name: position for position, name in enumerate(old_order)}
+        new_positions = {name: position for position, name in enumerate(new_order)}
+        removed_types = Counter(column['type'] for column in removed)
+        added_types = Counter(column['type'] for column in added)
+
+        def corroborated(old_column: Dict[str, Any], new_column: Dict[str, Any]) -> bool:
+            column_type = old_column['type']
+            if new_column['type'] != column_type:
+                return False
+            if old_positions.get(old_column['name']) == new_positions.get(new_column['name']):
+                return True
+            return removed_types[column_type] == added_types[column_type] == 1
+
+        def score(i: int, j: int) -> float:
+            if not corroborated(removed[i], added[j]):
+                return 0.0
+            structure = column_structure_similarity(removed[i], added[j])
+            if weight * structure + (1 - weight) < self.threshold:
+                return 0.0
+            return weight * structure + (1 - weight) * column_name_similarity(
+                removed[i]['name'], added[j]['name']
+            )
+
+        def tokens(column: Dict[str, Any]) -> FrozenSet[str]:
+            # Name trigrams and the type, for LSH candidates
+            name = f"^{column['name']}$"
+            return frozenset([name[k:k + 3] for k in range(len(name) - 2)] + [f"\0{column['type']}"])
+
+        matches = self._match([tokens(c) for c in removed], [tokens(c) for c in added], score,
+                              lambda i, j: (removed[i]['name'], added[j]['name']))
+        return [(removed[i], added[j], similarity) for i, j, similarity in matches]
+
+    def _match(
+        self,
+        removed_tokens: List[FrozenSet[str]],
+        added_tokens: List[FrozenSet[str]],
+        score: Callable[[int, int], float],
+        names: Callable[[int, int], Tuple[str, str]]
+    ) -> List[Tuple[int, int, float]]:
+        """Score candidate pairs and assign them one to one, best first"""
+        if len(removed_tokens) * len(added_tokens) <= self.brute_force_pairs:
+            candidates: Iterable[Tuple[int, int]] = (
+                (i, j) for i in range(len(removed_tokens)) for j in range(len(added_tokens))
+            )
+        else:
+            candidates = self._lsh_candidates(removed_tokens, added_tokens)
+
+        scored = []
+        for i, j in candidates:
+            similarity = score(i, j)
+            if similarity >= self.threshold:
+                scored.append((-similarity, names(i, j), i, j))
+        # Names break ties, so the outcome does not depend on candidate order
+        scored.sort()
+
+        used_removed: Set[int] = set()
+        used_added: Set[int] = set()
+        matches = []
+        for negative_similarity, _, i, j in scored:
+            if i not in used_removed and j not in used_added:
+                used_removed.add(i)
+                used_added.add(j)
+                matches.append((i, j, -negative_similarity))
+        return matches
+
+    def _lsh_candidates(
+        self,
+        removed_tokens: List[FrozenSet[str]],
+        added_tokens: List[FrozenSet[str]]
+    ) -> Set[Tuple[int, int]]:
+        """Pairs of removed and added items sharing at least one LSH band"""
+        buckets: Dict[Tuple[int, Tuple[Any, ...]], Tuple[List[int], List[int]]] = {}
+        # Tokens such as id/integer recur across many tables
+        hashes: Dict[str, int] = {}
+        for side, token_sets in enumerate((removed_tokens, added_tokens)):
+            for index, tokens in enumerate(token_sets):
+                if not tokens:
+                    continue
+                signature = self._minhash(tokens, hashes)
+                for band in range(self.bands):
+                    key = (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                    buckets.setdefault(key, ([], []))[side].append(index)
+
+        candidates: Set[Tuple[int, int]] = set()
+        for bucket_removed, bucket_added in buckets.values():
+            for i in bucket_removed:
+                for j in bucket_added:
+                    candidates.add((i, j))
+        return candidates
+
+    def _minhash(self, tokens: FrozenSet[str], hashes: Dict[str, int]) -> List[Any]:
+        """
+        MinHash signature by one permutation hashing
+
+        Token hashes are split into bands * rows bins, keeping the minimum
+        of each bin. Empty bins take the value of the next non-empty bin to
+        their right, tagged with the distance (rotation densification), so
+        two sets agree in a slot with probability equal to their Jaccard
+        similarity.
+        """
+        size = self.bands * self.rows
+        bins: List[Any] = [None] * size
+        for token in tokens:
+            h = hashes.get(token)
+            if h is None:
+                h = hashes[token] = _token_hash(token)
+            slot, value = h % size, h // size
+            current = bins[slot]
+            if current is None or value < current:
+                bins[slot] = value
+
+        signature = list(bins)
+        # Right of the last bin, the search wraps around to the first non-empty one
+        first = next(k for k, value in enumerate(bins) if value is not None)
+        nearest, distance = bins[first], first
+        for k in range(size - 1, -1, -1):
+            value = bins[k]
+            if value is None:
+                distance += 1
+                signature[k] = (nearest, distance)
+            else:
+                nearest, distance = value, 0
+        return signature
@@ -0,0 +1,97 @@
+"""Compact, immutable lookup structure over a database schema"""
+
+from typing import Dict, List, Any, FrozenSet, Optional, Tuple, Union
+import sys
+
+_intern = sys.intern
+
+class TableInfo:
+    """
+    A table of a SchemaIndex
+
+    columns maps column names to the source column dicts and column_names
+    is the frozen set of those names. Both are built on first
+    use and then kept, so tables that no stage looks at cost one small
+    record and each table is indexed at most once.
+    """
+
+    __slots__ = ('name', 'definition', '_columns', '_column_names')
+
+    def __init__(self, name: str, definition: Dict[str, Any]):
+        self.name = name
+        self.definition = definition
+        self._columns: Optional[Dict[str, Dict[str, Any]]] = None
+        self._column_names: Optional[FrozenSet[str]] = None
+
+    @property
+    def columns(self) -> Dict[str, Dict[str, Any]]:
+        columns = self._columns
+        if columns is None:
+            columns = {c['name']: c for c in self.definition['columns']}
+            self._columns = columns
+        return columns
+
+    @property
+    def column_names(self) -> FrozenSet[str]:
+        names = self._column_names
+        if names is None:
+            names = frozenset(self.columns)
+            self._column_names = names
+        return names
+
+class SchemaIndex:
+    """
+    Tables and columns of a schema, indexed by name
+
+    Built once per schema and shared by diffing and query validation.
+    Building it costs one __slots__ record per table with an interned name;
+    column maps and name sets are added per table as stages ask for them.
+    The index and the schema it was built from must not be modified
+    afterwards. sorted_tables lists tables by name, keeping the last
+    definition of a repeated name.
+    """
+
+    __slots__ = ('tables', 'sorted_tables')
+
+    def __init__(self, tables: Tuple[TableInfo, ...]):
+        self.tables: Dict[str, TableInfo] = {table.name: table for table in tables}
+        self.sorted_tables = tables
+
+    @classmethod
+    def build(cls, schema: Dict[str, Any]) -> "SchemaIndex":
+        """Index a schema in the SchemaValidator.SCHEMA_DEFINITION shape"""
+        tables: Dict[str, TableInfo] = {}
+        for table in schema['tables']:
+            name = _intern(table['name'])
+            tables[name] = TableInfo(name, table)
+
+        names = list(tables)
+        if any(names[k] >= names[k + 1] for k in range(len(names) - 1)):
+            names.sort()
+        return cls(tuple(tables[name] for name in names))
+
+    @classmethod
+    def of(cls, schema: Union[Dict[str, Any], "SchemaIndex"]) -> "SchemaIndex":
+        """Return schema itself if it is already an index, else index it"""
+        if isinstance(schema, SchemaIndex):
+            return schema
+        return cls.build(schema)
+
+    def __len__(self) -> int:
+        return len(self.sorted_tables)
+
+    def __contains__(self, table_name: str) -> bool:
+        return table_name in self.tables
+
+    def table(self, table_name: str) -> Optional[TableInfo]:
+        """Table record by name"""
+        return self.tables.get(table_name)
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        """Whether table_name exists and has column_name"""
+        table = self.tables.get(table_name)
+        return table is not None and column_name in table.column_names
+
+    def table_names(self) -> List[str]:
+        """Table names in sorted order"""
+        return [table.name for table in self.sorted_tables]
@@ -1,8 +1,9 @@
 """Schema validation utilities"""
 
-from typing import Dict, Any
+from typing import Dict, List, Any, Optional
 import jsonschema
 import structlog
+from .cache import LRUCache
 
 logger = structlog.get_logger()
 
@@ -43,19 +44,140 @@ class SchemaValidator:
         }
     }
     
-    async def validate(self, schema: Dict[str, Any]) -> None:
+    _compiled_validator: Optional[Any] = None
+    
+    def __init__(self, cache_size: int = 256):
+        # Content hashes of schemas that already passed validation
+        self._validated = LRUCache(cache_size)
+    
+    @classmethod
+    def _get_validator(cls) -> Any:
+        """Return the validator for SCHEMA_DEFINITION, compiled once per process"""
+        if cls._compiled_validator is None:
+            validator_cls = jsonschema.validators.validator_for(cls.SCHEMA_DEFINITION)
+            validator_cls.check_schema(cls.SCHEMA_DEFINITION)
+            cls._compiled_validator = validator_cls(cls.SCHEMA_DEFINITION)
+        return cls._compiled_validator
+    
+    async def validate(
+        self,
+        schema: Dict[str, Any],
+        schema_hash: Optional[str] = None
+    ) -> None:
         """
         Validate schema against defined schema definition
         
+        The common valid case is accepted by a structural pre-check; full
+        jsonschema validation only runs when the pre-check rejects the schema,
+        so error reporting is unchanged. Callers that already know the
+        schema's content hash can pass it to skip schemas that passed before.
+        
+        Args:
+            schema: Database schema to validate
+            schema_hash: Optional content hash identifying schema
+            
+        Raises:
+            jsonschema.exceptions.ValidationError: If schema is invalid
+        """
+        self.validate_sync(schema, schema_hash)
+    
+    def validate_sync(
+        self,
+        schema: Dict[str, Any],
+        schema_hash: Optional[str] = None
+    ) -> None:
+        """Synchronous form of validate, for use from executor threads"""
+        if schema_hash is not None and self._validated.get(schema_hash):
+            logger.info("Schema validation successful", cached=True)
+            return
+        
+        if not self._fast_check(schema):
+            try:
+                self._get_validator().validate(schema)
+            except jsonschema.exceptions.ValidationError as e:
+                logger.error("Schema validation failed", error=str(e))
+                raise
+        
+        if schema_hash is not None:
+            self._validated.put(schema_hash, True)
+        logger.info("Schema validation successful", cached=False)
+    
+    def validate_incremental_sync(
+        self,
+        schema: Dict[str, Any],
+        changed_tables: List[Dict[str, Any]],
+        schema_hash: Optional[str] = None
+    ) -> None:
+        """
+        Validate a schema whose other tables are known to be valid
+        
+        Only changed_tables go through the structural pre-check; the whole
+        schema is validated only if that fails, so errors point at the
+        original location.
+        
         Args:
             schema: Database schema to validate
+            changed_tables: Tables of schema not present in a validated version
+            schema_hash: Optional content hash identifying schema
             
         Raises:
             jsonschema.exceptions.ValidationError: If schema is invalid
         """
-        try:
-            jsonschema.validate(schema, self.SCHEMA_DEFINITION)
-            logger.info("Schema validation successful")
-        except jsonschema.exceptions.ValidationError as e:
-            logger.error("Schema validation failed", error=str(e))
-            raise
\ No newline at end of file
+        if schema_hash is not None and self._validated.get(schema_hash):
+            return
+        
+        if not (isinstance(schema, dict) and isinstance(schema.get('tables'), list)
+                and self._fast_check({'tables': changed_tables})):
+            self.validate_sync(schema, schema_hash)
+            return
+        
+        if schema_hash is not None:
+            self._validated.put(schema_hash, True)
+    
+    @staticmethod
+    def _fast_check(schema: Any) -> bool:
+        """
+        Structural pre-check equivalent to SCHEMA_DEFINITION for valid input
+        
+        Returns True only when the schema is certainly valid; False means the
+        full validator must decide and report the error.
+        """
+        if not isinstance(schema, dict):
+            return False
+        tables = schema.get('tables')
+        if not isinstance(tables, list):
+            return False
+        
+        for table in tables:
+            if not isinstance(table, dict):
+                return False
+            if not isinstance(table.get('name'), str):
+                return False
+            columns = table.get('columns')
+            if not isinstance(columns, list):
+                return False
+            
+            for column in columns:
+                if not isinstance(column, dict):
+                    return False
+                if not isinstance(column.get('name'), str):
+                    return False
+                if not isinstance(column.get('type'), str):
+                    return False
+                if 'nullable' in column and not isinstance(column['nullable'], bool):
+                    return False
+                if 'default' in column:
+                    default = column['default']
+                    if isinstance(default, bool) or not (
+                        default is None or isinstance(default, (str, int, float))
+                    ):
+                        return False
+                if 'constraints' in column:
+                    constraints = column['constraints']
+                    if not isinstance(constraints, list):
+                        return False
+                    for constraint in constraints:
+                        if not isinstance(constraint, str):
+                            return False
+        
+        return True
\ No newline at end of file
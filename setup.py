@@ -27,10 +27,13 @@ setup(
         "structlog==23.1.0",
         "elasticsearch==8.8.0",
         "sentry-sdk==1.25.1",
+        "fastapi==0.95.2",
+        "uvicorn==0.22.0",
         "python-jose[cryptography]==3.3.0",
         "passlib[bcrypt]==1.7.4",
         "locust==2.15.1",
         "psycopg2-binary==2.9.3",
+        "asyncpg==0.27.0",
         "pyyaml==6.0",
         "pytest==7.1.2",
         "sqlparse==0.4.2",
@@ -44,10 +47,14 @@ setup(
             "mypy",
             "isort",
         ],
+        "tracing": [
+            "opentelemetry-api",
+        ],
     },
     entry_points={
         "console_scripts": [
             "schema-evolution-analyzer=schema_analyzer.cli:main",
+            "schema-evolution-analyzer-api=schema_analyzer.api:main",
         ],
     },
 )
\ No newline at end of file
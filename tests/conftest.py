@@ -0,0 +1,6 @@
+"""Shared test setup: import schema_analyzer from the source tree"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
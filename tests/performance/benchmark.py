@@ -0,0 +1,239 @@
+"""
+Offline microbenchmarks for the schema analysis pipeline
+
+Runs SchemaValidator, DiffGenerator, ImpactAnalyzer, QueryValidator and the
+full SchemaAnalyzer pipeline against deterministic synthetic workloads and
+reports throughput, latency percentiles and peak memory. Results can be
+saved as a baseline and later runs compared against it:
+
+    PYTHONPATH=. python tests/performance/benchmark.py --output baseline.json
+    PYTHONPATH=. python tests/performance/benchmark.py --baseline baseline.json
+
+The comparison exits with status 1 when a median latency or peak memory
+exceeds the baseline by more than the tolerance.
+"""
+
+from typing import Dict, List, Any, Callable, Optional, Tuple
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import structlog
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_queries, generate_schema, mutate_schema  # noqa: E402
+from schema_analyzer.analyze import SchemaAnalyzer  # noqa: E402
+from schema_analyzer.utils.diff_generator import DiffGenerator  # noqa: E402
+from schema_analyzer.utils.impact_analyzer import ImpactAnalyzer  # noqa: E402
+from schema_analyzer.utils.query_validator import QueryValidator  # noqa: E402
+from schema_analyzer.utils.schema_validator import SchemaValidator  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+class Workload:
+    """Inputs shared by all benchmarks of one schema size"""
+
+    def __init__(self, num_tables: int, change_rate: float, num_queries: int, seed: int):
+        self.num_tables = num_tables
+        self.old_schema = generate_schema(num_tables, seed=seed)
+        self.new_schema = mutate_schema(self.old_schema, change_rate, seed=seed + 1)
+        self.queries = generate_queries(self.new_schema, num_queries, seed=seed + 2)
+        self.changes = DiffGenerator().generate_diff_sync(self.old_schema, self.new_schema)
+
+def bench_schema_validator(workload: Workload) -> Tuple[Callable[[], Any], int, str]:
+    validator = SchemaValidator()
+    return (lambda: validator.validate_sync(workload.new_schema),
+            workload.num_tables, 'tables')
+
+def bench_diff_generator(workload: Workload) -> Tuple[Callable[[], Any], int, str]:
+    generator = DiffGenerator()
+    return (lambda: generator.generate_diff_sync(workload.old_schema, workload.new_schema),
+            workload.num_tables, 'tables')
+
+def bench_impact_analyzer(workload: Workload) -> Tuple[Callable[[], Any], int, str]:
+    analyzer = ImpactAnalyzer()
+    return (lambda: analyzer.analyze_impact_sync(workload.changes),
+            len(workload.changes), 'changes')
+
+def bench_query_validator(workload: Workload) -> Tuple[Callable[[], Any], int, str]:
+    # A new validator per run, so every run pays the parsing cost
+    return (lambda: QueryValidator().validate_queries_sync(workload.queries, workload.new_schema),
+            len(workload.queries), 'queries')
+
+def bench_pipeline(workload: Workload) -> Tuple[Callable[[], Any], int, str]:
+    analyzer = SchemaAnalyzer({'cache': {'enabled': False}})
+    loop = asyncio.new_event_loop()
+
+    def run() -> Any:
+        return loop.run_until_complete(analyzer.analyze_schema_changes(
+            workload.old_schema, workload.new_schema, workload.queries
+        ))
+    return run, workload.num_tables, 'tables'
+
+BENCHMARKS: Dict[str, Callable[[Workload], Tuple[Callable[[], Any], int, str]]] = {
+    'schema_validator': bench_schema_validator,
+    'diff_generator': bench_diff_generator,
+    'impact_analyzer': bench_impact_analyzer,
+    'query_validator': bench_query_validator,
+    'pipeline': bench_pipeline,
+}
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def measure(op: Callable[[], Any], repeat: int, warmup: int) -> Dict[str, float]:
+    """Time repeat runs of op after warmup runs, then one run under tracemalloc"""
+    for _ in range(warmup):
+        op()
+
+    samples = []
+    gc.collect()
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - start_time)
+
+    # Memory is measured separately; tracemalloc slows down the timed runs
+    gc.collect()
+    tracemalloc.start()
+    try:
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'mean': statistics.mean(samples),
+        'min': min(samples),
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'peak_memory_bytes': peak,
+    }
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Run the selected benchmarks for every size"""
+    results = []
+    for size in args.sizes:
+        workload = Workload(size, args.change_rate, args.queries, args.seed)
+        repeat = args.repeat if size < 10000 else max(3, args.repeat // 3)
+        for name in args.components:
+            op, items, unit = BENCHMARKS[name](workload)
+            stats = measure(op, repeat, args.warmup)
+            result = {
+                'component': name,
+                'size': size,
+                'change_rate': args.change_rate,
+                'queries': args.queries,
+                'repeat': repeat,
+                'items': items,
+                'unit': unit,
+                'throughput': items / stats['p50'] if stats['p50'] else 0.0,
+                **stats,
+            }
+            results.append(result)
+            print(format_result(result), flush=True)
+    return results
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (
+        f"{result['component']:<18} {result['size']:>7} tables  "
+        f"p50 {result['p50'] * 1000:10.2f} ms  "
+        f"p95 {result['p95'] * 1000:10.2f} ms  "
+        f"p99 {result['p99'] * 1000:10.2f} ms  "
+        f"{result['throughput']:14.0f} {result['unit']}/s  "
+        f"peak {result['peak_memory_bytes'] / 2 ** 20:8.1f} MiB"
+    )
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float,
+    memory_tolerance: float
+) -> List[str]:
+    """Regressions of results against baseline, as messages"""
+    base = {(r['component'], r['size']): r for r in baseline}
+    regressions = []
+    for result in results:
+        reference = base.get((result['component'], result['size']))
+        if reference is None:
+            continue
+        label = f"{result['component']} @ {result['size']} tables"
+        if result['p50'] > reference['p50'] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p50 {result['p50'] * 1000:.2f} ms vs baseline "
+                f"{reference['p50'] * 1000:.2f} ms"
+            )
+        if result['peak_memory_bytes'] > reference['peak_memory_bytes'] * (1 + memory_tolerance):
+            regressions.append(
+                f"{label}: peak memory {result['peak_memory_bytes'] / 2 ** 20:.1f} MiB vs "
+                f"baseline {reference['peak_memory_bytes'] / 2 ** 20:.1f} MiB"
+            )
+    return regressions
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')],
+                        default=DEFAULT_SIZES,
+                        help="comma separated table counts, e.g. 10,1000,100000")
+    parser.add_argument('--components', type=lambda s: s.split(','),
+                        default=list(BENCHMARKS),
+                        help=f"comma separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument('--change-rate', type=float, default=0.05,
+                        help="fraction of tables changed in the new schema")
+    parser.add_argument('--queries', type=int, default=1000,
+                        help="size of the query corpus")
+    parser.add_argument('--repeat', type=int, default=9, help="timed runs per benchmark")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs per benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results of an earlier run")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative p50 latency increase over the baseline")
+    parser.add_argument('--memory-tolerance', type=float, default=0.1,
+                        help="allowed relative peak memory increase over the baseline")
+    args = parser.parse_args(argv)
+    unknown = set(args.components) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown components: {', '.join(sorted(unknown))}")
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Deterministic synthetic schemas, schema changes and query corpora for benchmarks"""
+
+from typing import Dict, List, Any, Tuple
+import copy
+import random
+
+COLUMN_TYPES = ['INTEGER', 'BIGINT', 'TEXT', 'VARCHAR', 'BOOLEAN', 'TIMESTAMP', 'NUMERIC', 'JSONB']
+
+def generate_schema(
+    num_tables: int,
+    min_columns: int = 3,
+    max_columns: int = 12,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Generate a schema of num_tables tables
+    
+    Every table has an 'id' column followed by min_columns..max_columns
+    typed columns. The same arguments always produce the same schema.
+    """
+    rng = random.Random(seed)
+    tables = []
+    for i in range(num_tables):
+        columns = [{'name': 'id', 'type': 'BIGINT', 'nullable': False}]
+        for j in range(rng.randint(min_columns, max_columns)):
+            columns.append({
+                'name': f"col_{j}",
+                'type': rng.choice(COLUMN_TYPES),
+                'nullable': rng.random() < 0.5
+            })
+        tables.append({'name': f"table_{i:06d}", 'columns': columns})
+    return {'tables': tables}
+
+def mutate_schema(
+    schema: Dict[str, Any],
+    change_rate: float = 0.05,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Derive a new schema version with change_rate of its tables changed
+    
+    Each changed table gets one change: a column added, removed, retyped
+    or made (non-)nullable, or the table removed. New tables amounting to
+    a tenth of the changed ones are appended. The input is not modified.
+    """
+    rng = random.Random(seed)
+    tables = [copy.deepcopy(t) for t in schema['tables']]
+    changed = rng.sample(range(len(tables)), int(len(tables) * change_rate))
+    removed = set()
+    
+    for index in changed:
+        table = tables[index]
+        columns = table['columns']
+        action = rng.choice(['add', 'remove', 'retype', 'nullable', 'drop_table'])
+        if action == 'add':
+            columns.append({
+                'name': f"added_{len(columns)}",
+                'type': rng.choice(COLUMN_TYPES),
+                'nullable': True
+            })
+        elif action == 'remove' and len(columns) > 1:
+            columns.pop(rng.randrange(1, len(columns)))
+        elif action == 'retype':
+            column = rng.choice(columns[1:] or columns)
+            column['type'] = rng.choice([t for t in COLUMN_TYPES if t != column['type']])
+        elif action == 'nullable':
+            column = rng.choice(columns[1:] or columns)
+            column['nullable'] = not column.get('nullable', True)
+        else:
+            removed.add(index)
+    
+    tables = [t for i, t in enumerate(tables) if i not in removed]
+    for k in range(len(changed) // 10):
+        tables.append({
+            'name': f"new_table_{k:06d}",
+            'columns': [{'name': 'id', 'type': 'BIGINT', 'nullable': False}]
+        })
+    return {'tables': tables}
+
+def generate_queries(
+    schema: Dict[str, Any],
+    num_queries: int,
+    duplicate_rate: float = 0.3,
+    seed: int = 0
+) -> List[str]:
+    """
+    Generate a corpus of SELECT/UPDATE/INSERT statements over schema
+    
+    duplicate_rate of the queries repeat an earlier statement with other
+    literal values, as parameterized application queries do.
+    """
+    rng = random.Random(seed)
+    tables = schema['tables']
+    queries: List[str] = []
+    templates: List[Tuple[str, ...]] = []
+    
+    for _ in range(num_queries):
+        if templates and rng.random() < duplicate_rate:
+            template = rng.choice(templates)
+            queries.append(template[0].format(value=rng.randint(1, 10 ** 6)))
+            continue
+        
+        table = rng.choice(tables)
+        column = rng.choice(table['columns'])['name']
+        kind = rng.random()
+        if kind < 0.6:
+            other = rng.choice(tables)
+            other_column = rng.choice(other['columns'])['name']
+            template = (
+                f"SELECT a.{column}, b.{other_column} FROM {table['name']} a "
+                f"JOIN {other['name']} b ON a.id = b.id WHERE a.id = {{value}}",
+            )
+        elif kind < 0.85:
+            template = (
+                f"UPDATE {table['name']} SET {column} = {{value}} "
+                f"WHERE {table['name']}.id = {{value}}",
+            )
+        else:
+            template = (
+                f"INSERT INTO {table['name']} (id, {column}) VALUES ({{value}}, {{value}})",
+            )
+        templates.append(template)
+        queries.append(template[0].format(value=rng.randint(1, 10 ** 6)))
+    
+    return queries
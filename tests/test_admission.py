@@ -0,0 +1,93 @@
+"""Tests for rate limiting and admission control"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from schema_analyzer.admission import AdmissionController, Overloaded, RateLimited, RateLimiter
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.api import create_app
+from schema_analyzer.jobs import JobQueue
+from schema_analyzer.metrics import ACTIVE_ANALYSES, gauge_value
+from schema_analyzer.storage import MemoryStorage
+
+OLD = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'}]}]}
+NEW = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]}]}
+
+def test_rate_limiter_is_per_client():
+    limiter = RateLimiter(60, burst=2)
+    limiter.check('a')
+    limiter.check('a')
+    limiter.check('b')
+
+    with pytest.raises(RateLimited) as excinfo:
+        limiter.check('a')
+    assert 0 < excinfo.value.retry_after <= 1.0
+
+def test_queue_is_served_in_order_and_sheds_when_full():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    order = []
+
+    async def request(name, hold):
+        async with admission.admit(1):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        first = asyncio.ensure_future(request('first', 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(request('second', 0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await request('third', 0)
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+
+    assert order == ['first', 'second']
+
+def test_finished_job_wakes_queued_requests(monkeypatch):
+    def slow_diff(self, *args):
+        time.sleep(0.3)
+        return []
+    monkeypatch.setattr(SchemaAnalyzer, '_generate_diff', slow_diff)
+    admission = AdmissionController(max_concurrent=2, queue_timeout=3.0)
+
+    async def main():
+        analyzer = SchemaAnalyzer({'performance': {'executor': 'thread'}, 'cache': {'enabled': False}})
+        jobs = JobQueue(analyzer, MemoryStorage(), admission=admission)
+        jobs.start()
+        try:
+            await jobs.submit(OLD, NEW)
+            while gauge_value(ACTIVE_ANALYSES) < 1:
+                await asyncio.sleep(0.01)
+            async with admission.admit(1):
+                # The admitted request's own analysis plus the job fill both slots
+                ACTIVE_ANALYSES.inc()
+                try:
+                    start_time = time.perf_counter()
+                    async with admission.admit(1):
+                        return time.perf_counter() - start_time
+                finally:
+                    ACTIVE_ANALYSES.dec()
+        finally:
+            await jobs.close()
+            await analyzer.close()
+
+    assert asyncio.run(main()) < 1.0
+
+def test_token_endpoint_is_rate_limited_per_client_ip():
+    app = create_app({
+        'security': {'secret_key': 'secret', 'algorithm': 'HS256',
+                     'access_token_expire_minutes': 30, 'users': {}},
+        'performance': {'token_rate_limit': 3, 'token_rate_limit_burst': 3},
+    })
+    client = TestClient(app)
+    credentials = {'username': 'nobody', 'password': 'wrong'}
+
+    statuses = [client.post('/token', data=credentials).status_code for _ in range(4)]
+
+    assert statuses == [401, 401, 401, 429]
+    assert 'Retry-After' in client.post('/token', data=credentials).headers
@@ -0,0 +1,106 @@
+"""Tests for the SchemaAnalyzer pipeline"""
+
+import asyncio
+import threading
+import time
+
+import jsonschema
+import pytest
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.utils.cancellation import StageCancelled, check_cancelled
+
+OLD = {'tables': [
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                  {'name': 'email', 'type': 'TEXT'}]},
+    {'name': 'orders', 'columns': [{'name': 'id', 'type': 'INTEGER'}]},
+]}
+NEW = {'tables': [
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]},
+]}
+QUERIES = ["SELECT u.email FROM users u", "SELECT * FROM orders", "SELECT u.id FROM users u"]
+
+def analyze(config, old=OLD, new=NEW, queries=QUERIES):
+    async def main():
+        analyzer = SchemaAnalyzer(config)
+        try:
+            result = await analyzer.analyze_schema_changes(old, new, queries)
+        finally:
+            await analyzer.close()
+        result.pop('timestamp')
+        return result
+    return asyncio.run(main())
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_executors_produce_the_inline_result(executor):
+    inline = analyze({'performance': {'executor': 'inline'}})
+
+    assert analyze({'performance': {'executor': executor, 'max_workers': 2}}) == inline
+
+def test_result_contents():
+    result = analyze({'performance': {'executor': 'inline'}})
+
+    assert [c['type'] for c in result['changes']] == \
+        ['table_removed', 'column_removed', 'column_type_changed']
+    assert result['impact']['severity'] == 'high'
+    assert result['impact']['data_loss_risk']
+    assert [r['is_valid'] for r in result['query_validation']] == [False, False, True]
+    assert {a['query'] for a in result['affected_queries']} == set(QUERIES)
+
+def test_invalid_schema_is_rejected():
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        analyze({'performance': {'executor': 'thread'}}, new={'tables': [{'name': 'x'}]})
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        SchemaAnalyzer({'performance': {'executor': 'gpu'}})
+
+def test_request_timeout_bounds_the_analysis(monkeypatch):
+    def slow_diff(self, *args):
+        time.sleep(0.5)
+        return []
+    monkeypatch.setattr(SchemaAnalyzer, '_generate_diff', slow_diff)
+
+    with pytest.raises(asyncio.TimeoutError):
+        analyze({'performance': {'executor': 'thread', 'request_timeout': 0.05}})
+
+def test_timed_out_stage_stops_in_its_thread(monkeypatch):
+    stopped = threading.Event()
+
+    def slow_diff(self, *args):
+        # Bounded, so a stage that is never cancelled fails the test instead of hanging it
+        deadline = time.monotonic() + 3.0
+        try:
+            while time.monotonic() < deadline:
+                check_cancelled()
+                time.sleep(0.01)
+        except StageCancelled:
+            stopped.set()
+            raise
+        return []
+    monkeypatch.setattr(SchemaAnalyzer, '_generate_diff', slow_diff)
+
+    with pytest.raises(asyncio.TimeoutError):
+        analyze({'performance': {'executor': 'thread', 'request_timeout': 0.1}})
+
+    assert stopped.wait(1.0)
+
+def test_stage_listener_sees_each_stage():
+    events = []
+
+    async def on_stage(stage, event):
+        events.append((stage, event))
+
+    async def main():
+        analyzer = SchemaAnalyzer({'performance': {'executor': 'thread'}})
+        try:
+            await analyzer.analyze_schema_changes(OLD, NEW, QUERIES, on_stage=on_stage)
+        finally:
+            await analyzer.close()
+
+    asyncio.run(main())
+
+    assert events.count(('prepare_schema', 'started')) == 2
+    assert events.count(('prepare_schema', 'completed')) == 2
+    for stage in ('generate_diff', 'analyze_impact', 'validate_queries', 'find_affected_queries'):
+        assert events.index((stage, 'started')) < events.index((stage, 'completed'))
@@ -0,0 +1,115 @@
+"""Tests for the HTTP service"""
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from schema_analyzer.api import create_app, iter_json
+from schema_analyzer.security import SecurityConfig
+from schema_analyzer.storage import JsonSerializer
+
+API_KEY = 'test-key'
+HEADERS = {'X-API-Key': API_KEY}
+OLD = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                                {'name': 'email', 'type': 'TEXT'}]}]}
+NEW = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]}]}
+
+@pytest.fixture
+def client():
+    app = create_app({
+        'security': {'secret_key': 'secret', 'algorithm': 'HS256',
+                     'access_token_expire_minutes': 30,
+                     'api_keys': {'tests': SecurityConfig.hash_api_key(API_KEY)}},
+        'performance': {'executor': 'inline', 'max_payload_size': 10_000},
+    })
+    with TestClient(app) as client:
+        yield client
+
+def test_iter_json_matches_a_single_dump():
+    document = {'a': [{'n': i} for i in range(25)], 'b': {'c': [], 'd': 'x'}, 'e': None}
+    serializer = JsonSerializer()
+
+    chunks = list(iter_json(document, serializer, chunk_items=10))
+
+    assert len(chunks) > 10
+    assert json.loads(b''.join(chunks)) == document
+
+def test_analysis_is_returned_and_stored(client):
+    response = client.post('/analyze', headers=HEADERS,
+                           json={'old_schema': OLD, 'new_schema': NEW,
+                                 'queries': ["SELECT u.email FROM users u"]})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert {c['type'] for c in result['changes']} == {'column_removed', 'column_type_changed'}
+
+    session_id = result['session_id']
+    stored = client.get(f"/results/{session_id}", headers=HEADERS).json()
+    assert stored['changes'] == result['changes']
+    fields = client.get(f"/results/{session_id}", headers=HEADERS,
+                        params={'fields': 'impact.data_loss_risk,missing'}).json()
+    assert fields == {'impact.data_loss_risk': True, 'missing': None}
+    listed = client.get('/results', headers=HEADERS).json()
+    assert [row['session_id'] for row in listed['results']] == [session_id]
+
+def test_jobs_run_in_the_background(client):
+    response = client.post('/jobs', headers=HEADERS, json={'old_schema': OLD, 'new_schema': NEW})
+    assert response.status_code == 202
+    session_id = response.json()['session_id']
+
+    deadline = time.monotonic() + 5.0
+    record = None
+    while time.monotonic() < deadline:
+        record = client.get(f"/jobs/{session_id}", headers=HEADERS).json()
+        if record['status'] == 'completed':
+            break
+        time.sleep(0.01)
+
+    assert record['status'] == 'completed'
+    assert client.get(f"/results/{session_id}", headers=HEADERS).status_code == 200
+    assert client.delete(f"/jobs/{session_id}", headers=HEADERS).status_code == 409
+    assert client.get('/jobs/unknown', headers=HEADERS).status_code == 404
+
+@pytest.mark.parametrize('headers, body, expected', [
+    ({}, {'old_schema': OLD, 'new_schema': NEW}, 401),
+    ({'X-API-Key': 'wrong'}, {'old_schema': OLD, 'new_schema': NEW}, 401),
+    (HEADERS, {'old_schema': OLD}, 422),
+    (HEADERS, {'old_schema': {'tables': 'users'}, 'new_schema': NEW}, 422),
+    (HEADERS, {'old_schema': OLD, 'new_schema': NEW, 'padding': 'x' * 20_000}, 413),
+    (HEADERS, {'old_schema': OLD, 'new_schema': NEW, 'queries': 'SELECT 1'}, 422),
+    (HEADERS, {'old_schema': OLD, 'new_schema': NEW, 'queries': [1]}, 422),
+    (HEADERS, {'old_schema': OLD, 'new_schema': NEW, 'priority': 'urgent'}, 422),
+    (HEADERS, [OLD, NEW], 422),
+])
+def test_bad_requests_are_rejected(client, headers, body, expected):
+    assert client.post('/analyze', headers=headers, json=body).status_code == expected
+
+def test_only_json_bodies_are_accepted(client):
+    response = client.post('/analyze', headers={**HEADERS, 'Content-Type': 'text/plain'},
+                           content=b'old=1')
+
+    assert response.status_code == 415
+
+@pytest.mark.parametrize('content_type, body, expected', [
+    ('application/json', b'{"username": ', 400),
+    ('application/json', b'["alice", "secret"]', 422),
+    ('application/json', b'"alice"', 422),
+    ('application/json', b'{"username": ["alice"], "password": "secret"}', 422),
+    ('application/json', b'{"username": "alice", "password": 1}', 422),
+    ('application/x-www-form-urlencoded', b'\xff', 400),
+    ('application/json', b'{"username": "nobody", "password": "secret"}', 401),
+    ('application/x-www-form-urlencoded', b'username=nobody&password=secret', 401),
+])
+def test_malformed_credentials_are_client_errors(client, content_type, body, expected):
+    response = client.post('/token', headers={'Content-Type': content_type}, content=body)
+
+    assert response.status_code == expected
+
+def test_jobs_reject_unknown_priorities(client):
+    response = client.post('/jobs', headers=HEADERS,
+                           json={'old_schema': OLD, 'new_schema': NEW, 'priority': 'urgent'})
+
+    assert response.status_code == 422
+    assert 'urgent' in response.json()['detail']
@@ -0,0 +1,48 @@
+"""Tests for the offline benchmark suite and its synthetic workloads"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'performance'))
+
+import benchmark  # noqa: E402
+from synthetic import generate_queries, generate_schema, mutate_schema  # noqa: E402
+from schema_analyzer.utils.diff_generator import DiffGenerator  # noqa: E402
+from schema_analyzer.utils.schema_validator import SchemaValidator  # noqa: E402
+
+def test_workloads_are_deterministic_and_valid():
+    schema = generate_schema(50, seed=3)
+    mutated = mutate_schema(schema, 0.2, seed=4)
+
+    assert schema == generate_schema(50, seed=3)
+    assert mutated == mutate_schema(schema, 0.2, seed=4)
+    assert generate_queries(mutated, 40, seed=5) == generate_queries(mutated, 40, seed=5)
+    assert len(schema['tables']) == 50
+    SchemaValidator().validate_sync(schema)
+    SchemaValidator().validate_sync(mutated)
+    # mutate_schema leaves its input alone and changes about change_rate of the tables
+    assert schema == generate_schema(50, seed=3)
+    assert 1 <= len(DiffGenerator().generate_diff_sync(schema, mutated)) <= 11
+
+def test_run_reports_every_component_and_size():
+    args = benchmark.parse_args(['--sizes', '10,20', '--queries', '20', '--repeat', '2'])
+
+    results = benchmark.run(args)
+
+    assert [(r['component'], r['size']) for r in results] == [
+        (name, size) for size in (10, 20) for name in benchmark.BENCHMARKS
+    ]
+    assert all(r['p50'] <= r['p99'] and r['peak_memory_bytes'] > 0 for r in results)
+
+def test_regressions_beyond_the_tolerance_are_reported():
+    baseline = [{'component': 'diff_generator', 'size': 10, 'p50': 1.0,
+                 'peak_memory_bytes': 1000}]
+
+    def result(p50, memory):
+        return [dict(baseline[0], p50=p50, peak_memory_bytes=memory)]
+
+    assert benchmark.compare(result(1.1, 1050), baseline, 0.2, 0.1) == []
+    assert len(benchmark.compare(result(1.3, 1050), baseline, 0.2, 0.1)) == 1
+    assert len(benchmark.compare(result(1.3, 1200), baseline, 0.2, 0.1)) == 2
+    other_size = [dict(result(5.0, 5000)[0], size=100)]
+    assert benchmark.compare(other_size, baseline, 0.2, 0.1) == []
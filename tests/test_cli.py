@@ -0,0 +1,74 @@
+"""Tests for the command line interface"""
+
+import json
+
+from schema_analyzer.cli import InvalidEntry, discover_pairs, main, read_manifest
+
+OLD = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                                {'name': 'email', 'type': 'TEXT'}]}]}
+NEW = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'}]}]}
+
+def write_pair(directory, name):
+    (directory / f"{name}.old.json").write_text(json.dumps(OLD))
+    (directory / f"{name}.new.json").write_text(json.dumps(NEW))
+
+def test_discover_pairs_matches_old_and_new_files(tmp_path):
+    write_pair(tmp_path, 'a')
+    (tmp_path / 'a.queries.sql').write_text("SELECT email FROM users;")
+    write_pair(tmp_path, 'b')
+    (tmp_path / 'orphan.old.yaml').write_text("tables: []")
+
+    pairs = list(discover_pairs(str(tmp_path)))
+
+    assert [(name, queries is not None) for name, _, _, queries in pairs] == [
+        ('a', True), ('b', False)
+    ]
+
+def test_bad_manifest_lines_become_invalid_entries(tmp_path):
+    manifest = tmp_path / 'manifest.ndjson'
+    manifest.write_text('{"id": "ok", "old": "a.old.json", "new": "a.new.json"}\n'
+                        '{"id": "broken", "old": \n'
+                        '\n'
+                        '{"id": "no-new", "old": "a.old.json"}\n'
+                        '["a.old.json", "a.new.json"]\n')
+
+    entries = list(read_manifest(str(manifest)))
+
+    assert entries[0] == ('ok', str(tmp_path / 'a.old.json'), str(tmp_path / 'a.new.json'), None)
+    assert [(e.pair_id, e.error.split(':')[0]) for e in entries[1:]] == [
+        ('2', 'Invalid manifest line 2'),
+        ('no-new', 'Invalid manifest line 4'),
+        ('5', 'Invalid manifest line 5'),
+    ]
+    assert all(isinstance(e, InvalidEntry) for e in entries[1:])
+
+def test_batch_reports_bad_manifest_lines_and_keeps_going(tmp_path):
+    write_pair(tmp_path, 'a')
+    manifest = tmp_path / 'manifest.ndjson'
+    manifest.write_text('not json\n'
+                        '{"id": "first", "old": "a.old.json", "new": "a.new.json"}\n'
+                        '{"id": "no-new", "old": "a.old.json"}\n'
+                        '{"id": "second", "old": "a.old.json", "new": "a.new.json"}\n')
+    output = tmp_path / 'results.ndjson'
+
+    code = main(['batch', str(manifest), '--output', str(output), '--workers', '1'])
+
+    records = {r['id']: r for r in map(json.loads, output.read_text().splitlines())}
+    assert code == 1
+    assert {pid: r['status'] for pid, r in records.items()} == {
+        '1': 'error', 'first': 'ok', 'no-new': 'error', 'second': 'ok'
+    }
+    assert 'KeyError' in records['no-new']['error']
+
+def test_batch_succeeds_when_every_pair_does(tmp_path):
+    pairs = tmp_path / 'pairs'
+    pairs.mkdir()
+    write_pair(pairs, 'a')
+    write_pair(pairs, 'b')
+    output = tmp_path / 'results.ndjson'
+
+    code = main(['batch', str(pairs), '--output', str(output), '--workers', '2'])
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert code == 0
+    assert sorted((r['id'], r['status']) for r in records) == [('a', 'ok'), ('b', 'ok')]
@@ -0,0 +1,95 @@
+"""Tests for the streaming diff engine"""
+
+import asyncio
+
+from schema_analyzer.utils.diff_generator import DiffGenerator
+from schema_analyzer.utils.fingerprint import fingerprint_schema
+from schema_analyzer.utils.schema_index import SchemaIndex
+
+def column(name, data_type='INTEGER', nullable=True):
+    return {'name': name, 'type': data_type, 'nullable': nullable}
+
+OLD = {'tables': [
+    {'name': 'users', 'columns': [column('id'), column('email', 'TEXT'), column('age')]},
+    {'name': 'orders', 'columns': [column('id'), column('total', 'NUMERIC')]},
+    {'name': 'legacy', 'columns': [column('id')]},
+]}
+
+NEW = {'tables': [
+    {'name': 'users', 'columns': [column('id'), column('email', 'VARCHAR', False),
+                                  column('created', 'TIMESTAMP')]},
+    {'name': 'orders', 'columns': [column('id'), column('total', 'NUMERIC')]},
+    {'name': 'audit', 'columns': [column('id')]},
+]}
+
+async def collect(generator, old, new):
+    return [change async for change in generator.iter_diff(old, new)]
+
+def test_iter_diff_yields_changes_in_table_name_order():
+    changes = asyncio.run(collect(DiffGenerator(), OLD, NEW))
+
+    assert changes == [
+        {'type': 'table_added', 'table': 'audit'},
+        {'type': 'table_removed', 'table': 'legacy'},
+        {'type': 'column_removed', 'table': 'users', 'column': 'age'},
+        {'type': 'column_added', 'table': 'users', 'column': 'created',
+         'column_details': column('created', 'TIMESTAMP')},
+        {'type': 'column_type_changed', 'table': 'users', 'column': 'email',
+         'old_type': 'TEXT', 'new_type': 'VARCHAR'},
+        {'type': 'nullable_changed', 'table': 'users', 'column': 'email',
+         'old_nullable': True, 'new_nullable': False},
+    ]
+
+def test_generate_diff_matches_sync_and_stream():
+    generator = DiffGenerator()
+
+    assert asyncio.run(generator.generate_diff(OLD, NEW)) == generator.generate_diff_sync(OLD, NEW)
+    assert generator.generate_diff_sync(OLD, NEW) == asyncio.run(collect(generator, OLD, NEW))
+
+def test_unsorted_input_and_identical_schemas():
+    reversed_old = {'tables': list(reversed(OLD['tables']))}
+
+    assert DiffGenerator().generate_diff_sync(reversed_old, OLD) == []
+    assert DiffGenerator().generate_diff_sync(reversed_old, NEW) == \
+        DiffGenerator().generate_diff_sync(OLD, NEW)
+
+def test_stream_yields_to_event_loop_on_large_schemas(monkeypatch):
+    monkeypatch.setattr(DiffGenerator, 'YIELD_EVERY', 10)
+    old = {'tables': [{'name': f"t{i:04d}", 'columns': [column('id')]} for i in range(100)]}
+    new = {'tables': old['tables'][1:]}
+    ticks = []
+
+    async def main():
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0)
+
+        task = asyncio.ensure_future(ticker())
+        changes = await collect(DiffGenerator(), old, new)
+        task.cancel()
+        return changes
+
+    assert asyncio.run(main()) == [{'type': 'table_removed', 'table': 't0000'}]
+    assert len(ticks) >= 5
+
+def test_column_maps_are_only_built_for_compared_tables():
+    old_index, new_index = SchemaIndex.build(OLD), SchemaIndex.build(NEW)
+
+    DiffGenerator().generate_diff_sync(old_index, new_index,
+                                       fingerprint_schema(OLD), fingerprint_schema(NEW))
+
+    built = {table.name for index in (old_index, new_index)
+             for table in index.sorted_tables if table._columns is not None}
+    assert built == {'users'}
+
+def test_renamed_tables_are_reported_after_the_merge_pass():
+    old = {'tables': [{'name': 'a_old', 'columns': [column('id'), column('x')]}] + OLD['tables']}
+    new = {'tables': [{'name': 'a_new', 'columns': [column('id'), column('x')]}] + NEW['tables']}
+
+    changes = DiffGenerator(0.8).generate_diff_sync(old, new)
+
+    types = [c['type'] for c in changes]
+    assert types == ['column_removed', 'column_added', 'column_type_changed', 'nullable_changed',
+                     'table_removed', 'table_added', 'table_renamed']
+    assert (changes[-1]['old_table'], changes[-1]['table']) == ('a_old', 'a_new')
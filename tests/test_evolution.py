@@ -0,0 +1,73 @@
+"""Tests for multi-version evolution analysis"""
+
+import asyncio
+import copy
+
+import jsonschema
+import pytest
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.utils.fingerprint import fingerprint_schema, fingerprint_schema_incremental
+
+V1 = {'tables': [
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER', 'nullable': False}]},
+    {'name': 'orders', 'columns': [{'name': 'id', 'type': 'INTEGER'}]},
+]}
+
+def make_analyzer():
+    return SchemaAnalyzer({'performance': {'executor': 'inline'}, 'cache': {'enabled': False}})
+
+def test_incremental_fingerprint_reports_only_changed_tables():
+    v2 = copy.deepcopy(V1)
+    v2['tables'][1]['columns'].append({'name': 'total', 'type': 'NUMERIC'})
+    v2['tables'].append({'name': 'audit', 'columns': []})
+
+    fingerprint, changed = fingerprint_schema_incremental(v2, V1, fingerprint_schema(V1))
+
+    assert fingerprint == fingerprint_schema(v2)
+    assert [t['name'] for t in changed] == ['orders', 'audit']
+
+def test_values_equal_only_in_python_count_as_changed():
+    v2 = copy.deepcopy(V1)
+    v2['tables'][0]['columns'][0]['nullable'] = 0
+
+    fingerprint, changed = fingerprint_schema_incremental(v2, V1, fingerprint_schema(V1))
+
+    assert fingerprint != fingerprint_schema(V1)
+    assert [t['name'] for t in changed] == ['users']
+
+def test_evolution_validates_tables_that_only_compare_equal():
+    v2 = copy.deepcopy(V1)
+    v2['tables'][1]['columns'][0]['nullable'] = True
+    v3 = copy.deepcopy(v2)
+    v3['tables'][1]['columns'][0]['nullable'] = 1
+    analyzer = make_analyzer()
+
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        asyncio.run(analyzer.analyze_evolution([V1, v2, v3]))
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        asyncio.run(analyzer.analyze_schema_changes(v2, v3))
+
+def test_evolution_steps_and_cumulative_changes():
+    v2 = copy.deepcopy(V1)
+    v2['tables'][1]['columns'].append({'name': 'total', 'type': 'NUMERIC'})
+    v3 = copy.deepcopy(v2)
+    del v3['tables'][1]['columns'][1]
+    v3['tables'][0]['columns'][0]['type'] = 'BIGINT'
+
+    result = asyncio.run(make_analyzer().analyze_evolution([V1, v2, v3]))
+
+    assert [step['from_version'] for step in result['steps']] == [0, 1]
+    assert [c['type'] for c in result['steps'][0]['changes']] == ['column_added']
+    assert [c['type'] for c in result['steps'][1]['changes']] == \
+        ['column_removed', 'column_type_changed']
+    # The column added and removed again nets out
+    assert result['cumulative']['changes'] == [
+        {'type': 'column_type_changed', 'table': 'users', 'column': 'id',
+         'old_type': 'INTEGER', 'new_type': 'BIGINT'},
+    ]
+    assert len(result['fingerprints']) == 3
+
+def test_evolution_needs_two_versions():
+    with pytest.raises(ValueError):
+        asyncio.run(make_analyzer().analyze_evolution([V1]))
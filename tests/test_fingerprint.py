@@ -0,0 +1,57 @@
+"""Tests for schema fingerprints"""
+
+import asyncio
+
+from schema_analyzer.utils.diff_generator import DiffGenerator
+from schema_analyzer.utils.fingerprint import (
+    SchemaFingerprint,
+    fingerprint_schema,
+    table_hash,
+    try_fingerprint_schema,
+)
+
+USERS = {'name': 'users', 'columns': [
+    {'name': 'id', 'type': 'INTEGER', 'nullable': False},
+    {'name': 'email', 'type': 'TEXT'},
+]}
+ORDERS = {'name': 'orders', 'columns': [{'name': 'id', 'type': 'INTEGER'}]}
+
+def test_fingerprint_ignores_table_and_column_order():
+    reordered_users = {'name': 'users', 'columns': list(reversed(USERS['columns']))}
+
+    assert fingerprint_schema({'tables': [USERS, ORDERS]}) == \
+        fingerprint_schema({'tables': [ORDERS, reordered_users]})
+    assert table_hash(USERS) == table_hash(reordered_users)
+
+def test_fingerprint_changes_with_any_attribute():
+    base = fingerprint_schema({'tables': [USERS, ORDERS]})
+    changed_users = {'name': 'users', 'columns': [
+        {'name': 'id', 'type': 'INTEGER', 'nullable': True},
+        {'name': 'email', 'type': 'TEXT'},
+    ]}
+    changed = fingerprint_schema({'tables': [changed_users, ORDERS]})
+
+    assert base != changed
+    assert not base.table_unchanged(changed, 'users')
+    assert base.table_unchanged(changed, 'orders')
+    assert not base.table_unchanged(changed, 'missing')
+
+def test_round_trip_and_unusable_input():
+    fingerprint = fingerprint_schema({'tables': [USERS]})
+
+    assert SchemaFingerprint.from_dict(fingerprint.to_dict()).tables == fingerprint.tables
+    assert try_fingerprint_schema({'tables': [{'name': 'x'}]}) is None
+    assert try_fingerprint_schema(None) is None
+
+def test_diff_skips_tables_with_equal_hashes():
+    old = {'tables': [USERS, ORDERS]}
+    new = {'tables': [USERS, {'name': 'orders', 'columns': [{'name': 'id', 'type': 'BIGINT'}]}]}
+    old_fingerprint, new_fingerprint = fingerprint_schema(old), fingerprint_schema(new)
+    generator = DiffGenerator()
+
+    assert generator.generate_diff_sync(old, new, old_fingerprint, new_fingerprint) == [
+        {'type': 'column_type_changed', 'table': 'orders', 'column': 'id',
+         'old_type': 'INTEGER', 'new_type': 'BIGINT'},
+    ]
+    # Equal roots end the diff without looking at the tables
+    assert asyncio.run(generator.generate_diff(old, new, old_fingerprint, old_fingerprint)) == []
@@ -0,0 +1,99 @@
+"""Tests for live catalog introspection"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from schema_analyzer.introspection import IntrospectorFactory, make_column
+from schema_analyzer.utils.diff_generator import DiffGenerator
+from schema_analyzer.utils.schema_validator import SchemaValidator
+
+DDL = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY,
+        email TEXT NOT NULL,
+        org TEXT,
+        name VARCHAR(80) DEFAULT 'anonymous',
+        UNIQUE (org, email)
+    );
+    CREATE TABLE orders (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER REFERENCES users(id),
+        total NUMERIC
+    );
+'''
+
+def create_database(path, ddl=DDL):
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(ddl)
+    finally:
+        conn.close()
+
+def snapshot(path):
+    async def main():
+        introspector = await IntrospectorFactory.create_introspector(
+            {'type': 'sqlite', 'path': str(path)})
+        try:
+            return await introspector.snapshot()
+        finally:
+            await introspector.close()
+    return asyncio.run(main())
+
+def test_sqlite_snapshot_reads_columns_and_constraints(tmp_path):
+    path = tmp_path / 'app.db'
+    create_database(path)
+
+    schema = snapshot(path)
+
+    assert schema == {'tables': [
+        {'name': 'orders', 'columns': [
+            {'name': 'id', 'type': 'INTEGER', 'nullable': False, 'constraints': ['PRIMARY KEY']},
+            {'name': 'user_id', 'type': 'INTEGER', 'nullable': True,
+             'constraints': ['FOREIGN KEY REFERENCES users(id)']},
+            {'name': 'total', 'type': 'NUMERIC', 'nullable': True},
+        ]},
+        {'name': 'users', 'columns': [
+            {'name': 'id', 'type': 'INTEGER', 'nullable': False, 'constraints': ['PRIMARY KEY']},
+            {'name': 'email', 'type': 'TEXT', 'nullable': False,
+             'constraints': ['UNIQUE (org, email)']},
+            {'name': 'org', 'type': 'TEXT', 'nullable': True,
+             'constraints': ['UNIQUE (org, email)']},
+            {'name': 'name', 'type': 'VARCHAR(80)', 'nullable': True, 'default': "'anonymous'"},
+        ]},
+    ]}
+    SchemaValidator().validate_sync(schema)
+
+def test_snapshots_diff_like_hand_written_schemas(tmp_path):
+    old_path, new_path = tmp_path / 'old.db', tmp_path / 'new.db'
+    create_database(old_path)
+    create_database(new_path, DDL.replace('total NUMERIC', 'total NUMERIC, note TEXT')
+                                 .replace('org TEXT,', '').replace('(org, email)', '(email)'))
+
+    changes = DiffGenerator().generate_diff_sync(snapshot(old_path), snapshot(new_path))
+
+    assert [(c['type'], c['table'], c['column']) for c in changes] == [
+        ('column_added', 'orders', 'note'),
+        ('column_removed', 'users', 'org'),
+    ]
+
+def test_sqlite_snapshot_does_not_write_to_the_database(tmp_path):
+    path = tmp_path / 'app.db'
+    create_database(path)
+    before = path.read_bytes()
+
+    snapshot(path)
+
+    assert path.read_bytes() == before
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot(tmp_path / 'missing.db')
+
+def test_unknown_database_type_is_rejected():
+    with pytest.raises(ValueError, match='oracle'):
+        asyncio.run(IntrospectorFactory.create_introspector({'type': 'oracle'}))
+
+def test_make_column_leaves_out_empty_optional_keys():
+    assert make_column('id', 'INTEGER', False, None, []) == {
+        'name': 'id', 'type': 'INTEGER', 'nullable': False
+    }
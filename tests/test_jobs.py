@@ -0,0 +1,129 @@
+"""Tests for JobQueue"""
+
+import asyncio
+import threading
+import time
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.jobs import JobQueue
+from schema_analyzer.storage import MemoryStorage
+from schema_analyzer.utils.cancellation import StageCancelled, check_cancelled
+
+OLD = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                                {'name': 'email', 'type': 'TEXT'}]}]}
+NEW = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]}]}
+
+class RecordingStorage(MemoryStorage):
+    """Memory storage keeping every job status record written"""
+
+    def __init__(self):
+        super().__init__()
+        self.history = []
+
+    async def store_document(self, kind, key, document):
+        self.history.append(document)
+        await super().store_document(kind, key, document)
+
+def run_jobs(config, scenario):
+    async def main():
+        storage = RecordingStorage()
+        analyzer = SchemaAnalyzer(config)
+        jobs = JobQueue(analyzer, storage)
+        jobs.start()
+        try:
+            return await scenario(jobs), storage
+        finally:
+            await jobs.close()
+            await analyzer.close()
+    return asyncio.run(main())
+
+async def wait_for_status(jobs, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = await jobs.status(job_id)
+        if record and record['status'] in statuses:
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+def test_stage_progress_is_recorded():
+    async def scenario(jobs):
+        job_id = await jobs.submit(OLD, NEW, ["SELECT email FROM users"])
+        return await wait_for_status(jobs, job_id, {'completed'})
+
+    record, storage = run_jobs({'performance': {'executor': 'thread'}}, scenario)
+
+    stages = [entry['stage'] for entry in record['stages']]
+    assert stages.count('prepare_schema') == 2
+    assert {'generate_diff', 'analyze_impact', 'validate_queries'} <= set(stages)
+    assert all(entry['status'] == 'completed' and entry['duration'] >= 0
+               for entry in record['stages'])
+    running = [r for r in storage.history if r['status'] == 'running' and r['stages']]
+    assert any(entry['status'] == 'running' for r in running for entry in r['stages'])
+    assert storage.results and all(':' not in sid for sid in storage.results)
+
+def test_cancelling_a_job_stops_its_running_stage(monkeypatch):
+    started, stopped = threading.Event(), threading.Event()
+
+    def slow_diff(self, *args):
+        started.set()
+        # Bounded, so a stage that is never cancelled fails the test instead of hanging it
+        deadline = time.monotonic() + 3.0
+        try:
+            while time.monotonic() < deadline:
+                check_cancelled()
+                time.sleep(0.01)
+        except StageCancelled:
+            stopped.set()
+            raise
+        return []
+    monkeypatch.setattr(SchemaAnalyzer, '_generate_diff', slow_diff)
+
+    async def scenario(jobs):
+        job_id = await jobs.submit(OLD, NEW)
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        assert await jobs.cancel(job_id)
+        record = await wait_for_status(jobs, job_id, {'cancelled'})
+        return record, await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 1.0)
+
+    (record, was_stopped), _ = run_jobs(
+        {'performance': {'executor': 'thread'}}, scenario)
+
+    assert was_stopped
+    assert [entry['status'] for entry in record['stages']
+            if entry['stage'] == 'generate_diff'] == ['running']
+
+def test_timed_out_job_stops_its_running_stage(monkeypatch):
+    stopped = threading.Event()
+
+    def slow_diff(self, *args):
+        # Bounded, so a stage that is never cancelled fails the test instead of hanging it
+        deadline = time.monotonic() + 3.0
+        try:
+            while time.monotonic() < deadline:
+                check_cancelled()
+                time.sleep(0.01)
+        except StageCancelled:
+            stopped.set()
+            raise
+        return []
+    monkeypatch.setattr(SchemaAnalyzer, '_generate_diff', slow_diff)
+
+    async def scenario(jobs):
+        job_id = await jobs.submit(OLD, NEW)
+        return await wait_for_status(jobs, job_id, {'timed_out'})
+
+    record, _ = run_jobs({'performance': {'executor': 'thread', 'request_timeout': 0.1}}, scenario)
+
+    assert record['status'] == 'timed_out'
+    assert stopped.wait(1.0)
+
+def test_jobs_default_to_the_batch_priority():
+    async def scenario(jobs):
+        job_id = await jobs.submit(OLD, NEW)
+        return await wait_for_status(jobs, job_id, {'completed'})
+
+    record, _ = run_jobs({'performance': {'executor': 'inline'}}, scenario)
+
+    assert record['priority'] == JobQueue.DEFAULT_PRIORITY == 'batch'
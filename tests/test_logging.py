@@ -0,0 +1,70 @@
+"""Tests for ElasticsearchLogger"""
+
+import logging
+import threading
+
+from schema_analyzer.logging import ElasticsearchLogger
+
+class FakeElasticsearch:
+    """Bulk endpoint that logs each request like the real client does"""
+
+    def __init__(self):
+        self.documents = []
+        self.lock = threading.Lock()
+
+    def bulk(self, operations):
+        logging.getLogger('elastic_transport.transport').info("POST /_bulk [status:200]")
+        logging.getLogger('urllib3.connectionpool').info("http://localhost:9200 POST /_bulk")
+        with self.lock:
+            self.documents.extend(operations[1::2])
+        return {'errors': False, 'items': []}
+
+def attach(handler):
+    root = logging.getLogger()
+    previous = root.level
+    root.setLevel(logging.INFO)
+    root.addHandler(handler)
+    return lambda: (root.removeHandler(handler), root.setLevel(previous))
+
+def test_client_logs_are_not_shipped_again():
+    client = FakeElasticsearch()
+    handler = ElasticsearchLogger([], 'logs', batch_size=10, flush_interval=0.01, client=client)
+    detach = attach(handler)
+    try:
+        logging.getLogger('schema_analyzer.test').info("analysis done")
+        handler.flush()
+        # Give the shipper thread a few intervals to ship anything it queued
+        threading.Event().wait(0.1)
+        handler.flush()
+    finally:
+        detach()
+        handler.close()
+
+    assert [doc['logger'] for doc in client.documents] == ['schema_analyzer.test']
+
+def test_counts_are_exact_with_concurrent_shipping():
+    client = FakeElasticsearch()
+    handler = ElasticsearchLogger([], 'logs', batch_size=7, flush_interval=0.001, client=client)
+    logger = logging.getLogger('schema_analyzer.concurrent')
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    def log_and_flush():
+        for i in range(500):
+            logger.info("record %d", i)
+            if i % 50 == 0:
+                handler.flush()
+
+    try:
+        threads = [threading.Thread(target=log_and_flush) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    assert handler.shipped == len(client.documents) == 2000
+    assert handler.dropped == handler.failed == 0
@@ -0,0 +1,90 @@
+"""Tests for pipeline metrics and tracing spans"""
+
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from prometheus_client import REGISTRY
+
+from schema_analyzer import tracing
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.metrics import (
+    ACTIVE_ANALYSES, ANALYSIS_DURATION, gauge_value, instrument_method, track_stage
+)
+
+OLD = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                                {'name': 'email', 'type': 'TEXT'}]}]}
+NEW = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]}]}
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+class RecordingTracer:
+    """Tracer recording span names and attributes, and their parent span"""
+
+    def __init__(self):
+        self.spans = []
+        self._stack = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        self.spans.append((name, self._stack[-1] if self._stack else None, attributes))
+        self._stack.append(name)
+        try:
+            yield name
+        finally:
+            self._stack.pop()
+
+def test_stages_are_timed_per_stage():
+    before = sample('schema_analysis_stage_duration_seconds_count', stage='unit')
+
+    with track_stage('unit'):
+        pass
+    with pytest.raises(RuntimeError):
+        with track_stage('unit'):
+            raise RuntimeError('stage failed')
+
+    assert sample('schema_analysis_stage_duration_seconds_count', stage='unit') == before + 2
+
+def test_instrumented_calls_count_errors_and_in_flight_calls():
+    errors = sample('schema_analysis_errors_total', error_type='KeyError')
+    calls = sample('schema_analysis_duration_seconds_count')
+    seen = []
+
+    @instrument_method(ANALYSIS_DURATION, ACTIVE_ANALYSES)
+    async def failing():
+        seen.append(gauge_value(ACTIVE_ANALYSES))
+        raise KeyError('missing')
+
+    active = gauge_value(ACTIVE_ANALYSES)
+    with pytest.raises(KeyError):
+        asyncio.run(failing())
+
+    assert seen == [active + 1]
+    assert gauge_value(ACTIVE_ANALYSES) == active
+    assert sample('schema_analysis_errors_total', error_type='KeyError') == errors + 1
+    assert sample('schema_analysis_duration_seconds_count') == calls + 1
+
+def test_analysis_exports_sizes_and_stage_spans(monkeypatch):
+    tracer = RecordingTracer()
+    monkeypatch.setattr(tracing, '_tracer', tracer)
+
+    async def main():
+        analyzer = SchemaAnalyzer({'performance': {'executor': 'inline'},
+                                   'cache': {'enabled': False}})
+        try:
+            await analyzer.analyze_schema_changes(OLD, NEW, ["SELECT u.email FROM users u"])
+        finally:
+            await analyzer.close()
+
+    asyncio.run(main())
+
+    assert sample('schema_analysis_size', dimension='tables') == 1
+    assert sample('schema_analysis_size', dimension='columns') == 1
+    assert sample('schema_analysis_size', dimension='changes') == 2
+    assert sample('schema_analysis_size', dimension='queries') == 1
+    root = 'schema_analyzer.analyze_schema_changes'
+    assert tracer.spans[0] == (root, None, {})
+    stages = {name: (parent, attributes) for name, parent, attributes in tracer.spans[1:]}
+    assert stages['schema_analyzer.stage.generate_diff'] == (root, {'stage': 'generate_diff'})
+    assert stages['schema_analyzer.stage.validate_queries'][0] == root
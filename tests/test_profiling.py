@@ -0,0 +1,76 @@
+"""Tests for AnalysisProfiler"""
+
+import asyncio
+import threading
+import tracemalloc
+
+from schema_analyzer.profiling import AnalysisProfiler, current_capture
+from schema_analyzer.storage import MemoryStorage
+
+def record_snapshot_threads(monkeypatch):
+    threads = []
+    take_snapshot = tracemalloc.take_snapshot
+
+    def recording_snapshot():
+        threads.append(threading.current_thread())
+        return take_snapshot()
+
+    monkeypatch.setattr(tracemalloc, 'take_snapshot', recording_snapshot)
+    return threads
+
+async def analysis():
+    capture = current_capture()
+    capture.run('stage', sum, range(1000))
+    return {'changes': []}
+
+def test_kept_profiles_are_stored_as_documents_off_the_event_loop(monkeypatch):
+    threads = record_snapshot_threads(monkeypatch)
+    storage = MemoryStorage()
+    profiler = AnalysisProfiler({'sample_rate': 1.0, 'trace_memory': True}, storage)
+
+    async def main():
+        result = await profiler.profile(analysis, 'session')
+        listed = await storage.list_results()
+        return result, threading.current_thread(), listed
+
+    result, loop_thread, listed = asyncio.run(main())
+    profile = storage.documents[('profile', 'session')]
+
+    assert result == {'changes': []}
+    assert len(threads) == 1 and threads[0] is not loop_thread
+    assert [stage['stage'] for stage in profile['stages']] == ['stage']
+    assert profile['memory']['peak_bytes'] > 0
+    assert listed['results'] == []
+    assert not tracemalloc.is_tracing()
+
+def test_fast_analyses_skip_the_snapshot(monkeypatch):
+    threads = record_snapshot_threads(monkeypatch)
+    storage = MemoryStorage()
+    profiler = AnalysisProfiler({'sample_rate': 1.0, 'threshold': 60.0}, storage)
+
+    asyncio.run(profiler.profile(analysis, 'session'))
+
+    assert threads == []
+    assert storage.documents == {}
+    assert not tracemalloc.is_tracing()
+
+def test_a_trace_started_elsewhere_is_left_running():
+    profiler = AnalysisProfiler({'sample_rate': 1.0})
+    tracemalloc.start()
+    try:
+        result = asyncio.run(profiler.profile(analysis, 'session'))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    assert result == {'changes': []}
+    asyncio.run(profiler.profile(analysis, 'session'))
+    assert not tracemalloc.is_tracing()
+
+def test_profiles_are_stamped_in_utc():
+    storage = MemoryStorage()
+    profiler = AnalysisProfiler({'sample_rate': 1.0, 'trace_memory': False}, storage)
+
+    asyncio.run(profiler.profile(analysis, 'session'))
+
+    assert storage.documents[('profile', 'session')]['captured_at'].endswith('+00:00')
@@ -0,0 +1,71 @@
+"""Tests for QueryIndex"""
+
+from schema_analyzer.utils.diff_generator import DiffGenerator
+from schema_analyzer.utils.query_index import QueryIndex
+
+def test_lookup_by_table_and_column():
+    index = QueryIndex()
+    by_table = index.add_query("SELECT * FROM users")
+    by_column = index.add_query("SELECT u.email FROM users u")
+    other = index.add_query("SELECT o.total FROM orders o")
+
+    assert index.lookup_change({'type': 'table_removed', 'table': 'users'}) == {by_table, by_column}
+    assert index.lookup_change(
+        {'type': 'column_type_changed', 'table': 'users', 'column': 'email'}
+    ) == {by_column}
+    assert index.lookup_change({'type': 'column_added', 'table': 'orders', 'column': 'x'}) == set()
+    assert index.lookup_change({'type': 'table_removed', 'table': 'orders'}) == {other}
+
+def test_affected_queries_lists_changes_per_query():
+    index = QueryIndex()
+    query_id = index.add_query("SELECT u.email FROM users u")
+
+    affected = index.affected_queries([
+        {'type': 'column_removed', 'table': 'users', 'column': 'email'},
+        {'type': 'table_removed', 'table': 'users'},
+        {'type': 'table_removed', 'table': 'orders'},
+    ])
+
+    assert affected == [{
+        'query_id': query_id,
+        'query': "SELECT u.email FROM users u",
+        'changes': [{'type': 'column_removed', 'location': 'users.email'},
+                    {'type': 'table_removed', 'location': 'users.'}],
+    }]
+
+def test_replace_and_remove_keep_the_index_consistent():
+    index = QueryIndex()
+    index.add_query("SELECT * FROM users", query_id='q')
+    version = index.version
+    index.add_query("SELECT * FROM users", query_id='q')
+    assert index.version == version
+
+    index.add_query("SELECT * FROM orders", query_id='q')
+    assert 'users' not in index.tables
+    assert index.tables == {'orders': {'q'}}
+
+    assert index.remove_query('q')
+    assert not index.remove_query('q')
+    assert len(index) == 0 and index.tables == {} and index.columns == {}
+
+def test_cte_names_are_not_indexed():
+    index = QueryIndex()
+    index.add_query("WITH x AS (SELECT u.id FROM users u) SELECT x.id FROM x")
+
+    assert set(index.tables) == {'users'}
+    assert set(index.columns) == {('users', 'id')}
+
+def test_column_changes_of_renamed_tables_find_queries_by_the_old_name():
+    index = QueryIndex()
+    query_id = index.add_query("SELECT o.note FROM orders o")
+    columns = [{'name': 'id', 'type': 'INTEGER'}, {'name': 'total', 'type': 'NUMERIC'}]
+    changes = DiffGenerator(0.8).generate_diff_sync(
+        {'tables': [{'name': 'orders', 'columns': columns + [{'name': 'note', 'type': 'TEXT'}]}]},
+        {'tables': [{'name': 'orders_v2', 'columns': columns + [
+            {'name': 'note', 'type': 'TEXT', 'nullable': False}]}]},
+    )
+
+    assert index.affected_queries(changes)[0]['changes'] == [
+        {'type': 'table_renamed', 'location': 'orders_v2.'},
+        {'type': 'nullable_changed', 'location': 'orders_v2.note'},
+    ]
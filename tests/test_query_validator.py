@@ -0,0 +1,88 @@
+"""Tests for QueryValidator"""
+
+import asyncio
+
+from schema_analyzer.utils.query_validator import (
+    QueryValidator,
+    normalize_query,
+    query_fingerprint,
+)
+
+SCHEMA = {'tables': [
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                  {'name': 'email', 'type': 'TEXT'}]},
+    {'name': 'orders', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                   {'name': 'user_id', 'type': 'INTEGER'}]},
+]}
+
+def test_literals_and_whitespace_do_not_change_the_fingerprint():
+    assert normalize_query("SELECT *  FROM users WHERE id = 42 AND email = 'a''b'") == \
+        "SELECT * FROM users WHERE id = ? AND email = ?"
+    assert query_fingerprint("SELECT * FROM users WHERE id = 1") == \
+        query_fingerprint("SELECT * FROM users\n  WHERE id = 2")
+
+def test_escaped_quotes_and_comments_do_not_swallow_sql():
+    template = ("SELECT t.id FROM users t WHERE t.name = E'it\\'s' "
+                "AND t.x IN (SELECT o.y FROM {} o WHERE o.z = 'a')")
+    orders, users = template.format('orders'), template.format('users')
+    commented = "SELECT t.id -- it's\nFROM users t /* don't */ WHERE t.x = 'a'"
+
+    assert query_fingerprint(orders) != query_fingerprint(users)
+    assert normalize_query(orders) == (
+        "SELECT t.id FROM users t WHERE t.name = E? AND t.x IN (SELECT o.y FROM orders o WHERE o.z = ?)"
+    )
+    assert normalize_query(commented) == "SELECT t.id FROM users t WHERE t.x = ?"
+    assert normalize_query('SELECT "it\'s" FROM users') == 'SELECT "it\'s" FROM users'
+
+    validator = QueryValidator()
+    validator.validate_queries_sync([users], SCHEMA)
+    assert validator.validate_queries_sync([orders], SCHEMA)[0]['errors'] == [
+        "Referenced column not found: users.name", "Referenced column not found: users.x",
+        "Referenced column not found: orders.y", "Referenced column not found: orders.z",
+    ]
+
+def test_results_keep_input_order_and_report_errors():
+    results = QueryValidator().validate_queries_sync([
+        "SELECT u.email FROM users u JOIN orders o ON o.user_id = u.id",
+        "SELECT * FROM missing",
+        "SELECT u.phone FROM users u",
+    ], SCHEMA)
+
+    assert [r['is_valid'] for r in results] == [True, False, False]
+    assert results[1]['errors'] == ["Referenced table not found: missing"]
+    assert results[2]['errors'] == ["Referenced column not found: users.phone"]
+
+def test_duplicate_statements_are_parsed_once(monkeypatch):
+    validator = QueryValidator()
+    calls = []
+    extract = validator._extract_references
+    monkeypatch.setattr(validator, '_extract_references',
+                        lambda parsed: calls.append(1) or extract(parsed))
+    queries = [f"SELECT * FROM users WHERE id = {i}" for i in range(50)]
+
+    results = asyncio.run(validator.validate_queries(queries, SCHEMA))
+    validator.validate_queries_sync(queries[:1], SCHEMA)
+
+    assert len(results) == 50
+    assert [r['query'] for r in results] == queries
+    assert all(r['is_valid'] for r in results)
+    assert len(calls) == 1
+
+def test_cte_names_are_not_tables():
+    validator = QueryValidator()
+    query = ("WITH recent AS (SELECT o.user_id FROM orders o), "
+             "active(id) AS (SELECT u.id FROM users u) "
+             "SELECT recent.user_id FROM recent JOIN active ON active.id = recent.user_id")
+
+    assert validator.get_references(query) == (
+        ('orders', 'users'), (('orders', 'user_id'), ('users', 'id'))
+    )
+    assert validator.validate_queries_sync([query], SCHEMA)[0]['is_valid']
+
+def test_recursive_cte_body_is_scanned():
+    query = ("WITH RECURSIVE chain AS (SELECT m.id FROM missing m "
+             "UNION ALL SELECT chain.id FROM chain) SELECT * FROM chain")
+
+    result = QueryValidator().validate_queries_sync([query], SCHEMA)[0]
+
+    assert result['errors'] == ["Referenced table not found: missing"]
@@ -0,0 +1,99 @@
+"""Tests for RenameDetector"""
+
+import asyncio
+
+import pytest
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.utils.diff_generator import DiffGenerator
+from schema_analyzer.utils.rename_detector import RenameDetector, column_name_similarity
+from schema_analyzer.utils.schema_index import TableInfo
+
+def column(name, data_type='TEXT'):
+    return {'name': name, 'type': data_type, 'nullable': True}
+
+def table(name, *columns):
+    return {'name': name, 'columns': list(columns)}
+
+def diff(old_tables, new_tables):
+    return DiffGenerator(0.8).generate_diff_sync({'tables': old_tables}, {'tables': new_tables})
+
+def renamed_columns(changes):
+    return [(c['old_column'], c['column']) for c in changes if c['type'] == 'column_renamed']
+
+def test_column_name_similarity_ignores_shared_words():
+    assert column_name_similarity('first_name', 'last_name') < 0.5
+    assert column_name_similarity('usr_email', 'user_email') > 0.8
+    assert column_name_similarity('email', 'email_address') == pytest.approx(10 / 18)
+
+def test_column_rename_in_place_is_detected():
+    changes = diff(
+        [table('users', column('id', 'INTEGER'), column('usr_email'), column('bio'))],
+        [table('users', column('id', 'INTEGER'), column('user_email'), column('bio'))],
+    )
+
+    assert renamed_columns(changes) == [('usr_email', 'user_email')]
+
+def test_only_column_of_its_type_can_move():
+    changes = diff(
+        [table('users', column('id', 'INTEGER'), column('created', 'TIMESTAMP'),
+               column('bio'))],
+        [table('users', column('id', 'INTEGER'), column('bio'),
+               column('created_on', 'TIMESTAMP'))],
+    )
+
+    assert renamed_columns(changes) == [('created', 'created_on')]
+
+@pytest.mark.parametrize('old_columns, new_columns', [
+    # Same shared suffix, each the only removed/added column of its type
+    ([column('first_name'), column('created_at', 'TIMESTAMP')],
+     [column('last_name'), column('updated_at', 'TIMESTAMP')]),
+    # Similar names, but neither in place nor the only candidates of their type
+    ([column('first_name'), column('nickname'), column('email')],
+     [column('email'), column('last_name'), column('nick')]),
+    # Same position, different type
+    ([column('count', 'INTEGER')], [column('counts', 'BIGINT')]),
+])
+def test_near_miss_columns_are_not_renames(old_columns, new_columns):
+    changes = diff([table('users', column('id', 'INTEGER'), *old_columns)],
+                   [table('users', column('id', 'INTEGER'), *new_columns)])
+
+    assert renamed_columns(changes) == []
+    assert {c['column'] for c in changes if c['type'] == 'column_removed'} == {
+        c['name'] for c in old_columns if c['name'] not in {n['name'] for n in new_columns}
+    }
+
+def test_near_miss_keeps_data_loss_risk():
+    old = {'tables': [table('people', column('id', 'INTEGER'), column('first_name'),
+                            column('created_at', 'TIMESTAMP'))]}
+    new = {'tables': [table('people', column('id', 'INTEGER'), column('last_name'),
+                            column('updated_at', 'TIMESTAMP'))]}
+
+    async def main():
+        analyzer = SchemaAnalyzer({'analysis': {'similarity_threshold': 0.8},
+                                   'performance': {'executor': 'inline'}})
+        try:
+            return await analyzer.analyze_schema_changes(old, new)
+        finally:
+            await analyzer.close()
+
+    assert asyncio.run(main())['impact']['data_loss_risk'] is True
+
+def test_tables_are_renamed_one_to_one():
+    columns = [column('id', 'INTEGER'), column('total', 'NUMERIC')]
+    removed = [TableInfo('orders', table('orders', *columns))]
+    added = [TableInfo(name, table(name, *columns)) for name in ('customer_orders', 'orders_v2')]
+
+    matches = RenameDetector(0.8).match_tables(removed, added)
+
+    assert [(old.name, new.name) for old, new, _ in matches] == [('orders', 'orders_v2')]
+
+def test_column_changes_of_a_renamed_table_carry_the_old_name():
+    required_note = dict(column('note'), nullable=False)
+    changes = diff(
+        [table('orders', column('id', 'INTEGER'), column('total', 'NUMERIC'), column('note'))],
+        [table('orders_v2', column('id', 'INTEGER'), column('total', 'NUMERIC'), required_note)],
+    )
+
+    assert [c['type'] for c in changes] == ['table_renamed', 'nullable_changed']
+    assert (changes[1]['table'], changes[1]['old_table']) == ('orders_v2', 'orders')
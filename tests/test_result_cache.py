@@ -0,0 +1,243 @@
+"""Tests for ResultCache"""
+
+import asyncio
+import time
+
+import pytest
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.metrics import CACHE_SIZE
+from schema_analyzer.profiling import ProfileCapture
+from schema_analyzer.result_cache import ResultCache
+from schema_analyzer.storage import MemoryStorage
+from schema_analyzer.utils.cache import LRUCache
+
+SCHEMA = {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'}]}]}
+
+def counting_compute(calls, delay=0.0):
+    async def compute(listener, capture):
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {'changes': [len(calls)], 'timestamp': 'then'}
+    return compute
+
+def test_concurrent_requests_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(*[
+            cache.get_or_compute('k', counting_compute(calls, 0.01)) for _ in range(10)
+        ])
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(r == {'changes': [1], 'timestamp': 'then'} for r in results)
+
+def test_callers_get_their_own_copies():
+    cache = ResultCache()
+    calls = []
+
+    async def main():
+        first = await cache.get_or_compute('k', counting_compute(calls))
+        first['timestamp'] = 'changed'
+        first.pop('changes')
+        return await cache.get_or_compute('k', counting_compute(calls))
+
+    assert asyncio.run(main()) == {'changes': [1], 'timestamp': 'then'}
+    assert len(calls) == 1
+
+def test_nested_values_are_copied_too():
+    cache = ResultCache()
+
+    async def compute(listener, capture):
+        await asyncio.sleep(0.01)
+        return {'changes': [{'type': 'column_removed'}], 'impact': {'risks': []}}
+
+    async def main():
+        first, second = await asyncio.gather(cache.get_or_compute('k', compute),
+                                             cache.get_or_compute('k', compute))
+        first['changes'][0]['type'] = 'changed'
+        second['impact']['risks'].append('changed')
+        return await cache.get_or_compute('k', compute)
+
+    assert asyncio.run(main()) == {'changes': [{'type': 'column_removed'}],
+                                   'impact': {'risks': []}}
+
+def test_every_waiter_gets_the_stage_events_of_the_shared_computation():
+    cache = ResultCache()
+    events = {'first': [], 'second': []}
+
+    def listener(name):
+        async def on_stage(stage, event):
+            events[name].append((stage, event))
+        return on_stage
+
+    async def main():
+        started = asyncio.Event()
+
+        async def compute(notify, capture):
+            await notify('diff', 'started')
+            started.set()
+            await asyncio.sleep(0.01)
+            await notify('diff', 'completed')
+            return {'changes': []}
+
+        async def second():
+            # Joins after the first event was emitted
+            await started.wait()
+            return await cache.get_or_compute('k', compute, listener('second'))
+
+        await asyncio.gather(cache.get_or_compute('k', compute, listener('first')), second())
+
+    asyncio.run(main())
+
+    assert events['first'] == events['second'] == [('diff', 'started'), ('diff', 'completed')]
+
+def test_failing_listeners_do_not_fail_the_computation():
+    cache = ResultCache()
+
+    async def failing(stage, event):
+        raise RuntimeError('listener')
+
+    async def compute(notify, capture):
+        await notify('diff', 'started')
+        return {'changes': []}
+
+    assert asyncio.run(cache.get_or_compute('k', compute, failing)) == {'changes': []}
+
+def test_profiled_waiters_get_the_profile_of_the_shared_computation():
+    cache = ResultCache()
+    first, second = ProfileCapture(), ProfileCapture()
+
+    async def compute(notify, capture):
+        await asyncio.sleep(0.01)
+        capture.run('diff', sum, range(100))
+        return {'changes': []}
+
+    async def main():
+        await asyncio.gather(cache.get_or_compute('k', compute, capture=first),
+                             cache.get_or_compute('k', compute, capture=second))
+
+    asyncio.run(main())
+
+    assert [s['stage'] for s in first.stages] == [s['stage'] for s in second.stages] == ['diff']
+    assert first.stats is not None and second.stats is not None
+
+def test_computation_outlives_one_waiter_but_not_all():
+    cache = ResultCache()
+    cancelled = []
+
+    async def compute(listener, capture):
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return {'changes': []}
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_compute('k', compute))
+        second = asyncio.ensure_future(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        kept = await second
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.get_or_compute('other', compute), 0.01)
+        await asyncio.sleep(0)
+        # The abandoned computation is forgotten, so the next caller starts afresh
+        return kept, await cache.get_or_compute('other', compute)
+
+    assert asyncio.run(main()) == ({'changes': []}, {'changes': []})
+    assert cancelled == [1]
+
+def test_failures_are_not_cached():
+    cache = ResultCache()
+
+    async def failing(listener, capture):
+        raise RuntimeError('boom')
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute('k', failing)
+        return await cache.get_or_compute('k', counting_compute([]))
+
+    assert asyncio.run(main())['changes'] == [1]
+
+def test_expired_entries_leave_the_size_gauge():
+    cache = ResultCache(ttl=0.05)
+    asyncio.run(cache.get_or_compute('k', counting_compute([])))
+    assert CACHE_SIZE._value.get() == 1
+
+    time.sleep(0.06)
+    asyncio.run(cache.get_or_compute('other', counting_compute([])))
+
+    assert CACHE_SIZE._value.get() == 1
+    assert len(cache) == 1
+
+def test_expire_only_drops_due_entries_once():
+    cache = LRUCache(4, ttl=0.05)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    time.sleep(0.06)
+    # Refreshing a key leaves its old expiry behind in the queue
+    cache.put('a', 3)
+
+    assert cache.expire() == 1
+    assert cache.expire() == 0
+    assert 'a' in cache and 'b' not in cache
+    for i in range(10):
+        cache.put(i, i)
+    assert len(cache._expiry) <= 2 * cache.maxsize
+
+def test_storage_tier_serves_other_instances():
+    storage = MemoryStorage()
+    calls = []
+
+    async def main():
+        await ResultCache(storage=storage).get_or_compute('k', counting_compute(calls))
+        return await ResultCache(storage=storage).get_or_compute('k', counting_compute(calls))
+
+    assert asyncio.run(main())['changes'] == [1]
+    assert len(calls) == 1
+
+def test_cached_analyses_get_a_fresh_timestamp():
+    schema = SCHEMA
+    analyzer = SchemaAnalyzer({'performance': {'executor': 'inline'}})
+
+    async def main():
+        first = await analyzer.analyze_schema_changes(schema, schema)
+        await asyncio.sleep(0.01)
+        second = await analyzer.analyze_schema_changes(schema, schema)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert second['timestamp'] > first['timestamp']
+    assert second is not first
+
+def test_coalesced_analyses_report_their_stages():
+    events = {'first': [], 'second': []}
+
+    def listener(name):
+        async def on_stage(stage, event):
+            events[name].append((stage, event))
+        return on_stage
+
+    async def main():
+        analyzer = SchemaAnalyzer({'performance': {'executor': 'thread'}})
+        try:
+            await asyncio.gather(
+                analyzer.analyze_schema_changes(SCHEMA, {'tables': []}, on_stage=listener('first')),
+                analyzer.analyze_schema_changes(SCHEMA, {'tables': []}, on_stage=listener('second')),
+            )
+        finally:
+            await analyzer.close()
+
+    asyncio.run(main())
+
+    for name in ('first', 'second'):
+        assert ('generate_diff', 'completed') in events[name]
+        assert ('analyze_impact', 'completed') in events[name]
@@ -0,0 +1,71 @@
+"""Tests for SchemaIndex"""
+
+import asyncio
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.utils.query_validator import QueryValidator
+from schema_analyzer.utils.schema_index import SchemaIndex
+
+SCHEMA = {'tables': [
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER'},
+                                  {'name': 'email', 'type': 'TEXT'}]},
+    {'name': 'audit', 'columns': [{'name': 'id', 'type': 'INTEGER'}]},
+    {'name': 'users', 'columns': [{'name': 'id', 'type': 'BIGINT'}]},
+]}
+
+def test_tables_are_sorted_and_the_last_definition_wins():
+    index = SchemaIndex.build(SCHEMA)
+
+    assert index.table_names() == ['audit', 'users']
+    assert len(index) == 2 and 'users' in index and 'orders' not in index
+    assert index.table('users').columns['id']['type'] == 'BIGINT'
+    assert index.table('orders') is None
+
+def test_columns_are_indexed_on_first_use():
+    index = SchemaIndex.build(SCHEMA)
+    users = index.table('users')
+
+    assert users._columns is None
+    assert index.has_column('users', 'id')
+    assert not index.has_column('users', 'email')
+    assert not index.has_column('orders', 'id')
+    assert users.columns is users.columns
+    assert index.table('audit')._columns is None
+
+def test_of_returns_an_existing_index():
+    index = SchemaIndex.build(SCHEMA)
+
+    assert SchemaIndex.of(index) is index
+    assert SchemaIndex.of(SCHEMA) is not index
+
+def test_queries_validate_the_same_against_an_index():
+    validator = QueryValidator()
+    schema = {'tables': SCHEMA['tables'][:2]}
+    queries = ["SELECT u.email FROM users u", "SELECT a.missing FROM audit a"]
+
+    assert (validator.validate_queries_sync(queries, SchemaIndex.build(schema))
+            == validator.validate_queries_sync(queries, schema))
+
+def test_analyzer_indexes_each_schema_once(monkeypatch):
+    built = []
+    build = SchemaIndex.build.__func__
+
+    def counting_build(cls, schema):
+        built.append(schema)
+        return build(cls, schema)
+    monkeypatch.setattr(SchemaIndex, 'build', classmethod(counting_build))
+
+    old = {'tables': SCHEMA['tables'][:2]}
+    new = {'tables': SCHEMA['tables'][1:]}
+
+    async def main():
+        analyzer = SchemaAnalyzer({'performance': {'executor': 'inline'}})
+        try:
+            await analyzer.analyze_schema_changes(old, new, ["SELECT u.id FROM users u"])
+            await analyzer.analyze_schema_changes(old, new, ["SELECT u.id FROM users u"])
+        finally:
+            await analyzer.close()
+
+    asyncio.run(main())
+
+    assert built == [old, new]
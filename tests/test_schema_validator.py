@@ -0,0 +1,70 @@
+"""Tests for SchemaValidator"""
+
+import asyncio
+from datetime import date
+
+import jsonschema
+import pytest
+
+from schema_analyzer.analyze import SchemaAnalyzer
+from schema_analyzer.utils.fingerprint import fingerprint_schema
+from schema_analyzer.utils.schema_validator import SchemaValidator
+
+VALID = {'tables': [{'name': 'users', 'columns': [
+    {'name': 'id', 'type': 'INTEGER', 'nullable': False, 'default': 0,
+     'constraints': ['PRIMARY KEY']},
+    {'name': 'email', 'type': 'TEXT', 'default': None},
+]}]}
+
+@pytest.mark.parametrize('schema', [
+    {},
+    {'tables': {}},
+    {'tables': [{'name': 'users'}]},
+    {'tables': [{'name': 'users', 'columns': [{'name': 'id'}]}]},
+    {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER', 'nullable': 1}]}]},
+    {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER', 'default': True}]}]},
+    {'tables': [{'name': 'users', 'columns': [{'name': 'id', 'type': 'INTEGER',
+                                                'constraints': [1]}]}]},
+])
+def test_invalid_schemas_raise_the_full_validator_error(schema):
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        SchemaValidator().validate_sync(schema)
+
+def test_fast_check_agrees_with_jsonschema_on_valid_schema():
+    assert SchemaValidator._fast_check(VALID)
+    SchemaValidator._get_validator().validate(VALID)
+    asyncio.run(SchemaValidator().validate(VALID))
+
+def test_validated_hashes_are_memoized(monkeypatch):
+    validator = SchemaValidator()
+    validator.validate_sync(VALID, schema_hash='abc')
+    monkeypatch.setattr(SchemaValidator, '_fast_check', staticmethod(lambda schema: 1 / 0))
+
+    # A known hash skips all checks; an unknown one does not
+    validator.validate_sync(VALID, schema_hash='abc')
+    with pytest.raises(ZeroDivisionError):
+        validator.validate_sync(VALID, schema_hash='other')
+
+def test_incremental_validation_falls_back_to_full_errors():
+    validator = SchemaValidator()
+    bad_table = {'name': 'bad', 'columns': [{'name': 'x'}]}
+    schema = {'tables': VALID['tables'] + [bad_table]}
+
+    validator.validate_incremental_sync(VALID, VALID['tables'])
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        validator.validate_incremental_sync(schema, [bad_table])
+
+def test_schemas_that_only_stringify_alike_are_validated_separately():
+    valid = {'tables': [{'name': 'events', 'columns': [
+        {'name': 'day', 'type': 'DATE', 'default': '2024-01-01'}]}]}
+    invalid = {'tables': [{'name': 'events', 'columns': [
+        {'name': 'day', 'type': 'DATE', 'default': date(2024, 1, 1)}]}]}
+    analyzer = SchemaAnalyzer({'performance': {'executor': 'inline'}})
+
+    analyzer._prepare_schema(valid)
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        analyzer._prepare_schema(invalid)
+
+def test_top_level_keys_are_part_of_the_memo_key():
+    assert fingerprint_schema(VALID) != fingerprint_schema(dict(VALID, version=2))
+    assert fingerprint_schema(dict(VALID, version=2)) == fingerprint_schema(dict(VALID, version=2))
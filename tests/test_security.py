@@ -0,0 +1,89 @@
+"""Tests for SecurityConfig"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from schema_analyzer.security import SecurityConfig
+
+CONFIG = {'secret_key': 'secret', 'algorithm': 'HS256', 'access_token_expire_minutes': 30}
+
+def test_verified_tokens_are_cached(monkeypatch):
+    security = SecurityConfig(CONFIG)
+    token = security.create_access_token({'sub': 'alice'})
+    decode = jwt.decode
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+    monkeypatch.setattr(jwt, 'decode', counting_decode)
+
+    first = asyncio.run(security.verify_token(token))
+    first['sub'] = 'mallory'
+    second = asyncio.run(security.verify_token(token))
+
+    assert second['sub'] == 'alice'
+    assert calls == [token]
+    security.close()
+
+def test_cached_tokens_expire_with_their_exp_claim():
+    security = SecurityConfig(dict(CONFIG, token_cache_ttl=3600))
+    token = jwt.encode({'sub': 'alice', 'exp': int(time.time()) + 1}, 'secret', algorithm='HS256')
+    asyncio.run(security.verify_token(token))
+    expires_at, _ = security._verified_tokens.get(token)
+
+    assert expires_at <= time.time() + 1
+    security._verified_tokens.put(token, (time.time() - 1, {'sub': 'alice'}))
+    # Expired cache entries are dropped and the token is verified again
+    assert asyncio.run(security.verify_token(token))['sub'] == 'alice'
+    security.close()
+
+def test_invalid_tokens_are_rejected():
+    security = SecurityConfig(CONFIG)
+    forged = jwt.encode({'sub': 'alice'}, 'other-secret', algorithm='HS256')
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(security.verify_token(forged))
+    assert excinfo.value.status_code == 401
+    assert security._verified_tokens.get(forged) is None
+    security.close()
+
+def test_api_keys_are_configured_and_checked_by_digest():
+    key = 'k' * 43
+    security = SecurityConfig(dict(CONFIG, api_keys={
+        'ci': SecurityConfig.hash_api_key(key).upper()
+    }))
+
+    assert security.verify_api_key(key) == 'ci'
+    assert key not in repr(security._api_keys)
+    with pytest.raises(HTTPException) as excinfo:
+        security.verify_api_key(key[:-1])
+    assert excinfo.value.status_code == 401
+
+    other = security.generate_api_key()
+    security.register_api_key(other, 'deploy')
+    assert security.verify_api_key(other) == 'deploy'
+    security.close()
+
+def test_password_checks_run_on_the_hashing_pool(monkeypatch):
+    security = SecurityConfig(dict(CONFIG, password_hash_workers=1))
+    threads = []
+
+    def verify(plain_password, hashed_password):
+        threads.append(threading.current_thread().name)
+        return plain_password == hashed_password
+    monkeypatch.setattr(security, 'verify_password', verify)
+
+    async def main():
+        return await asyncio.gather(
+            security.verify_password_async('a', 'a'), security.verify_password_async('a', 'b')
+        )
+
+    assert asyncio.run(main()) == [True, False]
+    assert len(threads) == 2 and all(name.startswith('password-hash') for name in threads)
+    security.close()
@@ -0,0 +1,566 @@
+"""Tests for the storage backends"""
+
+import asyncio
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import pytest
+
+from schema_analyzer.storage import (
+    COMPRESSORS, JsonSerializer, MemoryStorage, PostgresStorage, SQLiteStorage, StorageBackend,
+    StorageFactory, decode_cursor, extract_path, get_serializer, rollup_metrics
+)
+
+class PoisonAwareStorage(SQLiteStorage):
+    """SQLite storage whose database rejects results and metrics marked poison"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.batches = []
+
+    async def _write_results(self, results):
+        self.batches.append(sorted(results))
+        if any(result.get('poison') for result, _ in results.values()):
+            raise ValueError('rejected')
+        await super()._write_results(results)
+
+    async def _write_metrics(self, metrics):
+        if any(m.get('poison') for _, m in metrics):
+            raise ValueError('rejected')
+        await super()._write_metrics(metrics)
+
+def sqlite_config(tmp_path, **overrides):
+    config = {
+        'backend': 'sqlite',
+        'path': str(tmp_path / 'results.db'),
+        'write_flush_interval': 60
+    }
+    config.update(overrides)
+    return config
+
+def test_one_bad_result_does_not_block_its_batch(tmp_path):
+    async def main():
+        storage = PoisonAwareStorage(sqlite_config(tmp_path))
+        await storage.initialize()
+        await storage.store_result('a', {'value': 1})
+        await storage.store_result('bad', {'poison': True})
+        await storage.store_result('b', {'value': 2})
+        await storage.flush()
+        stored = storage.batches[:]
+        pending = dict(storage._pending_results)
+        await storage.close()
+        reopened = SQLiteStorage(sqlite_config(tmp_path))
+        await reopened.initialize()
+        found = [await reopened.retrieve_result(sid) for sid in ('a', 'b', 'bad')]
+        await reopened.close()
+        return stored, pending, found
+
+    batches, pending, found = asyncio.run(main())
+
+    assert batches[0] == ['a', 'b', 'bad']
+    assert found == [{'value': 1}, {'value': 2}, None]
+    assert list(pending) == ['bad']
+
+def test_rows_that_keep_failing_are_dead_lettered(tmp_path):
+    path = tmp_path / 'dead.ndjson'
+
+    async def main():
+        storage = PoisonAwareStorage(sqlite_config(
+            tmp_path, write_max_attempts=2, dead_letter_path=str(path)))
+        await storage.initialize()
+        await storage.store_result('bad', {'poison': True})
+        await storage.store_metrics({'poison': True})
+        await storage.store_metrics({'duration': 1.0})
+        await storage.flush()
+        first = (len(storage._pending_results), len(storage._failed_metrics))
+        await storage.flush()
+        second = (len(storage._pending_results), len(storage._failed_metrics))
+        letters = list(storage.dead_letters)
+        await storage.flush()
+        batches = len(storage.batches)
+        await storage.close()
+        return first, second, letters, batches
+
+    first, second, letters, batches = asyncio.run(main())
+
+    assert first == (1, 1)
+    assert second == (0, 0)
+    assert [(letter['kind'], letter['document']) for letter in letters] == [
+        ('result', {'poison': True}), ('metrics', {'poison': True})
+    ]
+    # Nothing left to retry
+    assert batches == 3
+    with open(path) as f:
+        assert [json.loads(line)['kind'] for line in f] == ['result', 'metrics']
+
+def test_newer_result_replaces_a_failing_one(tmp_path):
+    async def main():
+        storage = PoisonAwareStorage(sqlite_config(tmp_path, write_max_attempts=2))
+        await storage.initialize()
+        await storage.store_result('s', {'poison': True})
+        await storage.flush()
+        await storage.store_result('s', {'value': 3})
+        await storage.flush()
+        await storage.flush()
+        result = await storage.retrieve_result('s')
+        letters = list(storage.dead_letters)
+        await storage.close()
+        return result, letters
+
+    assert asyncio.run(main()) == ({'value': 3}, [])
+
+def test_writers_are_not_failed_by_other_rows_when_far_behind(tmp_path):
+    async def main():
+        storage = PoisonAwareStorage(sqlite_config(tmp_path, write_max_pending=2))
+        await storage.initialize()
+        await storage.store_result('bad', {'poison': True})
+        for i in range(5):
+            await storage.store_result(f"ok-{i}", {'value': i})
+        results = [await storage.retrieve_result(f"ok-{i}") for i in range(5)]
+        await storage.close()
+        return results, list(storage.dead_letters)
+
+    results, letters = asyncio.run(main())
+
+    assert results == [{'value': i} for i in range(5)]
+    assert [letter['key'] for letter in letters] == ['bad']
+
+def test_close_dead_letters_pending_retries(tmp_path):
+    async def main():
+        storage = PoisonAwareStorage(sqlite_config(tmp_path, write_max_attempts=5))
+        await storage.initialize()
+        await storage.store_result('bad', {'poison': True})
+        await storage.close()
+        return list(storage.dead_letters)
+
+    letters = asyncio.run(main())
+
+    assert [(letter['key'], letter['error']) for letter in letters] == [
+        ('bad', 'RuntimeError: storage closed')
+    ]
+
+class SlowWriteStorage(SQLiteStorage):
+    """SQLite storage whose result writes wait until released"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.writing = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def _write_results(self, results):
+        self.writing.set()
+        await self.release.wait()
+        await super()._write_results(results)
+
+def test_results_stay_readable_while_their_write_is_in_flight(tmp_path):
+    async def main():
+        storage = SlowWriteStorage(sqlite_config(tmp_path))
+        await storage.initialize()
+        await storage.store_result('s', {'value': 1})
+        flush = asyncio.ensure_future(storage.flush())
+        await storage.writing.wait()
+        during = (await storage.retrieve_result('s'), await storage.retrieve_fields('s', ['value']))
+        storage.release.set()
+        await flush
+        after = (await storage.retrieve_result('s'), storage._writing_results)
+        await storage.close()
+        return during, after
+
+    during, after = asyncio.run(main())
+
+    assert during == ({'value': 1}, {'value': 1})
+    assert after == ({'value': 1}, {})
+
+def test_interrupted_flush_keeps_unwritten_results(tmp_path):
+    async def main():
+        storage = SlowWriteStorage(sqlite_config(tmp_path))
+        await storage.initialize()
+        await storage.store_result('s', {'value': 1})
+        flush = asyncio.ensure_future(storage.flush())
+        await storage.writing.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        pending = dict(storage._pending_results)
+        storage.release.set()
+        await storage.close()
+        reopened = SQLiteStorage(sqlite_config(tmp_path))
+        await reopened.initialize()
+        stored = await reopened.retrieve_result('s')
+        await reopened.close()
+        return list(pending), stored
+
+    assert asyncio.run(main()) == (['s'], {'value': 1})
+
+@pytest.mark.skipif('TEST_POSTGRES_DSN' not in os.environ, reason='needs TEST_POSTGRES_DSN')
+def test_postgres_connects_with_connection_string():
+    async def main():
+        storage = await StorageFactory.create_storage({
+            'backend': 'postgresql',
+            'connection_string': os.environ['TEST_POSTGRES_DSN'],
+            'pool_min_size': 1,
+            'pool_max_size': 2
+        })
+        await storage.store_result('dsn-test', {'value': 1})
+        await storage.store_document('job', 'dsn-test', {'status': 'queued'})
+        await storage.flush()
+        result = await storage.retrieve_result('dsn-test')
+        document = await storage.retrieve_document('job', 'dsn-test')
+        listed = await storage.list_results(limit=1000)
+        await storage.close()
+        return result, document, [row['session_id'] for row in listed['results']]
+
+    result, document, listed = asyncio.run(main())
+
+    assert (result, document) == ({'value': 1}, {'status': 'queued'})
+    assert listed.count('dsn-test') == 1
+
+def test_factory_creates_embedded_backends(tmp_path):
+    async def main():
+        first = await StorageFactory.create_storage(sqlite_config(tmp_path))
+        await first.store_result('s', {'value': 1})
+        await first.close()
+        second = await StorageFactory.create_storage({'type': 'sqlite',
+                                                       'path': str(tmp_path / 'results.db')})
+        persisted = await second.retrieve_result('s')
+        await second.close()
+        memory = await StorageFactory.create_storage({'backend': 'memory'})
+        return type(second), persisted, type(memory)
+
+    assert asyncio.run(main()) == (SQLiteStorage, {'value': 1}, MemoryStorage)
+    with pytest.raises(ValueError, match='mongodb'):
+        asyncio.run(StorageFactory.create_storage({'backend': 'mongodb'}))
+
+def test_memory_storage_keeps_the_most_recent_metrics():
+    async def main():
+        storage = MemoryStorage({'max_metrics': 2})
+        for duration in (1.0, 2.0, 3.0):
+            await storage.store_metrics({'duration': duration})
+        now = datetime.now(timezone.utc)
+        rows = await storage.query_metrics(now - timedelta(hours=1), now + timedelta(hours=1),
+                                           'hour')
+        return [m['duration'] for _, m in storage.metrics], rows
+
+    raw, rows = asyncio.run(main())
+
+    assert raw == [2.0, 3.0]
+    # Rollups still count every entry
+    assert sum(row['count'] for row in rows) == 3
+
+def test_internal_documents_stay_out_of_result_listings(tmp_path):
+    async def main(storage):
+        await storage.initialize()
+        await storage.store_result('session', {'changes': []})
+        await storage.store_document('job', 'session', {'status': 'queued'})
+        await storage.store_document('job', 'session', {'status': 'running'})
+        await storage.store_document('cache', 'key', {'result': {}})
+        listed = await storage.list_results()
+        found = (
+            await storage.retrieve_result('session'),
+            await storage.retrieve_document('job', 'session'),
+            await storage.retrieve_document('profile', 'session')
+        )
+        await storage.close()
+        return [row['session_id'] for row in listed['results']], found
+
+    for storage in (MemoryStorage(), SQLiteStorage(sqlite_config(tmp_path))):
+        assert asyncio.run(main(storage)) == (
+            ['session'], ({'changes': []}, {'status': 'running'}, None)
+        )
+
+def test_result_listings_page_newest_first_with_summaries(tmp_path):
+    async def main(storage):
+        await storage.initialize()
+        for i in range(5):
+            await storage.store_result(f"s{i}", {
+                'changes': [{}] * i,
+                'impact': {'severity': 'high', 'breaking_changes': [{}]}
+            })
+        await storage.flush()
+        pages, cursor = [], None
+        while True:
+            page = await storage.list_results(limit=2, cursor=cursor)
+            pages.append(page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        await storage.close()
+        return pages
+
+    for storage in (MemoryStorage(), SQLiteStorage(sqlite_config(tmp_path))):
+        pages = asyncio.run(main(storage))
+        rows = [row for page in pages for row in page]
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert [row['session_id'] for row in rows] == ['s4', 's3', 's2', 's1', 's0']
+        assert [row['change_count'] for row in rows] == [4, 3, 2, 1, 0]
+        assert all((row['severity'], row['breaking_count']) == ('high', 1) for row in rows)
+
+def test_extract_path_follows_keys_and_list_indexes():
+    document = {'impact': {'severity': 'low'}, 'changes': [{'table': 'a'}, {'table': 'b'}]}
+
+    assert extract_path(document, 'impact.severity') == 'low'
+    assert extract_path(document, 'changes.-1.table') == 'b'
+    assert extract_path(document, 'changes.2.table') is None
+    assert extract_path(document, 'impact.severity.level') is None
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor('yesterday|s1')
+
+def test_backends_must_implement_listing_and_metrics_queries():
+    class Partial(StorageBackend):
+        async def store_result(self, session_id, result):
+            pass
+
+        async def retrieve_result(self, session_id):
+            return None
+
+        async def store_metrics(self, metrics):
+            pass
+
+        async def store_document(self, kind, key, document):
+            pass
+
+        async def retrieve_document(self, kind, key):
+            return None
+
+    with pytest.raises(TypeError, match='list_results'):
+        Partial()
+
+def test_rollups_leave_out_invalid_entries():
+    now = datetime(2024, 1, 1, 12, 0, 30, tzinfo=timezone.utc)
+    rollups = rollup_metrics([
+        (now, {'duration': 1.5, 'errors': 1, 'changes': '4'}),
+        (now, {'duration': 2.0}),
+        (now, {'duration': 'slow'}),
+        (now, {'errors': float('nan')}),
+        (now, {'changes': -1}),
+        (now, {'errors': [1]}),
+        (now, {'duration': float('inf')}),
+    ])
+
+    assert rollups[('minute', now.replace(second=0))] == [2, 3.5, 2.0, 1, 4]
+
+def test_invalid_metrics_entry_does_not_fail_its_batch(tmp_path):
+    async def main():
+        storage = SQLiteStorage(sqlite_config(tmp_path))
+        await storage.initialize()
+        await storage.store_metrics({'duration': 1.0, 'errors': 'n/a'})
+        await storage.store_metrics({'duration': 2.0, 'changes': 3})
+        start = datetime.now(timezone.utc) - timedelta(hours=1)
+        rows = await storage.query_metrics(start, start + timedelta(hours=2), 'hour')
+        await storage.close()
+        return rows, list(storage.dead_letters)
+
+    rows, letters = asyncio.run(main())
+
+    assert [(row['count'], row['changes']) for row in rows] == [(1, 3)]
+    assert letters == []
+
+def test_new_partitions_fit_between_partitions_of_another_width():
+    hour = datetime(2024, 1, 2, 5, tzinfo=timezone.utc)
+    storage = PostgresStorage({'metrics_partition': 'hour'})
+    storage._partitions = {
+        'analysis_metrics_raw_p20240101': (hour.replace(day=1, hour=0), hour.replace(hour=0))
+    }
+    assert storage._new_partition_bounds(hour) == (hour, hour + timedelta(hours=1))
+
+    storage.partition = 'day'
+    storage._partitions = {
+        name: PostgresStorage._partition_bounds(name)
+        for name in ('analysis_metrics_raw_p2024010203', 'analysis_metrics_raw_p2024010207_2024010208')
+    }
+    assert storage._new_partition_bounds(hour) == (hour.replace(hour=4), hour.replace(hour=7))
+    assert storage._new_partition_bounds(hour.replace(hour=1)) == (
+        hour.replace(hour=0), hour.replace(hour=3))
+    assert storage._new_partition_bounds(hour.replace(hour=9)) == (
+        hour.replace(hour=8), hour.replace(day=3, hour=0))
+
+@pytest.mark.skipif('TEST_POSTGRES_DSN' not in os.environ, reason='needs TEST_POSTGRES_DSN')
+def test_postgres_partition_width_can_change_with_data_present():
+    base = datetime(2001, 3, 4, tzinfo=timezone.utc)
+
+    async def connect(partition):
+        return await StorageFactory.create_storage({
+            'backend': 'postgresql',
+            'connection_string': os.environ['TEST_POSTGRES_DSN'],
+            'metrics_partition': partition,
+            'metrics_raw_retention_days': 100000,
+            'pool_min_size': 1,
+            'pool_max_size': 2
+        })
+
+    def test_range(storage):
+        return {
+            name: bounds for name, bounds in storage._partitions.items()
+            if base <= bounds[0] < base + timedelta(days=2)
+        }
+
+    async def drop_test_partitions(storage):
+        async with storage.pool.acquire() as conn:
+            for name in test_range(storage):
+                await conn.execute(f'DROP TABLE "{name}"')
+
+    async def main():
+        storage = await connect('hour')
+        await drop_test_partitions(storage)
+        await storage._write_metrics([(base + timedelta(hours=5), {'duration': 1.0})])
+        await storage.close()
+
+        storage = await connect('day')
+        for hours in (1, 5, 9, 30):
+            await storage._write_metrics([(base + timedelta(hours=hours), {'duration': 1.0})])
+        async with storage.pool.acquire() as conn:
+            count = await conn.fetchval(
+                'SELECT count(*) FROM analysis_metrics_raw WHERE timestamp >= $1 AND timestamp < $2',
+                base, base + timedelta(days=2))
+        bounds = sorted(test_range(storage).values())
+        await drop_test_partitions(storage)
+        await storage.close()
+        return count, bounds
+
+    count, bounds = asyncio.run(main())
+
+    assert count == 5
+    assert bounds == [
+        (base + timedelta(hours=lower), base + timedelta(hours=upper))
+        for lower, upper in ((0, 5), (5, 6), (6, 24), (24, 48))
+    ]
+
+def test_serializers_write_interchangeable_json():
+    orjson_serializer = pytest.importorskip('orjson') and get_serializer('orjson')
+    document = {'name': 'caf\u00e9', 'count': 3, 'nested': [1.5, None, True],
+                'when': datetime(2024, 1, 1, tzinfo=timezone.utc)}
+    json_serializer = JsonSerializer()
+
+    assert orjson_serializer.loads(json_serializer.dumps(document)) == json_serializer.loads(
+        orjson_serializer.dumps(document))
+    assert json.loads(json_serializer.dumps(document))['when'].startswith('2024-01-01')
+
+def test_unknown_serializer_or_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Unsupported serializer'):
+        get_serializer('pickle')
+    with pytest.raises(ValueError, match='Unsupported compression'):
+        SQLiteStorage(sqlite_config(tmp_path, compression='lz4'))
+
+def test_large_results_are_stored_compressed(tmp_path):
+    small = {'changes': [], 'impact': {'severity': 'low'}}
+    large = {'changes': [{'type': 'column_removed', 'table': f"t{i}", 'column': 'c'}
+                         for i in range(200)], 'impact': {'severity': 'high'}}
+
+    async def main():
+        storage = SQLiteStorage(sqlite_config(
+            tmp_path, serializer='json', compression_threshold=1024))
+        await storage.initialize()
+        await storage.store_result('small', small)
+        await storage.store_result('large', large)
+        await storage.close()
+
+        # Rows written by one serializer are readable by another
+        reopened = SQLiteStorage(sqlite_config(tmp_path, compression='none'))
+        await reopened.initialize()
+        found = (await reopened.retrieve_result('small'), await reopened.retrieve_result('large'),
+                 await reopened.retrieve_fields('large', ['impact.severity']))
+        await reopened.close()
+        return found
+
+    found = asyncio.run(main())
+    conn = sqlite3.connect(tmp_path / 'results.db')
+    rows = dict(conn.execute('SELECT session_id, result_encoding FROM analysis_results'))
+    conn.close()
+
+    assert found == (small, large, {'impact.severity': 'high'})
+    assert rows == {'small': None, 'large': 'zlib'}
+
+def test_compressors_round_trip():
+    data = json.dumps({'changes': list(range(1000))}).encode('utf-8')
+
+    for name, (compress, decompress) in COMPRESSORS.items():
+        compressed = compress(data, 3)
+        assert len(compressed) < len(data)
+        assert decompress(compressed) == data
+
+@pytest.mark.skipif('TEST_POSTGRES_DSN' not in os.environ, reason='needs TEST_POSTGRES_DSN')
+def test_postgres_compressed_results_read_back():
+    large = {'changes': [{'type': 'table_removed', 'table': f"t{i}"} for i in range(200)],
+             'impact': {'severity': 'high'}}
+
+    async def main():
+        storage = await StorageFactory.create_storage({
+            'backend': 'postgresql',
+            'connection_string': os.environ['TEST_POSTGRES_DSN'],
+            'compression_threshold': 1024,
+            'pool_min_size': 1,
+            'pool_max_size': 2
+        })
+        await storage.store_result('compressed-test', large)
+        await storage.flush()
+        async with storage.pool.acquire() as conn:
+            encoding = await conn.fetchval(
+                'SELECT result_encoding FROM analysis_results WHERE session_id = $1',
+                'compressed-test')
+        found = (await storage.retrieve_result('compressed-test'),
+                 await storage.retrieve_fields('compressed-test', ['impact.severity']))
+        await storage.close()
+        return encoding, found
+
+    encoding, found = asyncio.run(main())
+
+    assert encoding == 'zlib'
+    assert found == (large, {'impact.severity': 'high'})
+
+@pytest.mark.skipif('TEST_POSTGRES_DSN' not in os.environ, reason='needs TEST_POSTGRES_DSN')
+def test_postgres_migrates_the_legacy_metrics_table():
+    base = datetime(2002, 5, 6, tzinfo=timezone.utc)
+
+    async def main():
+        conn = await asyncpg.connect(os.environ['TEST_POSTGRES_DSN'])
+        try:
+            await conn.execute('DROP TABLE IF EXISTS analysis_metrics_legacy')
+            await conn.execute('''
+                CREATE TABLE analysis_metrics (
+                    id SERIAL PRIMARY KEY,
+                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                    metrics JSONB
+                )
+            ''')
+            for hours in (1, 2):
+                await conn.execute(
+                    'INSERT INTO analysis_metrics (timestamp, metrics) VALUES ($1, $2)',
+                    base + timedelta(hours=hours), json.dumps({'duration': 2.0, 'changes': 3}))
+        finally:
+            await conn.close()
+
+        storage = await StorageFactory.create_storage({
+            'backend': 'postgresql',
+            'connection_string': os.environ['TEST_POSTGRES_DSN'],
+            'metrics_raw_retention_days': 100000,
+            'metrics_rollup_retention_days': 100000,
+            'pool_min_size': 1,
+            'pool_max_size': 2
+        })
+        end = base + timedelta(days=1)
+        async with storage.pool.acquire() as conn:
+            raw = await conn.fetchval(
+                'SELECT count(*) FROM analysis_metrics_raw WHERE timestamp >= $1 AND timestamp < $2',
+                base, end)
+            tables = await conn.fetchval(
+                "SELECT array_agg(relname::text ORDER BY relname) FROM pg_class "
+                "WHERE relname IN ('analysis_metrics', 'analysis_metrics_legacy')")
+        rows = await storage.query_metrics(base, end, 'hour')
+        async with storage.pool.acquire() as conn:
+            await conn.execute('DROP TABLE analysis_metrics_legacy')
+            await conn.execute('DELETE FROM analysis_metrics_raw WHERE timestamp >= $1 AND timestamp < $2',
+                               base, end)
+            await conn.execute('DELETE FROM analysis_metrics_rollup WHERE bucket_start >= $1 '
+                               'AND bucket_start < $2', base, end)
+        await storage.close()
+        return raw, tables, rows
+
+    raw, tables, rows = asyncio.run(main())
+
+    assert raw == 2
+    assert tables == ['analysis_metrics_legacy']
+    assert [(row['count'], row['changes']) for row in rows] == [(1, 3), (1, 3)]